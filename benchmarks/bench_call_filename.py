@@ -0,0 +1,70 @@
+"""Per-call cost of resolving the caller's app record.
+
+Compares the previous `inspect.stack()` + linear `startswith` scan with
+`sys._getframe` + the per-filename memo in `AppStore.get_or_none`.
+
+    python benchmarks/bench_call_filename.py
+"""
+import inspect
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI  # noqa: E402
+
+from fastapi_boot.core.const import AppStore  # noqa: E402
+from fastapi_boot.core.model import AppRecord  # noqa: E402
+from fastapi_boot.core.util import get_call_filename  # noqa: E402
+
+N = 20000
+# pretend the project has some apps
+APP_NUM = 20
+
+
+def old_get_call_filename(layer: int = 1):
+    return inspect.stack()[layer + 1].filename.capitalize()
+
+
+def old_get_or_none(app_dic: dict, path: str):
+    path = path[0].upper() + path[1:]
+    for k, v in app_dic.items():
+        if path.startswith(k):
+            return v
+
+
+def make_store():
+    store = AppStore()
+    for i in range(APP_NUM - 1):
+        store.add(f'/srv/other_app_{i}'.capitalize(), AppRecord(FastAPI(), 20, 0.05))
+    store.add(os.path.dirname(__file__).capitalize(), AppRecord(FastAPI(), 20, 0.05))
+    return store
+
+
+def deep_call(depth: int, func):
+    """simulate the call depth inside a running app"""
+    if depth == 0:
+        return func()
+    return deep_call(depth - 1, func)
+
+
+def main():
+    store = make_store()
+
+    def old():
+        return old_get_or_none(store.app_dic, old_get_call_filename())
+
+    def new():
+        return store.get_or_none(get_call_filename())
+
+    assert old() is new() is not None
+    for depth in (0, 30):
+        t_old = timeit.timeit(lambda: deep_call(depth, old), number=N // 20) / (N // 20)
+        t_new = timeit.timeit(lambda: deep_call(depth, new), number=N) / N
+        print(f'stack depth +{depth:>2}: inspect.stack {t_old * 1e6:10.2f} us/call | '
+              f'sys._getframe + memo {t_new * 1e6:8.2f} us/call | x{t_old / t_new:.0f}')
+
+
+if __name__ == '__main__':
+    main()
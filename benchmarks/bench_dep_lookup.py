@@ -0,0 +1,50 @@
+"""Per-lookup cost of `DepStore.inject_dep`.
+
+Compares the previous lookup, which allocates an empty dict for each miss,
+with the tables published by `freeze()` at the end of provide_app.
+
+    python benchmarks/bench_dep_lookup.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi_boot.core.const import DepStore  # noqa: E402
+
+N = 200000
+# pretend the project has some dependencies
+DEP_NUM = 500
+
+
+def old_inject_dep(store: DepStore, tp: type, name: str | None):
+    if name is None:
+        return store.type_deps.get(tp, None)
+    else:
+        return store.name_deps.get(tp, {}).get(name, None)
+
+
+def make_store() -> tuple[DepStore, list[type]]:
+    store = DepStore()
+    types = [type(f'Dep{i}', (), {}) for i in range(DEP_NUM)]
+    for i, tp in enumerate(types):
+        store.add_dep(tp, None, tp())
+        store.add_dep(tp, f'dep{i}', tp())
+    return store, types
+
+
+def main():
+    store, types = make_store()
+    store.freeze()
+    tp, name, missing = types[DEP_NUM // 2], f'dep{DEP_NUM // 2}', type('Missing', (), {})
+    cases = dict(by_type=(tp, None), by_name=(tp, name), miss_name=(missing, 'x'))
+    for k, args in cases.items():
+        assert old_inject_dep(store, *args) is store.inject_dep(*args)
+        t_old = timeit.timeit(lambda: old_inject_dep(store, *args), number=N) / N
+        t_new = timeit.timeit(lambda: store.inject_dep(*args), number=N) / N
+        print(f'{k:9}: previous {t_old * 1e9:6.1f} ns | frozen {t_new * 1e9:6.1f} ns')
+
+
+if __name__ == '__main__':
+    main()
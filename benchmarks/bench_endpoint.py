@@ -0,0 +1,101 @@
+"""Per-request overhead of a Controller endpoint against a raw FastAPI route.
+
+Requests are sent straight to the ASGI app, so the numbers only contain routing,
+dependency solving, the endpoint wrapper and response serialization.
+
+    python benchmarks/bench_endpoint.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends, FastAPI, Request  # noqa: E402
+
+from fastapi_boot.core import Controller, Get, provide_app, use_dep  # noqa: E402
+
+N = 5000
+
+app = provide_app(FastAPI(), exclude_scan_paths=['benchmarks'])
+
+
+def get_ua(request: Request):
+    return request.headers.get('user-agent', '')
+
+
+@app.get('/raw/async')
+async def raw_async():
+    return 'ok'
+
+
+@app.get('/raw/sync')
+def raw_sync():
+    return 'ok'
+
+
+@app.get('/raw/dep')
+async def raw_dep(ua: str = Depends(get_ua)):
+    return ua
+
+
+@Controller('/boot')
+class BenchController:
+    @Get('/async')
+    async def boot_async(self):
+        return 'ok'
+
+    @Get('/sync')
+    def boot_sync(self):
+        return 'ok'
+
+
+@Controller('/boot')
+class BenchDepController:
+    ua = use_dep(get_ua)
+
+    @Get('/dep')
+    async def boot_dep(self):
+        return self.ua
+
+
+async def call(path: str):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+        'headers': [(b'host', b'bench'), (b'user-agent', b'bench')], 'client': ('127.0.0.1', 1), 'server': ('bench', 80),
+    }
+    status = 0
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    assert status == 200, (path, status)
+
+
+async def bench(path: str) -> float:
+    for _ in range(200):
+        await call(path)
+    start = time.perf_counter()
+    for _ in range(N):
+        await call(path)
+    return (time.perf_counter() - start) / N
+
+
+async def main():
+    for kind in ('async', 'sync', 'dep'):
+        raw = await bench(f'/raw/{kind}')
+        boot = await bench(f'/boot/{kind}')
+        print(f'{kind:>5}: raw FastAPI {raw * 1e6:8.1f} us/req | Controller {boot * 1e6:8.1f} us/req | '
+              f'overhead {(boot - raw) * 1e6:+7.1f} us')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
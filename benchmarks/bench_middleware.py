@@ -0,0 +1,94 @@
+"""Requests per second with N stacked global http middlewares added by `HTTPMiddleware`.
+
+Compares the dispatch(request, call_next) form, run by `BaseHTTPMiddleware`, with the
+pure ASGI forms: a dispatch(scope, receive, send, call_next) function and an ASGI class.
+
+    python benchmarks/bench_middleware.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from starlette.types import ASGIApp, Receive, Scope, Send  # noqa: E402
+
+from fastapi_boot.core import HTTPMiddleware, provide_app  # noqa: E402
+from fastapi_boot.core.const import app_store  # noqa: E402
+
+N = 2000
+STACKS = (1, 5, 10)
+
+
+async def base_dispatch(request: Request, call_next):
+    return await call_next(request)
+
+
+async def asgi_dispatch(scope: Scope, receive: Receive, send: Send, call_next: ASGIApp):
+    await call_next(scope, receive, send)
+
+
+class ASGIMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self.app(scope, receive, send)
+
+
+MODES = dict(base=base_dispatch, asgi=asgi_dispatch, asgi_cls=ASGIMiddleware)
+
+
+def make_app(mode: str, n: int) -> FastAPI:
+    # provide_app returns the app already provided by this file, start over for each stack
+    app_store.clear()
+    app = provide_app(FastAPI(), exclude_scan_paths=['benchmarks'])
+
+    @app.get('/')
+    async def _():
+        return 'ok'
+
+    for _ in range(n):
+        HTTPMiddleware(MODES[mode])
+    assert len(app.user_middleware) == n, (mode, app.user_middleware)
+    return app
+
+
+async def call(app: FastAPI):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': '/', 'raw_path': b'/', 'root_path': '', 'query_string': b'',
+        'headers': [(b'host', b'bench')], 'client': ('127.0.0.1', 1), 'server': ('bench', 80),
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        ...
+
+    await app(scope, receive, send)
+
+
+async def bench(app: FastAPI) -> float:
+    for _ in range(100):
+        await call(app)
+    start = time.perf_counter()
+    for _ in range(N):
+        await call(app)
+    return N / (time.perf_counter() - start)
+
+
+async def main():
+    for n in STACKS:
+        base = await bench(make_app('base', n))
+        asgi = await bench(make_app('asgi', n))
+        asgi_cls = await bench(make_app('asgi_cls', n))
+        print(f'{n:>2} middlewares: BaseHTTPMiddleware {base:8.0f} req/s | ASGI dispatch {asgi:8.0f} req/s '
+              f'x{asgi / base:.1f} | ASGI class {asgi_cls:8.0f} req/s x{asgi_cls / base:.1f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -96,7 +96,8 @@ class _:
     @Get()
     def f(self):
         print('endpoint')
-        # The output should be  before mid5 > before mid1 > before mid2 > before mid4 > endpoint > before mid4 > after mid2 > after mid1 > before mid5
+        # global middlewares run first, then middlewares of the controller, the last one is the outermost
+        # The output should be  before mid5 > before mid4 > before mid2 > before mid1 > endpoint > after mid1 > after mid2 > after mid4 > after mid5
         return True
 
     @Prefix()
@@ -106,7 +107,7 @@ class _:
         @Post()
         def f(self):
             print('endpoint')
-            # The output should be  before mid5 > before mid2 > before mid1 > before mid4 > endpoint > before mid4 > after mid1 > after mid2 > before mid5
+            # The output should be  before mid5 > before mid4 > before mid1 > before mid2 > endpoint > after mid2 > after mid1 > after mid4 > after mid5
             return True
 
     @Prefix('/ws')
@@ -139,7 +140,7 @@ class _:
 
     @Prefix('/lifespan-bean')
     class LefespaBean:
-        # late inject, equals peoperty and lru_cache
+        # late inject, computed when accessed first, once for each instance
         db_data = Lazy(lambda: Inject(DBData))
 
         @property
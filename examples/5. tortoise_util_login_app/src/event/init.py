@@ -7,7 +7,7 @@ from src.model.config import ProjConfig
 
 @Lifespan
 async def init_db(app: FastAPI):
-    cfg = Inject(ProjConfig)
+    cfg = await Inject.aget(ProjConfig)
     url = cfg.tortoise.url
     modules = cfg.tortoise.modules
     await Tortoise.init(db_url=url, modules=dict(models=modules))
@@ -1,9 +1,29 @@
 import argparse
+import importlib
 import os
+import sys
 
 from .template import gen_controller, gen_main_template
 
 
+def build(app_module: str):
+    """import the module which provides app, record what provide_app does and write the registry"""
+    from fastapi_boot.core import registry
+    from fastapi_boot.core.const import app_store
+
+    registry.building = True
+    sys.path.insert(0, os.getcwd())
+    importlib.import_module(app_module)
+    records = [i for i in app_store.app_dic.values() if i.recorder is not None]
+    if not records:
+        raise Exception(f'provide_app is not called when importing {app_module}')
+    for record in records:
+        recorder = record.recorder
+        assert recorder is not None
+        path = registry.write_registry(recorder)
+        print(f'{path}: {len(recorder.modules)} modules, {len(recorder.beans)} beans')
+
+
 def main():
     parser = argparse.ArgumentParser(description="FastAPI Boot CLI")
     parser.add_argument('--host', type=str,
@@ -13,8 +33,16 @@ def main():
                         help='Enable auto-reload')
     parser.add_argument('--name', type=str, default='demo',
                         help='name of first controller')
+    subparsers = parser.add_subparsers(dest='command')
+    build_parser = subparsers.add_parser(
+        'build', help='generate fastapi_boot_registry.py, so that provide_app needn\'t scan the project when starting')
+    build_parser.add_argument('--app', type=str, default='main',
+                              help='module which calls provide_app, relative to current directory')
 
     args = parser.parse_args()
+    if args.command == 'build':
+        build(args.app)
+        return
     if os.path.exists('./main.py'):
         raise Exception('File main.py already exists')
     if os.path.exists(f'./controller/{args.name}.py'):
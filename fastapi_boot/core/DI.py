@@ -1,9 +1,14 @@
-import time
-from collections.abc import Callable
-from inspect import Parameter, _empty, signature, isclass
-from typing import Annotated, Generic, TypeVar, cast, get_args, get_origin, no_type_check, overload
-
-from .const import app_store, dep_store
+from collections.abc import Awaitable, Callable
+from functools import partial
+from inspect import Parameter, _empty, iscoroutinefunction, signature, isclass
+from typing import Annotated, Any, Generic, TypeVar, cast, get_args, get_origin, no_type_check, overload
+
+from .const import ASYNC_INIT_HOOK, app_store, dep_store
+from .graph import Provider, format_dep_key
+from .lifecycle import DeferBuild, Lifecycle, StartupProvider, StartupRef
+from .profile import profile_span
+from .proxy import DepHolder
+from .scope import BeanScope, LazyDep, ScopedDep, in_event_loop
 from .model import AppRecord, DependencyNotFoundException, InjectFailException
 from .util import get_call_filename
 
@@ -24,15 +29,77 @@ def _inject(app_record: AppRecord, tp: type[T], name: str | None) -> T:
     Returns:
         T: instance
     """
-    start = time.time()
-    while True:
-        if res := dep_store.inject_dep(tp, name):
-            return res
-        time.sleep(app_record.inject_retry_step)
-        if time.time() - start > app_record.inject_timeout:
-            name_info = f"with name '{name}'" if name is not None else ''
-            raise DependencyNotFoundException(
-                f"Dependency '{tp}' {name_info} not found")
+    if (graph := app_record.graph) is not None and not graph.sealed and (tp, name) in graph.providers:
+        # the exact type isn't shadowed by an implementation indexed by it
+        graph.resolve((tp, name))
+    # provided, the common case after startup
+    if (res := dep_store.inject_dep(tp, name)) is not None:
+        if app_record.lifecycle is not None:
+            app_record.lifecycle.add_injected((tp, name))
+        return res.inject() if isinstance(res, DepHolder) else res
+    if app_record.graph is not None:
+        # build it now if it's recorded but not built
+        app_record.graph.resolve((tp, name))
+    if (ref := check_startup_dep(app_record, tp, name)) is not None:
+        return ref
+    if dep_store.inject_dep(tp, name) is None and in_event_loop():
+        # waiting would block every coroutine of the loop
+        raise InjectFailException(
+            f'Dependency {format_dep_key((tp, name))} is not provided yet, '
+            f'use `await Inject.aget(...)` to wait for it inside the event loop')
+    if (profiler := app_record.profiler) is not None and not profiler.stopped and dep_store.inject_dep(tp, name) is None:
+        with profiler.span(f'wait {format_dep_key((tp, name))}', 'wait'):
+            res = dep_store.wait_dep(tp, name, app_record.inject_timeout)
+    else:
+        res = dep_store.wait_dep(tp, name, app_record.inject_timeout)
+    if res is not None:
+        if app_record.lifecycle is not None:
+            app_record.lifecycle.add_injected((tp, name))
+        return res.inject() if isinstance(res, DepHolder) else res
+    # provided at startup while waiting
+    if (ref := check_startup_dep(app_record, tp, name)) is not None:
+        return ref
+    name_info = f"with name '{name}'" if name is not None else ''
+    raise DependencyNotFoundException(
+        f"Dependency '{tp}' {name_info} not found")
+
+
+async def _ainject(app_record: AppRecord, tp: type[T], name: str | None) -> T:
+    """inject dependency by type or name, wait for it without blocking the event loop"""
+    if app_record.graph is not None and dep_store.inject_dep(tp, name) is None:
+        app_record.graph.resolve((tp, name))
+    res = await dep_store.await_dep(tp, name, app_record.inject_timeout)
+    if res is not None:
+        return res.inject() if isinstance(res, DepHolder) else res
+    name_info = f"with name '{name}'" if name is not None else ''
+    raise DependencyNotFoundException(
+        f"Dependency '{tp}' {name_info} not found")
+
+
+def check_startup_dep(app_record: AppRecord, tp: type, name: str | None) -> Any:
+    """the dependency is provided at startup, building the current one should be deferred,
+    otherwise a reference forwarding to it after startup is returned
+    """
+    if (lifecycle := app_record.lifecycle) is None or not lifecycle.is_pending((tp, name)):
+        return None
+    if lifecycle.is_building:
+        raise DeferBuild((tp, name))
+    return StartupRef((tp, name))
+
+
+def get_param_dep_key(param: Parameter) -> tuple[type, str | None] | None:
+    """(type, name) of a param which need to be injected, None if it has default value or no annotation"""
+    if param.default != _empty or param.annotation == _empty:
+        return None
+    if get_origin(param.annotation) == Annotated:
+        tp, name, *_ = get_args(param.annotation)
+        return tp, name
+    return param.annotation, None
+
+
+def get_params_requires(params: list[Parameter]) -> list[tuple[type, str | None]]:
+    """dependencies' keys of params"""
+    return [key for param in params if (key := get_param_dep_key(param)) is not None]
 
 
 def inject_params_deps(app_record: AppRecord, params: list[Parameter]):
@@ -68,7 +135,8 @@ def inject_params_deps(app_record: AppRecord, params: list[Parameter]):
 # ------------------------------------------------------- Bean ------------------------------------------------------- #
 
 
-def collect_bean(app_record: AppRecord, func: Callable, name: str | None = None):
+def collect_bean(app_record: AppRecord, func: Callable, name: str | None = None, scope: BeanScope = 'singleton',
+                 lazy: bool = False, primary: bool = False):
     """
     1. run function decorated by Bean decorator
     2. add the result to deps_store
@@ -77,16 +145,61 @@ def collect_bean(app_record: AppRecord, func: Callable, name: str | None = None)
         app_record (AppRecord)
         func (Callable): func
         name (str | None, optional): name of dep
+        scope (BeanScope, optional): singleton, prototype, request, thread or pooled(max_size). Defaults to 'singleton'.
+        lazy (bool, optional): run func when it's used first. Defaults to False.
+        primary (bool, optional): chosen when injected by a base class which has other candidates. Defaults to False.
     """
-    params: list[Parameter] = list(signature(func).parameters.values())
-    return_annotations = signature(func).return_annotation
-    instance = func(**inject_params_deps(app_record, params))
-    tp = return_annotations if return_annotations != _empty else type(instance)
-    dep_store.add_dep(tp, name, instance)
+    sig = signature(func)
+    params: list[Parameter] = list(sig.parameters.values())
+    return_annotations = sig.return_annotation
+
+    requires = get_params_requires(params)
+
+    def add(instance):
+        tp = return_annotations if return_annotations != _empty else type(instance)
+        dep_store.add_dep(tp, name, instance, primary)
+        if app_record.lifecycle is not None:
+            app_record.lifecycle.record((tp, name), requires, instance)
+        if app_record.recorder is not None:
+            app_record.recorder.add_bean(format_dep_key((tp, name)), func.__module__)
+
+    if scope != 'singleton' or lazy:
+        if return_annotations == _empty or iscoroutinefunction(func):
+            raise InjectFailException(
+                f'Scoped or lazy Bean {func.__qualname__} should be a sync function with return annotation')
+        add_scoped_dep(app_record, (return_annotations, name), scope,
+                       lambda: func(**inject_params_deps(app_record, params)), add, lazy)
+        return
+
+    if iscoroutinefunction(func):
+        # async factory, awaited at startup
+        if return_annotations == _empty:
+            raise InjectFailException(f'The return annotation of async Bean {func.__qualname__} is missing')
+
+        async def start():
+            add(await func(**inject_params_deps(app_record, params)))
+
+        cast(Lifecycle, app_record.lifecycle).add(StartupProvider((return_annotations, name), requires, start))
+        return
+
+    def build():
+        with profile_span(app_record.profiler, f'bean {func.__module__}.{func.__qualname__}', 'bean', dep_name=name):
+            instance = func(**inject_params_deps(app_record, params))
+        add(instance)
+
+    # key of Bean without return annotation is only for Lifecycle
+    key = (return_annotations if return_annotations != _empty else func, name)
+    run = partial(run_or_defer, app_record, key, requires, build)
+    # type can only be known after running func if no return annotation
+    if app_record.graph is not None and not app_record.graph.sealed and return_annotations != _empty:
+        app_record.graph.add(Provider(key, requires, run))
+    else:
+        run()
 
 
 @overload
-def Bean(func_or_name: str): ...
+def Bean(func_or_name: str | None = None, *, scope: BeanScope = 'singleton', lazy: bool = False,
+         primary: bool = False): ...
 
 
 @overload
@@ -94,7 +207,8 @@ def Bean(func_or_name: Callable[..., T]): ...
 
 
 @no_type_check
-def Bean(func_or_name: str | Callable[..., T]) -> Callable[..., T]:
+def Bean(func_or_name: str | Callable[..., T] | None = None, *, scope: BeanScope = 'singleton',
+         lazy: bool = False, primary: bool = False) -> Callable[..., T]:
     """A decorator, will collect the return value of the func decorated by Bean
     # Example
     1. collect by `type`
@@ -122,6 +236,13 @@ def Bean(func_or_name: str | Callable[..., T]) -> Callable[..., T]:
     def _():
         return User(name='zs', age=21)
     ```
+
+    3. scope, lazy and primary, see `Injectable`
+    ```python
+    @Bean(scope=pooled(4))
+    def _() -> sqlite3.Connection:
+        return sqlite3.connect('app.db', check_same_thread=False)
+    ```
     """
     app_record = app_store.get_or_raise(get_call_filename())
 
@@ -130,32 +251,104 @@ def Bean(func_or_name: str | Callable[..., T]) -> Callable[..., T]:
         return func_or_name
     else:
         def wrapper(func: Callable[..., T]):
-            collect_bean(app_record, func, func_or_name)
+            collect_bean(app_record, func, func_or_name, scope, lazy, primary)
             return func
         return wrapper
 
 
+def add_scoped_dep(app_record: AppRecord, key: tuple, scope: BeanScope, factory: Callable[[], Any],
+                   add: Callable[[Any], None], lazy: bool = False):
+    """instances of non-singleton and lazy dependencies are created when they're used, DepStore holds their holders"""
+    if lazy:
+        if scope != 'singleton':
+            raise InjectFailException(f'Dependency {format_dep_key(key)} of scope {scope!r} is always lazy')
+        dep = LazyDep(key, factory)
+        app_record.lazy_deps.append(dep)
+        return add(dep)
+    scoped = ScopedDep(key, scope, factory)
+    if scope == 'request' or scoped.pool is not None:
+        app_record.request_scope = True
+    add(scoped)
+
+
+def run_or_defer(app_record: AppRecord, key: tuple, requires: list[tuple[type, str | None]], build: Callable[[], Any]):
+    """build the dependency now, or at startup if it requires dependencies provided at startup"""
+    if app_record.lifecycle is None:
+        build()
+    else:
+        app_record.lifecycle.run_or_defer(key, requires, build)
+
+
 # ---------------------------------------------------- Injectable ---------------------------------------------------- #
-def inject_init_deps_and_get_instance(app_record: AppRecord, cls: type[T]) -> T:
-    """_inject cls's __init__ params and get params deps"""
+def get_init_params(cls: type) -> list[Parameter]:
+    """cls's __init__ params without self, *args and **kwargs"""
     old_params = list(signature(cls.__init__).parameters.values())[1:]  # self
-    new_params = [
+    return [
         i for i in old_params if i.kind not in (Parameter.VAR_KEYWORD, Parameter.VAR_POSITIONAL)
     ]  # *args、**kwargs
-    return cls(**inject_params_deps(app_record, new_params))
 
 
-def collect_dep(app_record: AppRecord, cls: type, name: str | None = None):
+def inject_init_deps_and_get_instance(app_record: AppRecord, cls: type[T]) -> T:
+    """_inject cls's __init__ params and get params deps"""
+    return cls(**inject_params_deps(app_record, get_init_params(cls)))
+
+
+def collect_dep(app_record: AppRecord, cls: type, name: str | None = None, scope: BeanScope = 'singleton',
+                lazy: bool = False, primary: bool = False):
     """init class decorated by Inject decorator and collect it's instance as dependency"""
     if hasattr(cls.__init__, '__globals__'):
         # avoid error when getting cls in __init__ method
         cls.__init__.__globals__[cls.__name__] = cls
-    instance = inject_init_deps_and_get_instance(app_record, cls)
-    dep_store.add_dep(cls, name, instance)
+    requires = get_params_requires(get_init_params(cls))
+
+    def add(instance, injected: list[tuple[type, str | None]] | None = None):
+        dep_store.add_dep(cls, name, instance, primary)
+        if app_record.lifecycle is not None:
+            app_record.lifecycle.record((cls, name), requires, instance, injected)
+        if app_record.recorder is not None:
+            app_record.recorder.add_bean(format_dep_key((cls, name)), cls.__module__)
+
+    def build():
+        with profile_span(app_record.profiler, f'injectable {cls.__module__}.{cls.__qualname__}', 'bean', dep_name=name):
+            instance = inject_init_deps_and_get_instance(app_record, cls)
+        add(instance)
+        return instance
+
+    if scope != 'singleton' or lazy:
+        if iscoroutinefunction(getattr(cls, ASYNC_INIT_HOOK, None)):
+            raise InjectFailException(f'Scoped or lazy Injectable {cls.__qualname__} can\'t have {ASYNC_INIT_HOOK}')
+        add_scoped_dep(app_record, (cls, name), scope,
+                       lambda: inject_init_deps_and_get_instance(app_record, cls), add, lazy)
+        return
+
+    if iscoroutinefunction(getattr(cls, ASYNC_INIT_HOOK, None)):
+        # constructed and initialized at startup
+        lifecycle = cast(Lifecycle, app_record.lifecycle)
+
+        async def start():
+            while True:
+                try:
+                    with lifecycle.building() as injected:
+                        instance = inject_init_deps_and_get_instance(app_record, cls)
+                    break
+                except DeferBuild as e:
+                    await lifecycle.wait_ready(e.key)
+            await getattr(instance, ASYNC_INIT_HOOK)()
+            add(instance, injected)
+
+        lifecycle.add(StartupProvider((cls, name), requires, start))
+        return
+
+    run = partial(run_or_defer, app_record, (cls, name), requires, build)
+    if app_record.graph is not None and not app_record.graph.sealed:
+        app_record.graph.add(Provider((cls, name), requires, run))
+    else:
+        run()
 
 
 @overload
-def Injectable(class_or_name: str): ...
+def Injectable(class_or_name: str | None = None, *, scope: BeanScope = 'singleton', lazy: bool = False,
+               primary: bool = False): ...
 
 
 @overload
@@ -163,7 +356,8 @@ def Injectable(class_or_name: type[T]): ...
 
 
 @no_type_check
-def Injectable(class_or_name: str | type[T]) -> type[T]:
+def Injectable(class_or_name: str | type[T] | None = None, *, scope: BeanScope = 'singleton',
+               lazy: bool = False, primary: bool = False) -> type[T]:
     """decorate a class and collect it's instance as a dependency
     # Example
     ```python
@@ -174,6 +368,40 @@ def Injectable(class_or_name: str | type[T]) -> type[T]:
     class Bar:...
     ```
 
+    scope:
+    - singleton: one instance, the default
+    - prototype: a new instance for each injection
+    - request: one instance for each request, closed when the request ends
+    - thread: one instance for each thread
+    - pooled(max_size): at most max_size instances, checked out once for each request,
+      or explicitly by `pool_of(Parser).checkout()` / `acheckout()`
+
+    Non-singleton ones are injected as proxies resolved when used, except prototype.
+    ```python
+    @Injectable(scope='thread')
+    class Parser:...
+
+    @Injectable('parser1', scope=pooled(4))
+    class Parser1:...
+    ```
+
+    lazy: a singleton built when it's used first, injected as a proxy before that
+    ```python
+    @Injectable(lazy=True)
+    class AdminReportService:...
+    ```
+
+    Dependencies are also injected by their base classes, include Protocol and ABC.
+    primary: chosen when the base class has other candidates
+    ```python
+    @Injectable(primary=True)
+    class LocalCache(AbstractCache):...
+
+    @Injectable
+    class SqliteCache(AbstractCache):...
+
+    cache = Inject(AbstractCache)  # LocalCache
+    ```
     """
     app_record = app_store.get_or_raise((get_call_filename()))
     if isclass(class_or_name):
@@ -182,7 +410,7 @@ def Injectable(class_or_name: str | type[T]) -> type[T]:
     else:
 
         def wrapper(cls: type[T]):
-            collect_dep(app_record, cls, class_or_name)
+            collect_dep(app_record, cls, class_or_name, scope, lazy, primary)
             return cls
 
         return wrapper
@@ -254,6 +482,14 @@ class Inject(Generic[T], metaclass=AtUsable):
         cls.latest_named_deps_record.update({filename: None})  # set name None
         return res
 
+    @classmethod
+    def aget(cls, tp: type[T], name: str | None = None) -> Awaitable[T]:
+        """await Inject.aget(Type, name = None), wait for the dependency without blocking the event loop,
+        e.g. in Lifespan or async endpoints, dependencies provided at startup are returned once they're ready
+        """
+        app_record = app_store.get_or_raise(get_call_filename())
+        return _ainject(app_record, tp, name)
+
     @classmethod
     def Qualifier(cls, name: str):
         """Inject.Qualifier(name)"""
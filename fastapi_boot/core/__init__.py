@@ -16,6 +16,7 @@ from .helper import (
     HTTPMiddleware,
     Lazy
 )
+from .scope import pooled, pool_of, RequestScopeMiddleware
 from .routing import (
     Controller,
     Delete,
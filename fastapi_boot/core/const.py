@@ -1,10 +1,23 @@
+import asyncio
+import sys
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 import threading
+from time import monotonic
 from threading import Lock
-from typing import Generic, TypeVar
+from collections.abc import Iterable
+from typing import Any, Generic, TypeVar
 
 
-from .model import AppNotFoundException, AppRecord, DependencyDuplicatedException
+from .graph import format_dep_key
+from .model import (
+    AppNotFoundException,
+    AppRecord,
+    DependencyAmbiguousException,
+    DependencyDuplicatedException,
+    DependencyFrozenException,
+)
+from .proxy import DepHolder
 
 T = TypeVar('T')
 
@@ -22,26 +35,84 @@ USE_DEP_PREFIX_IN_ENDPOINT = 'fastapi_boot__use_dep_prefix'
 USE_MIDDLEWARE_FIELD_PLACEHOLDER = 'fastapi_boot__use_middleware_field_placeholder'
 
 
+# async init hook of Injectable, awaited at startup
+ASYNC_INIT_HOOK = '__ainit__'
+
+
 class BlankPlaceholder:
     ...
 
 # ------------------------------------------------------- store ------------------------------------------------------ #
 
 
+# bases defined in these packages are never indexed, e.g. a bool isn't injected for int, nor a dict subclass for dict
+INDEX_SKIP_PACKAGES = frozenset({
+    *sys.stdlib_module_names, 'builtins', 'typing_extensions',
+    'pydantic', 'pydantic_core', 'fastapi', 'starlette', 'fastapi_boot',
+})
+
+
+def get_index_bases(tp: Any) -> list[type]:
+    """user defined bases of tp in MRO, include declared Protocol and ABC bases"""
+    return [
+        b for b in getattr(tp, '__mro__', ())[1:]
+        if getattr(b, '__module__', 'builtins').split('.')[0] not in INDEX_SKIP_PACKAGES
+    ]
+
+
+class AmbiguousDep(DepHolder):
+    """indexed by a base class with more than one candidate and no single primary one, raises when injected"""
+
+    def __init__(self, key: tuple[type, str | None], types: list[type], primaries: int):
+        self.key = key
+        self.types = types
+        self.primaries = primaries
+
+    def inject(self) -> Any:
+        candidates = ', '.join(format_dep_key((tp, self.key[1])) for tp in self.types)
+        hint = 'more than one of them are primary' if self.primaries else 'mark one of them primary=True'
+        raise DependencyAmbiguousException(
+            f'Dependency {format_dep_key(self.key)} is ambiguous, candidates: {candidates}, {hint}, or inject the exact type')
+
+
 @dataclass
 class DepStore(Generic[T]):
     # {type: instance}
     type_deps: dict[type[T], T] = field(default_factory=dict)
     # {type: {name: instance}}
     name_deps: dict[type[T], dict[str, T]] = field(default_factory=dict)
+    # {(type, name): event}, set by add_dep when the dependency is provided
+    waiters: dict[tuple[type[T], str | None], threading.Event] = field(default_factory=dict)
+    # {(type, name): [(loop, future)]}, coroutines waiting in event loops
+    async_waiters: dict[tuple[type[T], str | None], list[tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = \
+        field(default_factory=dict)
     # thread lock
     lock: Lock = field(default_factory=threading.Lock)
+    # ({type: instance}, {type: {name: instance}}) compiled by freeze, never mutated once published,
+    # a late registration publishes new copies, so reads need no lock
+    frozen: tuple[dict[type[T], T], dict[type[T], dict[str, T]]] | None = None
+    # accept registrations after freeze
+    allow_late: bool = True
+    # keys which may be registered after freeze even if allow_late is False, e.g. provided at startup
+    reserved: frozenset[tuple[type[T], str | None]] = frozenset()
+    # {(base, name): [(type, instance, primary)]}, dependencies whose MRO contains base
+    candidates: dict[tuple[type, str | None], list[tuple[type, T, bool]]] = field(default_factory=dict)
+    # base ==> the only candidate, the primary one, or AmbiguousDep; exact types above win
+    base_type_deps: dict[type, T] = field(default_factory=dict)
+    base_name_deps: dict[type, dict[str, T]] = field(default_factory=dict)
+    # scanned modules not imported yet, and importing threads waiting in wait_dep; before freeze a base class only
+    # matches once all of them wait, so that an exact type provided later by one of them isn't shadowed
+    importing: int = 0
+    importing_waits: int = 0
+    local: threading.local = field(default_factory=threading.local)
+    # increased by clear, which releases waiters of the previous app
+    generation: int = 0
 
     def add_dep_by_type(self, tp: type[T], ins: T):
-        if tp in self.type_deps:
-            raise DependencyDuplicatedException(
-                f'Dependency of "{tp.__name__}" is duplicated')
         with self.lock:
+            if tp in self.type_deps:
+                raise DependencyDuplicatedException(
+                    f'Dependency of "{tp.__name__}" is duplicated')
             self.type_deps.update({tp: ins})
 
     def add_dep_by_name(self, tp: type[T], name: str, ins: T):
@@ -53,31 +124,237 @@ class DepStore(Generic[T]):
             else:
                 name_dict.update({name: ins})
 
-    def add_dep(self, tp: type[T], name: str | None, ins: T):
+    def add_dep(self, tp: type[T], name: str | None, ins: T, primary: bool = False):
+        """
+        Args:
+            tp (type[T])
+            name (str | None)
+            ins (T)
+            primary (bool, optional): chosen when injected by a base class which has other candidates. Defaults to False.
+        """
+        if self.frozen is not None and not self.allow_late and (tp, name) not in self.reserved:
+            raise DependencyFrozenException(
+                f'Dependency {format_dep_key((tp, name))} is registered after provide_app finished, '
+                'which is rejected by provide_app(allow_late_deps=False)')
         if name is None:
             self.add_dep_by_type(tp, ins)
         else:
             self.add_dep_by_name(tp, name, ins)
+        bases = get_index_bases(tp)
+        with self.lock:
+            for base in bases:
+                self.index_base(base, name, tp, ins, primary)
+            if self.frozen is not None:
+                # copy on write
+                self.frozen = self.compile()
+        # wake up threads waiting for this dependency, or it's bases if they match now
+        self.notify(tp, name)
+        if self.frozen is not None or self.settled():
+            for base in bases:
+                self.notify(base, name)
 
-    def inject_dep(self, tp: type[T], name: str | None):
+    def index_base(self, base: type, name: str | None, tp: type[T], ins: T, primary: bool):
+        """called with lock"""
+        candidates = self.candidates.setdefault((base, name), [])
+        candidates.append((tp, ins, primary))
+        if len(candidates) == 1:
+            res = ins
+        elif len(primaries := [c for c in candidates if c[2]]) == 1:
+            res = primaries[0][1]
+        else:
+            res = AmbiguousDep((base, name), [c[0] for c in candidates], len(primaries))
         if name is None:
-            return self.type_deps.get(tp, None)
+            self.base_type_deps[base] = res
         else:
-            return self.name_deps.get(tp, {}).get(name, None)
+            self.base_name_deps.setdefault(base, {})[name] = res
+
+    def notify(self, tp: type[T], name: str | None):
+        """wake up threads and coroutines waiting for this dependency, they check it again,
+        e.g. it's provided, or it will be provided at startup
+        """
+        with self.lock:
+            event = self.waiters.pop((tp, name), None)
+            futures = self.async_waiters.pop((tp, name), [])
+        if event is not None:
+            event.set()
+        for loop, future in futures:
+            wake_future(loop, future)
+
+    def inject_dep(self, tp: type[T], name: str | None):
+        """the dependency of exactly tp, or the one indexed by it's base class tp"""
+        if (frozen := self.frozen) is not None:
+            # bases are merged into frozen tables
+            type_deps, name_deps = frozen
+            if name is None:
+                return type_deps.get(tp)
+            # no empty dict for misses
+            deps = name_deps.get(tp)
+            return None if deps is None else deps.get(name)
+        if name is None:
+            res = self.type_deps.get(tp)
+            return self.base_type_deps.get(tp) if res is None and self.settled() else res
+        deps = self.name_deps.get(tp)
+        res = None if deps is None else deps.get(name)
+        if res is None and self.settled():
+            deps = self.base_name_deps.get(tp)
+            return None if deps is None else deps.get(name)
+        return res
+
+    def settled(self) -> bool:
+        """no scanned module can provide an exact type any more, base classes match"""
+        return self.importing <= self.importing_waits
+
+    def add_imports(self, count: int):
+        with self.lock:
+            self.importing += count
+        self.wake_settled()
+
+    @contextmanager
+    def importing_module(self):
+        """the current thread imports a scanned module, counted by add_imports"""
+        self.local.importing = True
+        try:
+            yield
+        finally:
+            self.local.importing = False
+            self.add_imports(-1)
+
+    def wake_settled(self):
+        """wake up waiters of base classes once they match, they check again"""
+        with self.lock:
+            if self.frozen is not None or not self.settled():
+                return
+            keys = [k for k in (*self.waiters, *self.async_waiters) if k in self.candidates]
+        for key in keys:
+            self.notify(*key)
+
+    def compile(self) -> tuple[dict[type[T], T], dict[type[T], dict[str, T]]]:
+        """copies of dependencies with bases merged, exact types win, called with lock"""
+        name_deps = {tp: dict(deps) for tp, deps in self.base_name_deps.items()}
+        for tp, deps in self.name_deps.items():
+            name_deps.setdefault(tp, {}).update(deps)
+        return {**self.base_type_deps, **self.type_deps}, name_deps
+
+    def freeze(self, allow_late: bool = True, reserved: Iterable[tuple[type[T], str | None]] = ()):
+        """publish immutable lookup tables, read without lock; registrations after it copy them
+
+        Args:
+            allow_late (bool, optional): accept registrations after freeze, e.g. Bean in Lifespan. Defaults to True.
+            reserved (Iterable[tuple[type[T], str | None]], optional): keys accepted even if allow_late is False. Defaults to ().
+        """
+        with self.lock:
+            self.allow_late = allow_late
+            self.reserved = frozenset(reserved)
+            self.frozen = self.compile()
+
+    def wait_dep(self, tp: type[T], name: str | None, timeout: float) -> T | None:
+        """get dependency, block until it's provided or timeout
+
+        Args:
+            tp (type[T])
+            name (str | None)
+            timeout (float): max seconds to wait
+
+        Returns:
+            T | None: None if timeout
+        """
+        if (res := self.inject_dep(tp, name)) is not None:
+            return res
+        deadline = monotonic() + timeout
+        generation = self.generation
+        importing = getattr(self.local, 'importing', False)
+        if importing:
+            with self.lock:
+                self.importing_waits += 1
+            # the last importing thread starts waiting
+            self.wake_settled()
+        try:
+            while (res := self.inject_dep(tp, name)) is None and (rest := deadline - monotonic()) > 0:
+                with self.lock:
+                    # check again, add_dep may finish between the first check and acquiring the lock
+                    if (res := self.inject_dep(tp, name)) is not None or generation != self.generation:
+                        return res
+                    event = self.waiters.setdefault((tp, name), threading.Event())
+                event.wait(rest)
+            return res
+        finally:
+            if importing:
+                with self.lock:
+                    self.importing_waits -= 1
+
+    async def await_dep(self, tp: type[T], name: str | None, timeout: float) -> T | None:
+        """get dependency, wait until it's provided or timeout without blocking the event loop
+
+        Args:
+            tp (type[T])
+            name (str | None)
+            timeout (float): max seconds to wait
+
+        Returns:
+            T | None: None if timeout
+        """
+        deadline = monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        while (res := self.inject_dep(tp, name)) is None and (rest := deadline - monotonic()) > 0:
+            future = loop.create_future()
+            with self.lock:
+                # check again, add_dep may finish between the first check and acquiring the lock
+                if (res := self.inject_dep(tp, name)) is not None:
+                    return res
+                self.async_waiters.setdefault((tp, name), []).append((loop, future))
+            try:
+                await asyncio.wait_for(future, rest)
+            except asyncio.TimeoutError:
+                break
+        return res
 
     def clear(self):
         self.type_deps.clear()
         self.name_deps.clear()
+        self.candidates.clear()
+        self.base_type_deps.clear()
+        self.base_name_deps.clear()
+        with self.lock:
+            self.frozen = None
+            self.importing = 0
+            self.generation += 1
+            self.allow_late = True
+            self.reserved = frozenset()
+            # release waiters of the previous app
+            for event in self.waiters.values():
+                event.set()
+            self.waiters.clear()
+            for futures in self.async_waiters.values():
+                for loop, future in futures:
+                    wake_future(loop, future)
+            self.async_waiters.clear()
+
+
+def set_future_done(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def wake_future(loop: asyncio.AbstractEventLoop, future: asyncio.Future):
+    """wake up a coroutine waiting in the loop from any thread"""
+    try:
+        loop.call_soon_threadsafe(set_future_done, future)
+    except RuntimeError:
+        # loop is closed
+        pass
 
 
 @dataclass
 class AppStore(Generic[T]):
     app_dic: dict[str, AppRecord] = field(default_factory=dict)
+    # {filename: app_record}, memo of get_or_none
+    path_cache: dict[str, AppRecord | None] = field(default_factory=dict)
     lock: Lock = field(default_factory=threading.Lock)
 
     def add(self, path: str, app_record: AppRecord):
         with self.lock:
             self.app_dic.update({path: app_record})
+            self.path_cache.clear()
 
     def get_or_raise(self, path: str) -> AppRecord:
         if app := self.get_or_none(path):
@@ -85,13 +362,24 @@ class AppStore(Generic[T]):
         raise AppNotFoundException(f'Can"t find app of "{path}"')
 
     def get_or_none(self, path: str) -> AppRecord | None:
-        path = path[0].upper() + path[1:]
-        for k, v in self.app_dic.items():
-            if path.startswith(k):
-                return v
+        try:
+            return self.path_cache[path]
+        except KeyError:
+            pass
+        res = None
+        upper_path = path[0].upper() + path[1:]
+        with self.lock:
+            for k, v in self.app_dic.items():
+                if upper_path.startswith(k):
+                    res = v
+                    break
+            self.path_cache[path] = res
+        return res
 
     def clear(self):
-        self.app_dic.clear()
+        with self.lock:
+            self.app_dic.clear()
+            self.path_cache.clear()
 
 
 dep_store = DepStore()
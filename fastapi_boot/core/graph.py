@@ -0,0 +1,183 @@
+import threading
+from collections.abc import Callable, Hashable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from .model import DependencyCycleException, DependencyDuplicatedException, InjectFailException
+
+K = TypeVar('K', bound=Hashable)
+DepKey = tuple[Any, str | None]
+
+
+def format_dep_key(key: DepKey) -> str:
+    """(Foo, None) ==> Foo, (Foo, 'foo1') ==> Foo('foo1')"""
+    tp, name = key
+    tp_name = getattr(tp, '__name__', None) or repr(tp)
+    return tp_name if name is None else f"{tp_name}('{name}')"
+
+
+def find_impl_keys(key: DepKey, keys: Iterable[DepKey]) -> list[DepKey]:
+    """[key] if it's in keys, otherwise keys whose types have key's type as a base class, with the same name"""
+    tp, name = key
+    impls = [k for k in keys if k == key or (k[1] == name and k[0] is not tp and tp in getattr(k[0], '__mro__', ()))]
+    return [key] if key in impls else impls
+
+
+def topo_layers(nodes: Iterable[K], edges: Callable[[K], Iterable[K]]) -> list[list[K]]:
+    """Kahn's algorithm, group nodes into layers, nodes in the same layer don't depend on each other
+
+    Args:
+        nodes (Iterable[K]): nodes, the order of nodes in each layer follows this order
+        edges (Callable[[K], Iterable[K]]): node ==> nodes it depends on, nodes not in `nodes` are ignored
+
+    Returns:
+        list[list[K]]: layers, dependencies first
+    """
+    nodes = list(nodes)
+    node_set = set(nodes)
+    requires = {n: {e for e in edges(n) if e in node_set and e != n} for n in nodes}
+    layers: list[list[K]] = []
+    done: set[K] = set()
+    rest = nodes
+    while rest:
+        layer = [n for n in rest if requires[n] <= done]
+        if not layer:
+            # only cycles left, should be found by find_cycle before
+            raise DependencyCycleException(f'Dependency cycle among {rest}')
+        layers.append(layer)
+        done.update(layer)
+        rest = [n for n in rest if n not in done]
+    return layers
+
+
+@dataclass(eq=False)
+class Provider:
+    """a dependency which is recorded first and built later"""
+    key: DepKey
+    requires: list[DepKey]
+    build: Callable[[], Any]
+    built: bool = False
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+
+@dataclass
+class DependencyGraph:
+    """Collect providers while scanning, then build them in topological order.
+
+    - cycles among signature-declared requirements are reported as soon as the provider closing the cycle is added
+    - a provider is also built on demand when someone injects it before `build_all`
+    """
+    # {(type, name): provider}, in registration order
+    providers: dict[DepKey, Provider] = field(default_factory=dict)
+    # after build_all, new registrations won't be recorded as providers
+    sealed: bool = False
+    # max seconds to wait for a provider being built by another thread
+    build_timeout: float = 20
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    local: threading.local = field(default_factory=threading.local)
+
+    def add(self, provider: Provider):
+        with self.lock:
+            if provider.key in self.providers:
+                raise DependencyDuplicatedException(
+                    f'Dependency {format_dep_key(provider.key)} is duplicated')
+            self.providers.update({provider.key: provider})
+            if cycle := self.find_cycle(provider.key):
+                self.providers.pop(provider.key)
+                raise DependencyCycleException(
+                    'Dependency cycle found: ' + ' -> '.join(format_dep_key(k) for k in cycle))
+
+    def find_cycle(self, start: DepKey) -> list[DepKey] | None:
+        """find a path start -> ... -> start through providers' requirements,
+        a requirement by base class goes through each implementation, called with lock
+        """
+        path: list[DepKey] = [start]
+        visited: set[DepKey] = set()
+
+        def dfs(key: DepKey) -> bool:
+            for req in self.providers[key].requires:
+                # a decorator may require the base class it implements
+                for impl in (i for i in find_impl_keys(req, self.providers) if i != key or req == key):
+                    if impl == start:
+                        path.append(impl)
+                        return True
+                    if impl in visited:
+                        continue
+                    visited.add(impl)
+                    path.append(impl)
+                    if dfs(impl):
+                        return True
+                    path.pop()
+            return False
+
+        return path if dfs(start) else None
+
+    def has_pending(self, key: DepKey) -> bool:
+        return any(not p.built for p in self.find_providers(key))
+
+    def find_providers(self, key: DepKey) -> list[Provider]:
+        """provider of key, or providers of key's type's implementations"""
+        if (provider := self.providers.get(key)) is not None:
+            return [provider]
+        with self.lock:
+            keys = list(self.providers)
+        return [self.providers[k] for k in find_impl_keys(key, keys)]
+
+    def resolve(self, key: DepKey):
+        """build the provider of key and its requirements, do nothing if there is no such provider"""
+        if (provider := self.providers.get(key)) is None:
+            # injected by a base class, build all implementations, the store chooses one;
+            # skip the ones being built, e.g. a decorator requires the base class it implements
+            path = self.local.__dict__.get('path', [])
+            for provider in self.find_providers(key):
+                if provider.key not in path:
+                    self.resolve(provider.key)
+            return
+        if provider.built:
+            return
+        # keys being built by current thread, include Inject calls inside constructors
+        path: list[DepKey] = self.local.__dict__.setdefault('path', [])
+        if key in path:
+            cycle = path[path.index(key):] + [key]
+            raise DependencyCycleException(
+                'Dependency cycle found: ' + ' -> '.join(format_dep_key(k) for k in cycle))
+        if not provider.lock.acquire(timeout=self.build_timeout):
+            raise InjectFailException(
+                f'Timeout while waiting for {format_dep_key(key)} being built by another thread')
+        path.append(key)
+        try:
+            if provider.built:
+                return
+            for req in provider.requires:
+                self.resolve(req)
+            provider.build()
+            provider.built = True
+        finally:
+            path.pop()
+            provider.lock.release()
+
+    def layers(self) -> list[list[Provider]]:
+        """unbuilt providers grouped by topological layer"""
+        pending = {k: p for k, p in self.providers.items() if not p.built}
+        # requirements by base classes depend on their implementations
+        layers = topo_layers(pending, lambda k: [i for r in pending[k].requires for i in find_impl_keys(r, pending)])
+        return [[pending[k] for k in layer] for layer in layers]
+
+    def build_all(self, max_workers: int = 20):
+        """build all unbuilt providers layer by layer, providers in the same layer are built in parallel"""
+        try:
+            with ThreadPoolExecutor(max_workers) as executor:
+                for layer in self.layers():
+                    if len(layer) == 1:
+                        self.resolve(layer[0].key)
+                        continue
+                    # raise the first exception
+                    list(executor.map(lambda p: self.resolve(p.key), layer))
+        finally:
+            self.sealed = True
+
+    def clear(self):
+        with self.lock:
+            self.providers.clear()
+            self.sealed = False
@@ -3,18 +3,21 @@ import concurrent
 import concurrent.futures
 from contextlib import asynccontextmanager
 from dataclasses import asdict, is_dataclass
-from functools import lru_cache
+import logging
 import os
+import threading
 from collections.abc import Callable, Coroutine
 from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Protocol, TypeVar, cast, ParamSpec
-from inspect import isclass, iscoroutinefunction
+from typing import Any, Generic, Protocol, TypeVar, cast, ParamSpec
+from weakref import WeakKeyDictionary
+from inspect import Parameter, isclass, iscoroutinefunction, signature
 from pydantic import BaseModel
 
 from fastapi import Depends, FastAPI, Request, Response, WebSocket
 from starlette.middleware import _MiddlewareFactory
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from fastapi.responses import JSONResponse
 from .const import (
@@ -24,11 +27,20 @@ from .const import (
     app_store,
     dep_store,
 )
+from .graph import DependencyGraph
+from .lifecycle import Lifecycle, make_lifespan
 from .model import AppRecord, UseMiddlewareRecord
+from . import registry as registry_module
+from .profile import StartupProfiler, profile_span
+from .registry import BuildRecorder, get_registry_options, load_registry
+from .scan import SCAN_TOKENS, scan_modules
+from .scope import RequestScopeMiddleware
 from .util import get_call_filename
 
 T = TypeVar('T')
 
+profile_logger = logging.getLogger('fastapi_boot.profile')
+
 
 def use_dep(dependency: Callable[..., T | Coroutine[Any, Any, T]] | None, use_cache: bool = True) -> T:
     """Depends of FastAPI with type hint
@@ -165,6 +177,7 @@ def use_ws_middleware(
 
 DispatchFunc = Callable[[
     Request, Callable[[Request], Coroutine[Any, Any, Response]]], Any]
+ASGIDispatchFunc = Callable[[Scope, Receive, Send, ASGIApp], Coroutine[Any, Any, None]]
 P = ParamSpec('P')
 
 
@@ -172,11 +185,52 @@ class DispatchCls(Protocol):
     async def dispatch(self, request: Request, call_next: Callable): ...
 
 
-def HTTPMiddleware(dispatch: DispatchFunc | type[DispatchCls]):
-    """Add global base http middleware.
+class ASGIMiddlewareCls(Protocol):
+    def __init__(self, app: ASGIApp) -> None: ...
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None: ...
+
+
+class ASGIDispatchMiddleware:
+    """Lightweight adapter of `ASGIDispatchFunc`, only http requests go through dispatch.
+    No task group and no memory stream, so streaming responses are not buffered.
+    """
+
+    def __init__(self, app: ASGIApp, dispatch: ASGIDispatchFunc):
+        self.app = app
+        self.dispatch = dispatch
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        await self.dispatch(scope, receive, send, self.app)
+
+
+# (name, annotation) of the first three params of ASGIDispatchFunc
+ASGI_DISPATCH_PARAMS = (('scope', Scope), ('receive', Receive), ('send', Send))
+
+
+def is_asgi_dispatch(dispatch: Callable) -> bool:
+    """dispatch(scope, receive, send, call_next) or dispatch(request, call_next),
+    the first three params should be named or annotated as scope, receive and send
+    """
+    params = [p for p in signature(dispatch).parameters.values()
+              if p.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)]
+    # string annotations, e.g. with `from __future__ import annotations`
+    return len(params) >= 4 and all(p.name == name or p.annotation in (tp, name.capitalize())
+                                    for p, (name, tp) in zip(params, ASGI_DISPATCH_PARAMS))
+
+
+def HTTPMiddleware(dispatch: DispatchFunc | ASGIDispatchFunc | type[DispatchCls] | type[ASGIMiddlewareCls]):
+    """Add global http middleware.
 
     Args:
-        dispatch: Callable[[Request, Callable[[Request], Coroutine[Any, Any, Response]]], Any] or class with async `dispatch` method.
+        dispatch:
+            - Callable[[Request, Callable[[Request], Coroutine[Any, Any, Response]]], Any] or class with async `dispatch` method,
+            run by starlette's `BaseHTTPMiddleware`.
+            - Callable[[Scope, Receive, Send, ASGIApp], Coroutine[Any, Any, None]], works on scope and messages directly,
+            only called for http requests. It's first three params should be named or annotated as scope, receive and send.
+            - pure ASGI middleware class, `__init__(self, app)` and async `__call__(self, scope, receive, send)`.
     Example:
     ```python
     from collections.abc import Callable
@@ -201,27 +255,86 @@ def HTTPMiddleware(dispatch: DispatchFunc | type[DispatchCls]):
             print('after')
             print(await self.foo(1))
             return res
+
+    # pure ASGI
+    @HTTPMiddleware
+    async def timing(scope: Scope, receive: Receive, send: Send, call_next: ASGIApp):
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = [*message['headers'], (b'x-time', str(time.perf_counter() - start).encode())]
+            await send(message)
+
+        await call_next(scope, receive, send_wrapper)
+
+    @HTTPMiddleware
+    class BazMiddleware:
+        def __init__(self, app: ASGIApp):
+            self.app = app
+
+        async def __call__(self, scope: Scope, receive: Receive, send: Send):
+            await self.app(scope, receive, send)
     ```
     """
     app = app_store.get_or_raise(get_call_filename()).app
     if isclass(dispatch):
-        Cls = type('Cls', (dispatch, BaseHTTPMiddleware), {})
-        app.add_middleware(cast(_MiddlewareFactory, Cls))
+        if hasattr(dispatch, 'dispatch'):
+            Cls = type('Cls', (dispatch, BaseHTTPMiddleware), {})
+            app.add_middleware(cast(_MiddlewareFactory, Cls))
+        else:
+            app.add_middleware(cast(_MiddlewareFactory, dispatch))
+    elif is_asgi_dispatch(dispatch):
+        app.add_middleware(ASGIDispatchMiddleware, dispatch=cast(ASGIDispatchFunc, dispatch))
     else:
         app.add_middleware(BaseHTTPMiddleware, cast(Callable, dispatch))
     return dispatch
 
 
+def import_module(app_record: AppRecord, dot_path: str):
+    """import a scanned module, recorded when building registry"""
+    with dep_store.importing_module(), profile_span(app_record.profiler, dot_path, 'import'):
+        __import__(dot_path)
+    if app_record.recorder is not None:
+        app_record.recorder.add_module(dot_path)
+
+
 def provide_app(app: FastAPI, max_workers: int = 20, inject_timeout: float = 20,
-                inject_retry_step: float = 0.05, exclude_scan_paths: Iterable[str] = []) -> FastAPI:
+                inject_retry_step: float = 0.05, exclude_scan_paths: Iterable[str] = [],
+                dep_graph: bool = False, scan_filter: bool | Iterable[str] = False,
+                scan_manifest: str | None = None, scan_skip_dirs: bool = True, registry: bool = True,
+                profile: bool | str = False, close_timeout: float | None = 10,
+                close_deps: bool = False, allow_late_deps: bool = True) -> FastAPI:
     """enable scan project to collect dependencies which can't been collected automatically
 
     Args:
         app (FastAPI): FastAPI instance
         max_workers (int, optional): workers' num to scan project. Defaults to 20.
         inject_timeout (float, optional): will raise DependencyNotFoundException if time > inject_timeout. Defaults to 20.
-        inject_pause_step (float, optional): Retry interval after failing to find a dependency . Defaults to 0.05.
+        inject_retry_step (float, optional): Deprecated, injection now wakes up as soon as the dependency is provided. Defaults to 0.05.
         exclude_scan_paths (Iterable[str], optional): exclude paths to scan. Defaults to [].
+        dep_graph (bool, optional): record `Injectable` and `Bean` (with return annotation) as providers while scanning,
+            then build the rest in topological order, layer by layer, after all modules are imported.
+            A dependency cycle is reported as soon as it's found. Defaults to False.
+        scan_filter (bool | Iterable[str], optional): only import modules whose source mentions `fastapi_boot`,
+            or any of the given tokens, e.g. the module re-exporting fastapi_boot's decorators. Defaults to False.
+        scan_manifest (str | None, optional): json file caching verdicts of scan_filter by files' mtime and size,
+            None means `__pycache__/fastapi_boot_scan.json` in app's directory, '' to disable. Defaults to None.
+        scan_skip_dirs (bool, optional): don't scan `__pycache__`, node_modules, site-packages, hidden directories
+            and virtualenvs, False to scan every directory, e.g. a package of app is in a hidden directory. Defaults to True.
+        registry (bool, optional): import modules listed in `fastapi_boot_registry.py` generated by `fastapi-boot build`
+            instead of scanning, if it's built with the same options and all files are unchanged. Defaults to True.
+        profile (bool | str, optional): record time of scanning, importing each module, building each bean
+            (self time vs waiting for dependencies) and resolving / mounting each controller.
+            The report is logged by logger `fastapi_boot.profile`, a str is also the path to dump Chrome trace json. Defaults to False.
+        close_timeout (float | None, optional): max seconds to wait for each dependency's close hook at shutdown, None means no limit. Defaults to 10.
+        close_deps (bool, optional): close dependencies by `aclose()`, `__aexit__(None, None, None)` or `close()` at shutdown,
+            dependents first, independent ones concurrently. The report is logged by logger `fastapi_boot.lifecycle`. Defaults to False.
+        allow_late_deps (bool, optional): dependencies are frozen into a flat lookup table at the end,
+            accept registrations after that, e.g. Bean in Lifespan, besides the ones provided at startup. Defaults to True.
+
+    Async Bean factories and Injectable with `async def __ainit__(self)` are awaited in app's startup,
+    concurrently unless one depends on another, before `Lifespan` runs.
     Returns:
         _type_: original app
     """
@@ -234,44 +347,72 @@ def provide_app(app: FastAPI, max_workers: int = 20, inject_timeout: float = 20,
     dep_store.clear()
     # the file which provides app
     app_root_dir = os.path.dirname(provide_filepath)
-    app_record = AppRecord(app, inject_timeout, inject_retry_step)
+    app_record = AppRecord(app, inject_timeout, inject_retry_step,
+                           DependencyGraph(build_timeout=inject_timeout) if dep_graph else None)
     app_store.add(os.path.dirname(provide_filepath), app_record)
+    # async dependencies are started before user's lifespan
+    app_record.lifecycle = Lifecycle(close_timeout=close_timeout, close_enabled=close_deps)
+    app_record.lifespan = app.router.lifespan_context
+    app.router.lifespan_context = make_lifespan(app_record)
     # app's prefix in project
     proj_root_dir = os.getcwd()
     app_parts = Path(app_root_dir).parts
     proj_parts = Path(proj_root_dir).parts
     prefix_parts = app_parts[len(proj_parts):]
     # scan
-    dot_paths = []
-    for root, _, files in os.walk(app_root_dir):
-        for file in files:
-            fullpath = os.path.join(root, file)
-            if not file.endswith('.py') or fullpath == provide_filepath:
-                continue
-            dot_path = '.'.join(
-                prefix_parts +
-                Path(fullpath.replace('.py', '').replace(
-                    app_root_dir, '')).parts[1:]
-            )
-            if any(dot_path.startswith(p) for p in exclude_scan_paths):
-                continue
-            dot_paths.append(dot_path)
-    futures: list[Future] = []
-    with ThreadPoolExecutor(max_workers) as executor:
-        for dot_path in dot_paths:
-            future = executor.submit(__import__, dot_path)
-            futures.append(future)
-        concurrent.futures.wait(futures)
-        # wait all future finished
-        for future in futures:
-            try:
-                future.result()
-            except Exception as e:
-                executor.shutdown(True, cancel_futures=True)
-                raise e
+    tokens = None if scan_filter is False else SCAN_TOKENS if scan_filter is True else tuple(cast(Iterable[str], scan_filter))
+    options = get_registry_options(exclude_scan_paths, tokens, scan_skip_dirs)
+    if registry_module.building:
+        app_record.recorder = BuildRecorder(app_root_dir, options)
+    if profile is not False:
+        app_record.profiler = StartupProfiler()
+    with profile_span(app_record.profiler, 'scan', 'startup'):
+        dot_paths = load_registry(app_root_dir, options) if registry else None
+        if dot_paths is None:
+            if scan_manifest is None:
+                scan_manifest = os.path.join(app_root_dir, '__pycache__', 'fastapi_boot_scan.json')
+            app_record.scan_report = scan_modules(app_root_dir, provide_filepath, prefix_parts,
+                                                  exclude_scan_paths, tokens, scan_manifest, scan_skip_dirs)
+            dot_paths = app_record.scan_report.imported
+    with profile_span(app_record.profiler, 'import', 'startup'):
+        import_modules(app_record, dot_paths, max_workers)
+    if app_record.graph is not None:
+        with profile_span(app_record.profiler, 'build dependency graph', 'startup'):
+            app_record.graph.build_all(max_workers)
+    if app_record.request_scope:
+        # request and pooled scoped dependencies are bound to requests
+        app.add_middleware(RequestScopeMiddleware)
+    dep_store.freeze(allow_late_deps, app_record.lifecycle.pending)
+    if (profiler := app_record.profiler) is not None:
+        profiler.stopped = True
+        profile_logger.info('Startup profile:\n%s', profiler.report())
+        if isinstance(profile, str):
+            profiler.dump(profile)
     return app
 
 
+def import_modules(app_record: AppRecord, dot_paths: list[str], max_workers: int):
+    """import scanned modules in thread pool"""
+    futures: list[Future] = []
+    # base classes match once all of them are imported or waiting
+    dep_store.add_imports(len(dot_paths))
+    try:
+        with ThreadPoolExecutor(max_workers) as executor:
+            for dot_path in dot_paths:
+                future = executor.submit(import_module, app_record, dot_path)
+                futures.append(future)
+            concurrent.futures.wait(futures)
+            # wait all future finished
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    executor.shutdown(True, cancel_futures=True)
+                    raise e
+    finally:
+        dep_store.add_imports(-sum(f.cancelled() for f in futures))
+
+
 def inject_app():
     """inject app instance"""
     return app_store.get_or_raise(get_call_filename()).app
@@ -288,8 +429,8 @@ def Lifespan(func: Callable[[FastAPI], AsyncGenerator[None, None]]):
         # close db
     ```
     """
-    app_store.get_or_raise(
-        get_call_filename()).app.router.lifespan_context = asynccontextmanager(func)
+    # entered by the lifespan of provide_app, after async dependencies are started
+    app_store.get_or_raise(get_call_filename()).lifespan = asynccontextmanager(func)
     return func
 
 
@@ -347,9 +488,45 @@ def ExceptionHandler(exp: int | type[E]):
     return decorator
 
 
+class LazyAttribute(Generic[T]):
+    """non-data descriptor, the value is computed once for each instance and stored in it's __dict__,
+    so the following accesses don't call __get__ and the value goes with the instance
+    """
+
+    def __init__(self, func: Callable[[], T]):
+        self.func = func
+        self.name = ''
+        # guards values, it's never held while computing
+        self.lock = threading.Lock()
+        # instances without __dict__, e.g. with __slots__
+        self.values: WeakKeyDictionary[Any, T] = WeakKeyDictionary()
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+
+    def __get__(self, obj: Any, objtype: type | None = None) -> Any:
+        if obj is None:
+            return self
+        store = getattr(obj, '__dict__', None)
+        if store is not None and self.name in store:
+            return store[self.name]
+        if store is None:
+            with self.lock:
+                if obj in self.values:
+                    return self.values[obj]
+        # computed without lock, so that instances don't wait for each other and func can access lazy attributes,
+        # concurrent first accesses of an instance may compute it more than once, the first stored value is kept
+        value = self.func()
+        if store is not None:
+            return store.setdefault(self.name, value)
+        with self.lock:
+            return self.values.setdefault(obj, value)
+
+
 def Lazy(func: Callable[[], T]) -> T:
-    """Combination of property and lru_cache decorator.
-    Lazy inject some dependency which will be provided after scanning.
+    """Lazy inject some dependency which will be provided after scanning,
+    computed when it's accessed first, once for each instance (concurrent first accesses keep the first value).
+    For a dependency which is expensive to build, `Injectable(lazy=True)` / `Bean(lazy=True)` instead.
 
     >>> Example
 
@@ -369,4 +546,4 @@ def Lazy(func: Callable[[], T]) -> T:
             return self.bar
     ```
     """
-    return cast(T, property(lru_cache(None)(lambda _: func())))
+    return cast(T, LazyAttribute(func))
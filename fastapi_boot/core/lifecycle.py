@@ -0,0 +1,350 @@
+import asyncio
+import logging
+import threading
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from inspect import isawaitable, isclass, isfunction, ismodule
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+from .const import dep_store
+from .graph import DepKey, find_impl_keys, format_dep_key, topo_layers
+from .model import DependencyCycleException, DependencyDuplicatedException, InjectFailException
+from .proxy import DepProxy
+
+if TYPE_CHECKING:
+    from .model import AppRecord
+    from .scope import LazyDep
+
+logger = logging.getLogger('fastapi_boot.lifecycle')
+
+
+class DeferBuild(Exception):
+    """raised by injecting a dependency which is provided at startup while building another one"""
+
+    def __init__(self, key: DepKey):
+        super().__init__(f'{format_dep_key(key)} is provided at startup')
+        self.key = key
+
+
+@dataclass(eq=False)
+class StartupProvider:
+    """a dependency provided when app starts"""
+    key: DepKey
+    requires: list[DepKey]
+    start: Callable[[], Awaitable[None]]
+    done: asyncio.Event | None = None
+
+
+class StartupRef(DepProxy):
+    """returned by injecting a dependency provided at startup outside of building,
+    e.g. `Inject(Foo)` in class body of a Controller, forwards to the instance once it's started
+    """
+
+    def __init__(self, key: DepKey):
+        object.__setattr__(self, '_key', key)
+
+    def _resolve(self):
+        key: DepKey = object.__getattribute__(self, '_key')
+        if (ins := dep_store.inject_dep(*key)) is None:
+            raise InjectFailException(f'Dependency {format_dep_key(key)} is provided at startup, it is not ready yet')
+        return ins
+
+    def _dep_type(self) -> Any:
+        return object.__getattribute__(self, '_key')[0]
+
+    def __repr__(self) -> str:
+        return f'<StartupRef {format_dep_key(object.__getattribute__(self, "_key"))}>'
+
+
+def get_close_hook(instance: Any) -> Callable[[], Any] | None:
+    """aclose() > __aexit__(None, None, None) > close(), sync or async"""
+    if instance is None or isclass(instance) or isfunction(instance) or ismodule(instance):
+        return None
+    if callable(hook := getattr(instance, 'aclose', None)):
+        return hook
+    if callable(aexit := getattr(instance, '__aexit__', None)):
+        return lambda: aexit(None, None, None)
+    if callable(hook := getattr(instance, 'close', None)):
+        return hook
+    return None
+
+
+@dataclass(eq=False)
+class Closer:
+    """close hook of a provided dependency"""
+    key: DepKey
+    # declared in signature and injected while building it
+    requires: list[DepKey]
+    instance: Any
+    hook: Callable[[], Any]
+
+
+def find_held_keys(instance: Any, keys: dict[int, DepKey]) -> list[DepKey]:
+    """dependencies held by instance's attributes or it's class's, e.g. `Inject(...)` in class body
+
+    Args:
+        instance (Any)
+        keys (dict[int, DepKey]): {id(instance): key} of dependencies
+    """
+    values = list(getattr(instance, '__dict__', {}).values())
+    for cls in type(instance).__mro__[:-1]:
+        values.extend(vars(cls).values())
+    res = []
+    for value in values:
+        if type(value) is StartupRef:
+            res.append(object.__getattribute__(value, '_key'))
+        elif (key := keys.get(id(value))) is not None:
+            res.append(key)
+    return res
+
+
+@dataclass
+class CloseResult:
+    key: DepKey
+    seconds: float
+    # closed, timeout, failed
+    status: str
+    error: BaseException | None = None
+
+
+@dataclass
+class ShutdownReport:
+    results: list[CloseResult] = field(default_factory=list)
+    seconds: float = 0
+
+    def __str__(self) -> str:
+        lines = [f'Closed {len(self.results)} dependencies in {self.seconds:.3f}s']
+        for r in sorted(self.results, key=lambda r: -r.seconds):
+            error = f' {r.error!r}' if r.error is not None else ''
+            lines.append(f'  {r.seconds:8.3f}s  {format_dep_key(r.key)} {r.status}{error}')
+        return '\n'.join(lines)
+
+
+async def run_close_hook(closer: Closer, timeout: float | None) -> CloseResult:
+    """sync hooks run in threads, so that hooks in the same layer close in parallel"""
+    start = perf_counter()
+
+    async def close():
+        if asyncio.iscoroutinefunction(closer.hook):
+            return await closer.hook()
+        res = await asyncio.to_thread(closer.hook)
+        if isawaitable(res):
+            await res
+
+    try:
+        await asyncio.wait_for(close(), timeout)
+        return CloseResult(closer.key, perf_counter() - start, 'closed')
+    except asyncio.TimeoutError:
+        return CloseResult(closer.key, perf_counter() - start, 'timeout')
+    except Exception as e:
+        return CloseResult(closer.key, perf_counter() - start, 'failed', e)
+
+
+@dataclass
+class Lifecycle:
+    """Async Bean factories, Injectable with `__ainit__` and everything depending on them,
+    run concurrently in app's startup once their requirements are ready.
+    """
+    # {(type, name): provider}, in registration order
+    providers: dict[DepKey, StartupProvider] = field(default_factory=dict)
+    # keys not provided yet
+    pending: set[DepKey] = field(default_factory=set)
+    started: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # depth of building dependencies in current thread
+    local: threading.local = field(default_factory=threading.local)
+    # {(type, name): closer}, in the order dependencies were provided
+    closers: dict[DepKey, Closer] = field(default_factory=dict)
+    # max seconds to wait for each close hook, None means no limit
+    close_timeout: float | None = 10
+    # close dependencies at shutdown
+    close_enabled: bool = False
+    shutdown_report: ShutdownReport | None = None
+
+    def add(self, provider: StartupProvider):
+        with self.lock:
+            if self.started:
+                raise InjectFailException(f'Dependency {format_dep_key(provider.key)} is provided at startup, but app has started')
+            if provider.key in self.providers:
+                raise DependencyDuplicatedException(f'Dependency {format_dep_key(provider.key)} is duplicated')
+            self.providers[provider.key] = provider
+            self.pending.add(provider.key)
+        # threads waiting for it will fail or defer
+        dep_store.notify(*provider.key)
+
+    def is_pending(self, key: DepKey) -> bool:
+        """key, or an implementation of key's type, isn't provided yet"""
+        if key in self.pending:
+            return True
+        if not self.pending:
+            return False
+        with self.lock:
+            pending = list(self.pending)
+        return bool(find_impl_keys(key, pending))
+
+    @property
+    def is_building(self) -> bool:
+        return self.local.__dict__.get('depth', 0) > 0
+
+    @contextmanager
+    def building(self):
+        """while building a dependency, injecting a pending one raises DeferBuild,
+        yields keys injected meanwhile, read by `record` to order closing
+        """
+        stack: list[list[DepKey]] = self.local.__dict__.setdefault('injected', [])
+        stack.append(injected := [])
+        self.local.depth = self.local.__dict__.get('depth', 0) + 1
+        try:
+            yield injected
+        finally:
+            self.local.depth -= 1
+            stack.pop()
+
+    def add_injected(self, key: DepKey):
+        """called by injecting, key is required by the dependency being built"""
+        if self.close_enabled and (stack := self.local.__dict__.get('injected')):
+            stack[-1].append(key)
+
+    def run_or_defer(self, key: DepKey, requires: list[DepKey], build: Callable[[], Any]):
+        """build now, or at startup if it requires a pending dependency"""
+        if not any(self.is_pending(i) for i in requires):
+            try:
+                with self.building():
+                    build()
+                return
+            except DeferBuild as e:
+                requires = [*requires, e.key]
+        self.add(StartupProvider(key, requires, self.make_sync_start(build)))
+
+    def make_sync_start(self, build: Callable[[], Any]) -> Callable[[], Awaitable[None]]:
+        async def start():
+            while True:
+                try:
+                    with self.building():
+                        return build()
+                except DeferBuild as e:
+                    # injected in constructor, not declared in signature
+                    await self.wait_ready(e.key)
+
+        return start
+
+    async def wait_ready(self, key: DepKey, waiter: DepKey | None = None):
+        """wait for the provider of key, or providers of key's type's implementations except waiter itself"""
+        with self.lock:
+            keys = list(self.providers)
+        for k in find_impl_keys(key, keys):
+            if k == waiter:
+                continue
+            if (done := self.providers[k].done) is not None:
+                await done.wait()
+
+    async def run_provider(self, provider: StartupProvider):
+        for key in provider.requires:
+            await self.wait_ready(key, provider.key)
+        await provider.start()
+        with self.lock:
+            self.pending.discard(provider.key)
+        provider.done.set()  # type: ignore
+
+    def record(self, key: DepKey, requires: list[DepKey], instance: Any, injected: list[DepKey] | None = None):
+        """record the close hook of a provided dependency
+
+        Args:
+            key (DepKey)
+            requires (list[DepKey]): declared in signature
+            instance (Any)
+            injected (list[DepKey] | None, optional): injected while building it. Defaults to the ones of the current build.
+        """
+        if not self.close_enabled or (hook := get_close_hook(instance)) is None:
+            return
+        if injected is None:
+            stack = self.local.__dict__.get('injected')
+            injected = stack[-1] if stack else []
+        with self.lock:
+            self.closers[key] = Closer(key, [*requires, *injected], instance, hook)
+
+    async def shutdown(self) -> ShutdownReport:
+        """close dependencies in reverse dependency order, the ones in the same layer are closed concurrently"""
+        start = perf_counter()
+        report = self.shutdown_report = ShutdownReport()
+        with self.lock:
+            # holders of lazy and scoped dependencies may have nothing to close
+            closers = {k: c for k, c in self.closers.items() if getattr(c.instance, 'closeable', True)}
+            self.closers.clear()
+        keys = {id(c.instance): k for k, c in closers.items()}
+
+        def edges(key: DepKey) -> list[DepKey]:
+            # requirements by base classes are closed after their implementations
+            requires = [*closers[key].requires, *find_held_keys(closers[key].instance, keys)]
+            return [i for r in requires for i in find_impl_keys(r, closers) if i != key]
+
+        try:
+            layers = topo_layers(closers, edges)
+        except DependencyCycleException:
+            # instances holding each other, only requirements order closing
+            layers = topo_layers(closers, lambda k: [
+                i for r in closers[k].requires for i in find_impl_keys(r, closers) if i != k])
+        # the same instance may be provided with different names
+        closed: set[int] = set()
+        for layer in reversed(layers):
+            items = []
+            for key in layer:
+                if id(closers[key].instance) not in closed:
+                    closed.add(id(closers[key].instance))
+                    items.append(closers[key])
+            report.results.extend(await asyncio.gather(*[run_close_hook(i, self.close_timeout) for i in items]))
+        report.seconds = perf_counter() - start
+        if report.results:
+            logger.info(str(report))
+        for r in report.results:
+            if r.status != 'closed':
+                logger.warning('Fail to close %s: %s', format_dep_key(r.key), r.status if r.error is None else repr(r.error))
+        return report
+
+    async def startup(self):
+        """start providers concurrently, each one waits for it's requirements"""
+        if self.started:
+            return
+        providers = list(self.providers.values())
+        # raise DependencyCycleException
+        topo_layers([p.key for p in providers],
+                    lambda k: [i for r in self.providers[k].requires for i in find_impl_keys(r, self.providers)])
+        for provider in providers:
+            provider.done = asyncio.Event()
+        tasks = [asyncio.ensure_future(self.run_provider(p)) for p in providers]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        self.started = True
+
+
+def format_lazy_summary(deps: list['LazyDep']) -> str:
+    untouched = [format_dep_key(d.key) for d in deps if not d.built]
+    res = f'{len(deps)} lazy dependencies, {len(deps) - len(untouched)} built, {len(untouched)} untouched'
+    return res + (': ' + ', '.join(untouched) if untouched else '')
+
+
+def make_lifespan(app_record: 'AppRecord') -> Callable[[Any], AbstractAsyncContextManager]:
+    """app's lifespan, start async dependencies, enter lifespan of user, then log lazy dependencies never used
+    and close dependencies
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: Any) -> AsyncGenerator[Any, None]:
+        try:
+            if app_record.lifecycle is not None:
+                await app_record.lifecycle.startup()
+            async with app_record.lifespan(app) as state:
+                yield state
+        finally:
+            if app_record.lazy_deps:
+                logger.info(format_lazy_summary(app_record.lazy_deps))
+            if app_record.lifecycle is not None:
+                await app_record.lifecycle.shutdown()
+
+    return lifespan
@@ -1,9 +1,11 @@
 from collections.abc import Callable, Coroutine, Sequence
+from contextlib import AbstractAsyncContextManager
 from dataclasses import asdict, dataclass, field
 from enum import Enum
 from functools import wraps
 from http import HTTPMethod
-from typing import Any, Generic, Literal, Self, TypeVar
+from inspect import iscoroutinefunction
+from typing import TYPE_CHECKING, Any, Generic, Literal, Self, TypeVar
 
 from fastapi import APIRouter, FastAPI, Response, Request, WebSocket
 from fastapi.datastructures import Default
@@ -12,8 +14,17 @@ from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from fastapi.types import IncEx
 from fastapi.utils import generate_unique_id
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.routing import BaseRoute
 
+if TYPE_CHECKING:
+    from .graph import DependencyGraph
+    from .lifecycle import Lifecycle
+    from .profile import StartupProfiler
+    from .registry import BuildRecorder
+    from .scan import ScanReport
+
 T = TypeVar('T')
 HttpStrMethod = Literal[
     'GET',
@@ -187,6 +198,22 @@ class AppRecord:
     app: FastAPI
     inject_timeout: float
     inject_retry_step: float
+    # not None if dependencies are built in topological order
+    graph: 'DependencyGraph | None' = None
+    # modules imported and skipped by provide_app
+    scan_report: 'ScanReport | None' = None
+    # not None while `fastapi-boot build` is running
+    recorder: 'BuildRecorder | None' = None
+    # not None if provide_app's param profile is set
+    profiler: 'StartupProfiler | None' = None
+    # dependencies provided at startup
+    lifecycle: 'Lifecycle | None' = None
+    # lifespan of user, entered by the app's lifespan after startup of lifecycle
+    lifespan: Callable[[Any], AbstractAsyncContextManager] | None = None
+    # a request or pooled scoped dependency is registered, provide_app adds RequestScopeMiddleware
+    request_scope: bool = False
+    # lazy dependencies, the ones never used are reported at the end of provide_app
+    lazy_deps: list[Any] = field(default_factory=list)
 
     def fill_props_and_replace(self, app: FastAPI):
         vars(app).update(vars(self.app))
@@ -194,10 +221,44 @@ class AppRecord:
         return app
 
 
+def chain_http_dispatch(
+        dispatch: Callable[[Request, Callable[[Request], Coroutine[Any, Any, Response]]], Any],
+        call_next: Callable[[Request], Coroutine[Any, Any, Response]]
+):
+    """wrap call_next with dispatch"""
+    async def handler(request: Request) -> Response:
+        return await dispatch(request, call_next)
+    return handler
+
+
+def lookup_exception_handler(request: Request, exc: Exception) -> Callable[[Request, Exception], Any] | None:
+    """handler of exc registered in the app, by status code of HTTPException first, then by exc's MRO"""
+    handlers, status_handlers = request.scope.get('starlette.exception_handlers', ({}, {}))
+    if isinstance(exc, StarletteHTTPException) and (handler := status_handlers.get(exc.status_code)) is not None:
+        return handler
+    return next((handlers[cls] for cls in type(exc).__mro__ if cls in handlers), None)
+
+
+def handle_route_exceptions(call_next: Callable[[Request], Coroutine[Any, Any, Response]]):
+    """convert exceptions which the app handles into responses, e.g. HTTPException and RequestValidationError,
+    so call_next of http dispatches returns a response for them as app-wide middlewares get,
+    the others are raised
+    """
+    async def handler(request: Request) -> Response:
+        try:
+            return await call_next(request)
+        except Exception as e:
+            if (exc_handler := lookup_exception_handler(request, e)) is None:
+                raise
+            if iscoroutinefunction(exc_handler):
+                return await exc_handler(request, e)
+            return await run_in_threadpool(exc_handler, request, e)
+    return handler
+
+
 @dataclass
 class UseMiddlewareRecord:
     """use_middleware record in controller"""
-    http_urls_methods: list[tuple[str, str]] = field(default_factory=list)
     http_dispatches: list[Callable[[Request, Callable[[
         Request], Coroutine[Any, Any, Response]]], Any]] = field(default_factory=list)
     ws_dispatches: list[Callable[[WebSocket, Callable[[
@@ -205,24 +266,21 @@ class UseMiddlewareRecord:
     # ws_dispatches only be called if ws_only_message and message's type == 'websocket.send'
     ws_only_message: bool = False
 
-    def add_http_middleware(self, app: FastAPI):
-        """add midleware to app"""
-        if not self.http_dispatches:
-            return
+    def build_route_class(self, base: type[APIRoute] = APIRoute) -> type[APIRoute]:
+        """route class whose handler is wrapped by http_dispatches, the last dispatch is the outermost.
+        The chain is built once when the route is created, other routes are not affected.
+        Exceptions of the endpoint and it's dependencies which the app handles reach dispatches as responses.
+        """
+        dispatches = tuple(self.http_dispatches)
 
-        async def wrapper(request: Request, call_next: Callable[[Request], Coroutine[Any, Any, Any]]):
-            if (request.url.path, request.method) in self.http_urls_methods:
-                for func in self.http_dispatches:
-                    # "call_next" default param ==> save call_next of each loop to avoid "maximum recursion depth exceeded".
-                    # "func" default params ==> save "func" of each loop to avoid repeatation of last func.
-                    async def temp1(request, call_next=call_next, func=func):
-                        async def temp2(request):
-                            return await call_next(request)
-                        return await func(request, temp2)
-                    call_next = temp1
-            # if no matched middleware, just call original call_next, else call the accural call_next.
-            return await call_next(request)
-        app.middleware('http')(wrapper)
+        class MiddlewareRoute(base):
+            def get_route_handler(self):
+                handler = handle_route_exceptions(super().get_route_handler())
+                for dispatch in dispatches:
+                    handler = chain_http_dispatch(dispatch, handler)
+                return handler
+
+        return MiddlewareRoute
 
     def add_ws_middleware(self, websocket: WebSocket):
         if not self.ws_dispatches:
@@ -265,5 +323,25 @@ class DependencyDuplicatedException(Exception):
     """dependency duplicated"""
 
 
+class DependencyCycleException(Exception):
+    """dependency cycle"""
+
+
+class DependencyAmbiguousException(Exception):
+    """more than one dependency match a base class"""
+
+
 class AppNotFoundException(Exception):
     """app not found"""
+
+
+class DependencyFrozenException(Exception):
+    """dependency registered after dependencies are frozen"""
+
+
+class ScopeNotActiveException(Exception):
+    """scoped dependency is used outside of it's scope"""
+
+
+class PoolExhaustedException(Exception):
+    """no pooled instance available"""
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+from collections.abc import Generator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any
+
+
+@dataclass
+class Span:
+    name: str
+    # import, bean, controller.resolve, controller.mount, wait, startup
+    cat: str
+    start: float
+    tid: int
+    end: float = 0
+    # seconds of nested `wait` spans, the time blocked on dependencies provided by other threads
+    wait: float = 0
+    args: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class StartupProfiler:
+    """Spans recorded by provide_app when it's param `profile` is set
+
+    ```python
+    # the report is logged by logger `fastapi_boot.profile`,
+    # open the trace in chrome://tracing or https://ui.perfetto.dev
+    app = provide_app(FastAPI(), profile='startup-trace.json')
+    ```
+    """
+    origin: float = field(default_factory=perf_counter)
+    spans: list[Span] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    local: threading.local = field(default_factory=threading.local)
+    # provide_app finished, nothing will be recorded
+    stopped: bool = False
+
+    @contextmanager
+    def span(self, name: str, cat: str, **args) -> Generator[Span, None, None]:
+        span = Span(name, cat, perf_counter(), threading.get_ident(), args=args)
+        stack: list[Span] = self.local.__dict__.setdefault('stack', [])
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            span.end = perf_counter()
+            stack.pop()
+            if cat == 'wait' and stack:
+                stack[-1].wait += span.duration
+            with self.lock:
+                self.spans.append(span)
+
+    def report(self, limit: int = 10) -> str:
+        """slowest spans of each category, categories are sorted by total time"""
+        with self.lock:
+            spans = list(self.spans)
+        cats: dict[str, list[Span]] = {}
+        for span in spans:
+            cats.setdefault(span.cat, []).append(span)
+        lines = []
+        for cat, items in sorted(cats.items(), key=lambda i: -sum(s.duration for s in i[1])):
+            items.sort(key=lambda s: -s.duration)
+            total = sum(s.duration for s in items)
+            lines.append(f'{cat}: {len(items)} spans, {total:.3f}s')
+            for s in items[:limit]:
+                detail = f' (self {s.duration - s.wait:.3f}s, wait {s.wait:.3f}s)' if s.wait else ''
+                lines.append(f'  {s.duration:8.3f}s  {s.name}{detail}')
+        return '\n'.join(lines)
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """Trace Event Format, complete events in microseconds"""
+        pid = os.getpid()
+        with self.lock:
+            spans = list(self.spans)
+        return {'traceEvents': [
+            dict(name=s.name, cat=s.cat, ph='X', pid=pid, tid=s.tid,
+                 ts=round((s.start - self.origin) * 1e6), dur=round(s.duration * 1e6),
+                 args={**s.args, 'wait_ms': round(s.wait * 1e3, 3)})
+            for s in sorted(spans, key=lambda s: s.start)
+        ]}
+
+    def dump(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def profile_span(profiler: StartupProfiler | None, name: str, cat: str, **args) -> AbstractContextManager:
+    """span of profiler, do nothing if profiler is None"""
+    return nullcontext() if profiler is None or profiler.stopped else profiler.span(name, cat, **args)
@@ -0,0 +1,115 @@
+import operator
+from collections.abc import Callable
+from typing import Any
+
+
+class DepHolder:
+    """held by DepStore instead of an instance, `inject()` is returned by injection"""
+    key: tuple[Any, str | None]
+
+    def inject(self) -> Any:
+        raise NotImplementedError
+
+    @property
+    def closeable(self) -> bool:
+        """whether `aclose()` has something to close at shutdown"""
+        return False
+
+
+def forward(func: Callable[..., Any]) -> Callable[..., Any]:
+    """special method calling func with the resolved instance, python looks them up on the type, not __getattr__"""
+    def method(self: 'DepProxy', *args):
+        return func(self._resolve(), *args)
+
+    return method
+
+
+def forward_reflected(func: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    """reflected operator, e.g. __radd__ for `1 + proxy`"""
+    def method(self: 'DepProxy', other: Any):
+        return func(other, self._resolve())
+
+    return method
+
+
+def call_special(name: str) -> Callable[..., Any]:
+    return lambda ins, *args: getattr(type(ins), name)(ins, *args)
+
+
+class DepProxy:
+    """injected in place of a dependency which can't be provided right now, forwards to `_resolve()`
+
+    - as a class attribute, e.g. in class body of a Controller, it's replaced by the instance when accessed from instances
+    - otherwise attributes, calls, `with` / `async with`, containers, iteration, operators, `bool`, `str`, `==`
+      and `hash` are forwarded, `isinstance` checks the dependency's type without resolving
+    """
+
+    def _resolve(self) -> Any:
+        raise NotImplementedError
+
+    def _dep_type(self) -> Any:
+        """type of the dependency, used by `isinstance`"""
+        return None
+
+    @property
+    def __class__(self):  # type: ignore
+        tp = self._dep_type()
+        return tp if isinstance(tp, type) else type(self)
+
+    def __get__(self, obj, objtype=None):
+        return self if obj is None else self._resolve()
+
+    def __getattr__(self, name: str):
+        # probed by python and fastapi_boot, e.g. hasattr(v, REQ_DEP_PLACEHOLDER) in Controller
+        if name.startswith(('__', 'fastapi_boot')):
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._resolve(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    __enter__ = forward(call_special('__enter__'))
+    __exit__ = forward(call_special('__exit__'))
+    __aenter__ = forward(call_special('__aenter__'))
+    __aexit__ = forward(call_special('__aexit__'))
+    __len__ = forward(len)
+    __iter__ = forward(iter)
+    __next__ = forward(next)
+    __aiter__ = forward(call_special('__aiter__'))
+    __anext__ = forward(call_special('__anext__'))
+    __contains__ = forward(operator.contains)
+    __getitem__ = forward(operator.getitem)
+    __setitem__ = forward(operator.setitem)
+    __delitem__ = forward(operator.delitem)
+    __bool__ = forward(bool)
+    __str__ = forward(str)
+    __int__ = forward(int)
+    __float__ = forward(float)
+    __index__ = forward(operator.index)
+    __hash__ = forward(hash)
+    __eq__ = forward(operator.eq)
+    __ne__ = forward(operator.ne)
+    __lt__ = forward(operator.lt)
+    __le__ = forward(operator.le)
+    __gt__ = forward(operator.gt)
+    __ge__ = forward(operator.ge)
+    __neg__ = forward(operator.neg)
+    __pos__ = forward(operator.pos)
+    __abs__ = forward(abs)
+    __invert__ = forward(operator.invert)
+    __add__, __radd__ = forward(operator.add), forward_reflected(operator.add)
+    __sub__, __rsub__ = forward(operator.sub), forward_reflected(operator.sub)
+    __mul__, __rmul__ = forward(operator.mul), forward_reflected(operator.mul)
+    __matmul__, __rmatmul__ = forward(operator.matmul), forward_reflected(operator.matmul)
+    __truediv__, __rtruediv__ = forward(operator.truediv), forward_reflected(operator.truediv)
+    __floordiv__, __rfloordiv__ = forward(operator.floordiv), forward_reflected(operator.floordiv)
+    __mod__, __rmod__ = forward(operator.mod), forward_reflected(operator.mod)
+    __pow__, __rpow__ = forward(operator.pow), forward_reflected(operator.pow)
+    __lshift__, __rlshift__ = forward(operator.lshift), forward_reflected(operator.lshift)
+    __rshift__, __rrshift__ = forward(operator.rshift), forward_reflected(operator.rshift)
+    __and__, __rand__ = forward(operator.and_), forward_reflected(operator.and_)
+    __or__, __ror__ = forward(operator.or_), forward_reflected(operator.or_)
+    __xor__, __rxor__ = forward(operator.xor), forward_reflected(operator.xor)
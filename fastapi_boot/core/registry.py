@@ -0,0 +1,145 @@
+import logging
+import os
+import runpy
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pprint import pformat
+from typing import Any
+
+from .scan import REGISTRY_FILENAME, is_skipped_dir, walk_py_files
+
+logger = logging.getLogger('fastapi_boot.scan')
+
+REGISTRY_VERSION = 3
+
+REGISTRY_TEMPLATE = '''# Generated by `fastapi-boot build`, don't edit.
+# Loaded by provide_app instead of scanning while files and directories below are unchanged,
+# run the command again after editing.
+VERSION = {version}
+
+# provide_app's options which affect scanning
+OPTIONS = {options}
+
+# modules in the order their imports finished
+MODULES = {modules}
+
+# (dependency, module) in the order they were provided, modules which provide dependencies are imported first
+BEANS = {beans}
+
+# {{path relative to app's directory: [mtime_ns, size]}} of all scanned files
+FILES = {files}
+
+# {{path relative to app's directory: .py files and subdirectories}} of directories which have scanned files,
+# files added to or removed from them make the registry stale
+DIRS = {dirs}
+'''
+
+# set by `fastapi-boot build`, provide_app records instead of loading the registry
+building = False
+
+
+@dataclass
+class BuildRecorder:
+    """what provide_app does while scanning, written as the registry by `fastapi-boot build`"""
+    app_root_dir: str
+    options: dict[str, Any]
+    modules: list[str] = field(default_factory=list)
+    beans: list[tuple[str, str]] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add_module(self, dot_path: str):
+        with self.lock:
+            self.modules.append(dot_path)
+
+    def add_bean(self, dep: str, module: str):
+        with self.lock:
+            self.beans.append((dep, module))
+
+
+def get_registry_options(exclude_scan_paths: Iterable[str], tokens: Iterable[str] | None,
+                         skip_dirs: bool = True) -> dict[str, Any]:
+    return dict(exclude_scan_paths=sorted(exclude_scan_paths), tokens=None if tokens is None else sorted(tokens),
+                skip_dirs=skip_dirs)
+
+
+def list_entries(dirpath: str, skip_dirs: bool) -> list[str]:
+    """names of .py files and subdirectories which would be scanned"""
+    res = []
+    with os.scandir(dirpath) as it:
+        for entry in it:
+            if entry.is_dir():
+                if not (skip_dirs and is_skipped_dir(dirpath, entry.name)):
+                    res.append(entry.name + '/')
+            elif entry.name.endswith('.py') and entry.name != REGISTRY_FILENAME:
+                res.append(entry.name)
+    return sorted(res)
+
+
+def snapshot_files(app_root_dir: str, skip_dirs: bool = True) -> tuple[dict[str, list[int]], dict[str, list[str]]]:
+    """scanned files and entries of their directories, walks the tree when building"""
+    files = {}
+    dirs = {}
+    for fullpath in walk_py_files(app_root_dir, skip_dirs):
+        stat = os.stat(fullpath)
+        files[os.path.relpath(fullpath, app_root_dir)] = [stat.st_mtime_ns, stat.st_size]
+        dirname = os.path.dirname(fullpath)
+        while (rel := os.path.relpath(dirname, app_root_dir)) not in dirs:
+            dirs[rel] = list_entries(dirname, skip_dirs)
+            if rel == '.':
+                break
+            dirname = os.path.dirname(dirname)
+    return files, dirs
+
+
+def is_unchanged(app_root_dir: str, files: dict[str, list[int]], dirs: dict[str, list[str]], skip_dirs: bool) -> bool:
+    """stat recorded files and list recorded directories only, without walking the tree"""
+    try:
+        return all([(stat := os.stat(os.path.join(app_root_dir, rel))).st_mtime_ns, stat.st_size] == entry
+                   for rel, entry in files.items()) and \
+            all(list_entries(os.path.join(app_root_dir, rel), skip_dirs) == entries for rel, entries in dirs.items())
+    except OSError:
+        return False
+
+
+def order_modules(modules: list[str], beans: list[tuple[str, str]]) -> list[str]:
+    """modules which provide dependencies first, in the order they provided them, then the others"""
+    res = dict.fromkeys(module for _, module in beans if module in modules)
+    res.update(dict.fromkeys(modules))
+    return list(res)
+
+
+def write_registry(recorder: BuildRecorder) -> str:
+    """write the registry into app's directory, return it's path"""
+    path = os.path.join(recorder.app_root_dir, REGISTRY_FILENAME)
+    files, dirs = snapshot_files(recorder.app_root_dir, recorder.options['skip_dirs'])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(REGISTRY_TEMPLATE.format(
+            version=REGISTRY_VERSION,
+            options=pformat(recorder.options),
+            modules=pformat(recorder.modules),
+            beans=pformat(recorder.beans),
+            files=pformat(files),
+            dirs=pformat(dirs),
+        ))
+    return path
+
+
+def load_registry(app_root_dir: str, options: dict[str, Any]) -> list[str] | None:
+    """modules to import recorded by `fastapi-boot build`, None if there is no registry or it's stale"""
+    path = os.path.join(app_root_dir, REGISTRY_FILENAME)
+    if building or not os.path.isfile(path):
+        return None
+    try:
+        registry = runpy.run_path(path)
+    except Exception as e:
+        logger.warning('Fail to load registry %s: %r', path, e)
+        return None
+    if registry.get('VERSION') != REGISTRY_VERSION or registry.get('OPTIONS') != options:
+        logger.warning('Registry %s is built with other options, scan instead', path)
+        return None
+    if not is_unchanged(app_root_dir, registry['FILES'], registry['DIRS'], options['skip_dirs']):
+        logger.warning('Registry %s is stale, scan instead, run `fastapi-boot build` again', path)
+        return None
+    logger.info('Loaded %d modules from registry %s', len(registry['MODULES']), path)
+    return order_modules(registry['MODULES'], registry['BEANS'])
@@ -1,7 +1,9 @@
 from collections.abc import Callable, Sequence
+from contextvars import ContextVar
 from enum import Enum
 from functools import reduce, wraps
-from inspect import Parameter, getmembers, iscoroutinefunction, signature
+from inspect import Parameter, getmembers, isclass, iscoroutinefunction, signature
+from types import MethodType
 from typing import Any, Generic, TypeVar
 
 from fastapi import APIRouter, Response, params, WebSocket as FastAPIWebSocket
@@ -33,10 +35,13 @@ from .model import (
 )
 from .model import SpecificHttpRouteItemWithoutEndpointAndMethods as SM
 from .model import WebSocketRouteItem, WebSocketRouteItemWithoutEndpoint
+from .profile import profile_span
+from .scope import find_pooled_deps
 from .util import get_call_filename
 
 
 T = TypeVar('T', bound=Callable)
+V = TypeVar('V')
 
 
 def trans_path(path: str) -> str:
@@ -54,14 +59,41 @@ def trans_path(path: str) -> str:
 
 # ---------------------------------------------------- Controller ---------------------------------------------------- #
 
+class UseDepAttr(Generic[V]):
+    """Descriptor which replaces a use_dep classvar of controller.
+    The value is stored in a ContextVar, so each request reads it's own value from the shared controller instance.
+    """
+
+    def __init__(self, name: str, dependency: Any):
+        self.name = name
+        # original value of use_dep, returned when accessed from class
+        self.dependency = dependency
+        self.var: ContextVar[V] = ContextVar(f'fastapi_boot__use_dep__{name}')
+
+    def __get__(self, instance: Any, owner: type | None = None) -> V:
+        if instance is None:
+            return self.dependency
+        try:
+            return self.var.get()
+        except LookupError:
+            raise AttributeError(
+                f"use_dep field '{self.name}' can only be accessed while handling a request") from None
+
+    def __set__(self, instance: Any, value: V):
+        self.var.set(value)
+
+
 def get_use_result(cls: type[T]):
+    """collect use_dep and use_middleware of cls, replace use_dep classvars with UseDepAttr"""
     use_dep_dict = {}
     cls_anno: dict = cls.__dict__.get('__annotations__', {})
     use_middleware_records: list[UseMiddlewareRecord] = []
     for k, v in getmembers(cls):
         # use_dep
         if hasattr(v, REQ_DEP_PLACEHOLDER):
-            use_dep_dict.update({k: (cls_anno.get(k), v)})
+            attr = UseDepAttr(k, v)
+            setattr(cls, k, attr)
+            use_dep_dict.update({k: (cls_anno.get(k), v, attr)})
         # collect use_middleware's value
         elif (
                 isinstance(v, BlankPlaceholder)
@@ -79,45 +111,72 @@ def trans_endpoint(
         use_middleware_records: list[UseMiddlewareRecord]
 ):
     """trans endpoint
-    1. change `self` param's default ===> Depends(lambda: instance). set kind ===> 'KEYWORD_ONLY';
-    2. add use_dep params. replace params. replace signature.
-    > or
-    1. new function(without 'self' param) extend endpoint(need add 'self' when call it);
-    2. add use_dep params. replace params. replace signature.
-
+    1. bind `self` param to instance;
+    2. add use_dep params, their values are set to UseDepAttr's ContextVar when calling. replace params. replace signature.
+    3. add middleware to WebSocket instance of websocket endpoint'params if is_websocket
+    4. check out pooled dependencies of the controller before an async endpoint runs
 
-    add middleware to WebSocket instance of websocket endpoint'params if is_websocket
+    Everything is computed here once, the generated endpoint only does the necessary work per request.
+    The generated endpoint is sync if endpoint is sync, so FastAPI still runs it in threadpool.
     """
     params: list[Parameter] = list(signature(endpoint).parameters.values())
     has_self = params[0].name == 'self' if params else False
     if has_self:
         params.pop(0)
+    call = MethodType(endpoint, instance) if has_self else endpoint
+
+    # websocket param which need websocket middlewares
+    ws_records = [r for r in use_middleware_records if r.ws_dispatches]
+    ws_param_name = next((p.name for p in params if isclass(p.annotation)
+                          and issubclass(p.annotation, FastAPIWebSocket)), None) if ws_records else None
 
     # add use_dep's deps
-    for k, v in use_dep_dict.items():
-        req_name = USE_DEP_PREFIX_IN_ENDPOINT + k
+    use_dep_items: tuple[tuple[ContextVar, str], ...] = tuple(
+        (v[2].var, USE_DEP_PREFIX_IN_ENDPOINT + k) for k, v in use_dep_dict.items())
+    for (_, req_name), v in zip(use_dep_items, use_dep_dict.values()):
         params.append(Parameter(
             name=req_name, kind=Parameter.KEYWORD_ONLY, annotation=v[0], default=v[1]))
-    # replace endpoint
-
-    @wraps(endpoint)
-    async def new_endpoint(*args, **kwargs):
-        for k, v in use_dep_dict.items():
-            req_name = USE_DEP_PREFIX_IN_ENDPOINT + k
-            setattr(instance, k, kwargs.pop(req_name))
-            kwargs.get(req_name)  # auto call use_dep result
-            # add websocket middleware for this endpoint
-            if isinstance(v, FastAPIWebSocket):
-                for record in use_middleware_records:
-                    record.add_ws_middleware(v)
-        new_args = (instance, *args) if has_self else args
-        if iscoroutinefunction(endpoint):
-            return await endpoint(*new_args, **kwargs)
+
+    def prepare(kwargs: dict):
+        # request-local, never shared by concurrent requests
+        for var, req_name in use_dep_items:
+            var.set(kwargs.pop(req_name))
+        if ws_param_name is not None:
+            for record in ws_records:
+                record.add_ws_middleware(kwargs[ws_param_name])
+
+    need_prepare = bool(use_dep_items) or ws_param_name is not None
+    # pooled dependencies of the controller are checked out before an async endpoint runs, waiting for
+    # an instance doesn't block the event loop; sync endpoints run in threadpool, they wait when using them
+    pooled_deps = find_pooled_deps(instance) if has_self and iscoroutinefunction(endpoint) else []
+    # replace endpoint, FastAPI always calls endpoint with keyword params
+    if iscoroutinefunction(endpoint):
+        if pooled_deps:
+            async def new_endpoint(**kwargs):
+                if need_prepare:
+                    prepare(kwargs)
+                for dep in pooled_deps:
+                    await dep.aresolve()
+                return await call(**kwargs)
+        elif need_prepare:
+            async def new_endpoint(**kwargs):
+                prepare(kwargs)
+                return await call(**kwargs)
+        else:
+            async def new_endpoint(**kwargs):
+                return await call(**kwargs)
+    else:
+        if need_prepare:
+            def new_endpoint(**kwargs):
+                prepare(kwargs)
+                return call(**kwargs)
         else:
-            return endpoint(*new_args, **kwargs)
+            def new_endpoint(**kwargs):
+                return call(**kwargs)
 
+    new_endpoint = wraps(endpoint)(new_endpoint)
     setattr(new_endpoint, '__signature__', signature(
-        new_endpoint).replace(parameters=params))
+        endpoint).replace(parameters=params))
 
     return new_endpoint
 
@@ -133,15 +192,13 @@ def resolve_endpoint(
     """
     1. trans_endpoint
     2. add websocket middleware to websocket endpoint
-    3. mount endpoint to anchor and add middleware"""
-    path = anchor.prefix + api_route.record.path
-    # if http, add to use_middleware_records
-    if isinstance(api_route.record, BaseHttpRouteItem):
-        urls_methods = [(path, method.upper())
-                        for method in api_route.record.methods]
-        # only first can do well actually
-        for r in use_middleware_records:
-            r.http_urls_methods.extend(urls_methods)
+    3. mount endpoint to anchor, http middlewares are compiled into the route"""
+    # if http, wrap the route's handler with http middlewares
+    if isinstance(api_route.record, BaseHttpRouteItem) and use_middleware_records:
+        record = reduce(lambda a, b: a + b, use_middleware_records, UseMiddlewareRecord())
+        if record.http_dispatches:
+            api_route.record.route_class_override = record.build_route_class(
+                api_route.record.route_class_override or anchor.route_class)
     new_endpoint = trans_endpoint(
         instance, api_route.record.endpoint, use_deps_dict, use_middleware_records
     )
@@ -171,10 +228,6 @@ def resolve_class_based_view(
                                  new_prefix, use_middleware_records)
             elif isinstance(attr, PrefixRouteRecord):
                 resolve_class_based_view(anchor, attr, new_prefix, app_record)
-    # add middleware
-    if use_middleware_records:
-        reduce(lambda a, b: a + b,
-               use_middleware_records).add_http_middleware(app_record.app)
     return instance
 
 
@@ -230,9 +283,12 @@ class Controller(APIRouter):
 
     def __call__(self, cls: type[T]) -> type[T]:
         app_record = app_store.get_or_raise(get_call_filename())
-        resolve_class_based_view(self, PrefixRouteRecord(cls), '', app_record)
+        cls_name = f'{cls.__module__}.{cls.__qualname__}'
+        with profile_span(app_record.profiler, f'resolve {cls_name}', 'controller.resolve'):
+            resolve_class_based_view(self, PrefixRouteRecord(cls), '', app_record)
         if self.auto_include:
-            app_record.app.include_router(self)
+            with profile_span(app_record.profiler, f'mount {cls_name}', 'controller.mount', routes=len(self.routes)):
+                app_record.app.include_router(self)
         else:
             dep_store.add_dep(
                 APIRouter, cls.__name__ if self.dep_name is None else self.dep_name, self)
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger('fastapi_boot.scan')
+
+# modules which mention any of them are imported when filtering
+SCAN_TOKENS = ('fastapi_boot',)
+# directories skipped by default, besides hidden ones and virtualenvs
+SKIP_DIR_NAMES = frozenset({'__pycache__', 'node_modules', 'site-packages'})
+MANIFEST_VERSION = 1
+# generated by `fastapi-boot build` in app's directory, never scanned
+REGISTRY_FILENAME = 'fastapi_boot_registry.py'
+
+
+def is_skipped_dir(root: str, name: str) -> bool:
+    """__pycache__, hidden directories and virtualenvs"""
+    return name.startswith('.') or name in SKIP_DIR_NAMES or os.path.isfile(os.path.join(root, name, 'pyvenv.cfg'))
+
+
+def walk_py_files(app_root_dir: str, skip_dirs: bool = True) -> Iterable[str]:
+    """fullpaths of .py files in app_root_dir, skipped directories are pruned unless skip_dirs is False"""
+    for root, dirs, files in os.walk(app_root_dir):
+        if skip_dirs:
+            dirs[:] = [d for d in dirs if not is_skipped_dir(root, d)]
+        for file in files:
+            if file.endswith('.py') and file != REGISTRY_FILENAME:
+                yield os.path.join(root, file)
+
+
+def get_dot_path(fullpath: str, app_root_dir: str, prefix_parts: Iterable[str]) -> str:
+    """/proj/src/controller/user.py ==> src.controller.user"""
+    return '.'.join(
+        tuple(prefix_parts) + Path(fullpath.replace('.py', '').replace(app_root_dir, '')).parts[1:]
+    )
+
+
+def file_contributes(fullpath: str, tokens: Iterable[bytes]) -> bool:
+    """whether the source mentions any of tokens, a plain bytes search which is much cheaper than importing"""
+    try:
+        with open(fullpath, 'rb') as f:
+            source = f.read()
+    except OSError:
+        return True
+    return any(t in source for t in tokens)
+
+
+@dataclass
+class ScanManifest:
+    """{fullpath: [mtime_ns, size, contributes]} of the last scan, saved as json"""
+    path: str
+    tokens: list[str]
+    entries: dict[str, list] = field(default_factory=dict)
+    changed: bool = False
+
+    @classmethod
+    def load(cls, path: str, tokens: list[str]) -> 'ScanManifest':
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION and data.get('tokens') == tokens:
+                return cls(path, tokens, data['entries'])
+        except (OSError, ValueError, KeyError):
+            pass
+        return cls(path, tokens, changed=True)
+
+    def lookup(self, fullpath: str, stat: os.stat_result) -> bool | None:
+        """the cached verdict of an unchanged file"""
+        if (entry := self.entries.get(fullpath)) and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+            return entry[2]
+        return None
+
+    def record(self, fullpath: str, stat: os.stat_result, contributes: bool):
+        self.entries[fullpath] = [stat.st_mtime_ns, stat.st_size, contributes]
+        self.changed = True
+
+    def save(self, fullpaths: set[str]):
+        # deleted files
+        if stale := self.entries.keys() - fullpaths:
+            for i in stale:
+                self.entries.pop(i)
+            self.changed = True
+        if not self.changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(dict(version=MANIFEST_VERSION, tokens=self.tokens, entries=self.entries), f)
+        except OSError as e:
+            logger.warning('Fail to save scan manifest %s: %r', self.path, e)
+
+
+@dataclass
+class ScanReport:
+    # dot paths to import, in scanning order
+    imported: list[str] = field(default_factory=list)
+    # dot paths which don't mention scan tokens
+    skipped: list[str] = field(default_factory=list)
+    # nums of files whose verdicts come from the manifest
+    cached: int = 0
+
+    def __str__(self) -> str:
+        return (f'Scanned {len(self.imported) + len(self.skipped)} modules: imported {len(self.imported)}, '
+                f'skipped {len(self.skipped)}, {self.cached} verdicts from manifest')
+
+
+def scan_modules(
+    app_root_dir: str,
+    provide_filepath: str,
+    prefix_parts: Iterable[str],
+    exclude_scan_paths: Iterable[str] = (),
+    tokens: Iterable[str] | None = None,
+    manifest_path: str | None = None,
+    skip_dirs: bool = True,
+) -> ScanReport:
+    """find modules to import under app_root_dir
+
+    Args:
+        app_root_dir (str): directory of the file which provides app
+        provide_filepath (str): the file which provides app, never imported
+        prefix_parts (Iterable[str]): parts of app_root_dir relative to project's root
+        exclude_scan_paths (Iterable[str], optional): dot path prefixes to exclude. Defaults to ().
+        tokens (Iterable[str] | None, optional): only import modules which mention any of them, None means all. Defaults to None.
+        manifest_path (str | None, optional): json file to cache verdicts of unchanged files, only used with tokens. Defaults to None.
+        skip_dirs (bool, optional): skip `__pycache__`, node_modules, site-packages, hidden directories and virtualenvs. Defaults to True.
+    """
+    prefix_parts = tuple(prefix_parts)
+    exclude_scan_paths = tuple(exclude_scan_paths)
+    token_list = None if tokens is None else list(tokens)
+    token_bytes = [i.encode() for i in token_list or ()]
+    manifest = ScanManifest.load(manifest_path, token_list) if token_list is not None and manifest_path else None
+    report = ScanReport()
+    fullpaths: set[str] = set()
+    for fullpath in walk_py_files(app_root_dir, skip_dirs):
+        if fullpath == provide_filepath:
+            continue
+        dot_path = get_dot_path(fullpath, app_root_dir, prefix_parts)
+        if dot_path.startswith(exclude_scan_paths):
+            continue
+        if token_list is None:
+            report.imported.append(dot_path)
+            continue
+        fullpaths.add(fullpath)
+        contributes = None
+        if manifest is not None:
+            stat = os.stat(fullpath)
+            if (contributes := manifest.lookup(fullpath, stat)) is not None:
+                report.cached += 1
+            else:
+                contributes = file_contributes(fullpath, token_bytes)
+                manifest.record(fullpath, stat, contributes)
+        else:
+            contributes = file_contributes(fullpath, token_bytes)
+        (report.imported if contributes else report.skipped).append(dot_path)
+    if manifest is not None:
+        manifest.save(fullpaths)
+    logger.info(str(report))
+    return report
@@ -0,0 +1,425 @@
+import asyncio
+import threading
+from collections import deque
+from collections.abc import AsyncGenerator, Callable, Generator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Generic, Literal, TypeVar, cast
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .const import dep_store
+from .graph import DepKey, format_dep_key
+from .lifecycle import Closer, get_close_hook, logger, run_close_hook
+from .model import DependencyCycleException, InjectFailException, PoolExhaustedException, ScopeNotActiveException
+from .proxy import DepHolder, DepProxy
+
+T = TypeVar('T')
+
+# singleton: one instance, the default
+# prototype: a new instance for each injection
+# request: one instance for each http / websocket request
+# thread: one instance for each thread
+ScopeName = Literal['singleton', 'prototype', 'request', 'thread']
+
+
+@dataclass(frozen=True)
+class Pooled:
+    """at most max_size instances, checked out and returned"""
+    max_size: int
+    # max seconds to wait for an instance, None means no limit
+    timeout: float | None = 30
+
+
+def pooled(max_size: int, timeout: float | None = 30) -> Pooled:
+    """
+    Args:
+        max_size (int): max nums of instances
+        timeout (float | None, optional): max seconds to wait for an instance, None means no limit. Defaults to 30.
+    """
+    if max_size < 1:
+        raise ValueError('max_size of pooled scope should be >= 1')
+    return Pooled(max_size, timeout)
+
+
+BeanScope = ScopeName | Pooled
+SCOPE_NAMES = ('singleton', 'prototype', 'request', 'thread')
+
+
+async def close_instance(key: DepKey, ins: Any):
+    """close an instance created by a scope, if it has a close hook"""
+    if (hook := get_close_hook(ins)) is not None:
+        res = await run_close_hook(Closer(key, [], ins, hook), None)
+        if res.error is not None:
+            logger.warning('Fail to close %s: %r', format_dep_key(key), res.error)
+
+
+# ---------------------------------------------------- request ---------------------------------------------------- #
+@dataclass(eq=False)
+class RequestContext:
+    # {scoped dependency: instance}
+    instances: dict['ScopedDep', Any] = field(default_factory=dict)
+    # (pool, instance), returned when the request ends
+    checkouts: list[tuple['BeanPool', Any]] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+REQUEST_CONTEXT: ContextVar[RequestContext | None] = ContextVar('fastapi_boot_request_context', default=None)
+
+
+@asynccontextmanager
+async def request_scope() -> AsyncGenerator[RequestContext, None]:
+    """request scoped dependencies used inside are created once, closed at the end;
+    pooled ones are checked out once, returned at the end
+    """
+    ctx = RequestContext()
+    token = REQUEST_CONTEXT.set(ctx)
+    try:
+        yield ctx
+    finally:
+        REQUEST_CONTEXT.reset(token)
+        for pool, ins in ctx.checkouts:
+            pool.release(ins)
+        for dep, ins in ctx.instances.items():
+            # pooled ones are returned above
+            if dep.pool is None:
+                await close_instance(dep.key, ins)
+
+
+class RequestScopeMiddleware:
+    """pure ASGI middleware, each http / websocket request is a request scope,
+    added by provide_app if there is a request or pooled scoped dependency
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] not in ('http', 'websocket'):
+            return await self.app(scope, receive, send)
+        async with request_scope():
+            await self.app(scope, receive, send)
+
+
+def get_request_context(key: DepKey) -> RequestContext:
+    if (ctx := REQUEST_CONTEXT.get()) is None:
+        raise ScopeNotActiveException(
+            f'Dependency {format_dep_key(key)} is request scoped, it can only be used while handling a request')
+    return ctx
+
+
+# ---------------------------------------------------- pooled ---------------------------------------------------- #
+class BeanPool(Generic[T]):
+    """instances of a pooled dependency, at most max_size are created and checked out at the same time
+
+    ```python
+    with pool_of(Parser).checkout() as parser:
+        ...
+    async with pool_of(Parser).acheckout() as parser:
+        ...
+    ```
+    """
+
+    def __init__(self, key: DepKey, factory: Callable[[], T], max_size: int, timeout: float | None = 30):
+        self.key = key
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle: list[T] = []
+        # nums of created instances
+        self.size = 0
+        self.semaphore = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        # (event loop, future) of coroutines waiting for an instance, woken up one by one by release
+        self.waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self.closed = False
+
+    def acquire(self, blocking: bool = True) -> T:
+        """check out an idle instance, or create one if less than max_size are created"""
+        if self.closed:
+            raise PoolExhaustedException(f'Pool of {format_dep_key(self.key)} is closed')
+        if not self.semaphore.acquire(blocking, self.timeout if blocking else None):
+            raise self.exhausted()
+        return self.take()
+
+    async def aacquire(self) -> T:
+        """acquire in the event loop, wait for a returned instance at most timeout seconds without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        deadline = None if self.timeout is None else loop.time() + self.timeout
+        while True:
+            if self.closed:
+                raise PoolExhaustedException(f'Pool of {format_dep_key(self.key)} is closed')
+            with self.lock:
+                if self.semaphore.acquire(False):
+                    break
+                future = loop.create_future()
+                self.waiters.append((loop, future))
+            try:
+                await asyncio.wait_for(future, None if deadline is None else max(deadline - loop.time(), 0))
+            except BaseException as e:
+                with self.lock:
+                    if (loop, future) in self.waiters:
+                        self.waiters.remove((loop, future))
+                    else:
+                        # woken up but leaving, pass it on
+                        self.wake_one()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise self.exhausted() from None
+                raise
+        return self.take()
+
+    def exhausted(self) -> PoolExhaustedException:
+        return PoolExhaustedException(
+            f'All {self.max_size} instances of {format_dep_key(self.key)} are checked out, waited {self.timeout}s')
+
+    def take(self) -> T:
+        """an idle instance or a new one, after the semaphore is acquired"""
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+            self.size += 1
+        try:
+            return self.factory()
+        except BaseException:
+            with self.lock:
+                self.size -= 1
+            self.release_slot()
+            raise
+
+    def wake_one(self):
+        """wake up the first waiting coroutine, the lock should be held by caller"""
+        if self.waiters:
+            loop, future = self.waiters.popleft()
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+    def release_slot(self):
+        with self.lock:
+            self.semaphore.release()
+            self.wake_one()
+
+    def release(self, ins: T):
+        """return an instance checked out"""
+        with self.lock:
+            self.idle.append(ins)
+        self.release_slot()
+
+    @contextmanager
+    def checkout(self) -> Generator[T, None, None]:
+        ins = self.acquire()
+        try:
+            yield ins
+        finally:
+            self.release(ins)
+
+    @asynccontextmanager
+    async def acheckout(self) -> AsyncGenerator[T, None]:
+        """wait for an instance without blocking the event loop"""
+        ins = await self.aacquire()
+        try:
+            yield ins
+        finally:
+            self.release(ins)
+
+    async def aclose(self):
+        """close idle instances, the ones checked out are closed by nobody"""
+        self.closed = True
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for ins in idle:
+            await close_instance(self.key, ins)
+
+
+# ---------------------------------------------------- scoped ---------------------------------------------------- #
+def in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+@dataclass(eq=False)
+class ScopedDep(DepHolder, Generic[T]):
+    """held by DepStore instead of the instance of a non-singleton dependency"""
+    key: DepKey
+    scope: BeanScope
+    factory: Callable[[], T]
+    local: threading.local = field(default_factory=threading.local)
+    # instances of thread scope, closed at shutdown
+    created: list[T] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    pool: BeanPool[T] | None = None
+
+    def __post_init__(self):
+        if isinstance(self.scope, Pooled):
+            self.pool = BeanPool(self.key, self.factory, self.scope.max_size, self.scope.timeout)
+        elif self.scope not in SCOPE_NAMES[1:]:
+            raise InjectFailException(f'Unknown scope {self.scope!r} of {format_dep_key(self.key)}')
+
+    def inject(self) -> T:
+        """a new instance of prototype, otherwise a proxy resolved when it's used"""
+        if self.scope == 'prototype':
+            return self.factory()
+        return ScopedProxy(self)  # type: ignore
+
+    def resolve(self) -> T:
+        if self.scope == 'thread':
+            if (ins := self.local.__dict__.get('instance')) is None:
+                ins = self.local.instance = self.factory()
+                with self.lock:
+                    self.created.append(ins)
+            return ins
+        ctx = get_request_context(self.key)
+        with ctx.lock:
+            if self in ctx.instances:
+                return ctx.instances[self]
+        if self.pool is not None:
+            # the event loop can't be blocked, only take an idle one, `aresolve` waits
+            ins = self.pool.acquire(blocking=not in_event_loop())
+            return self.add_checkout(ctx, ins)
+        ins = self.factory()
+        with ctx.lock:
+            return ctx.instances.setdefault(self, ins)
+
+    async def aresolve(self) -> T:
+        """resolve in the event loop, a pooled one waits for an instance at most timeout seconds without blocking"""
+        if self.pool is None:
+            return self.resolve()
+        ctx = get_request_context(self.key)
+        with ctx.lock:
+            if self in ctx.instances:
+                return ctx.instances[self]
+        return self.add_checkout(ctx, await self.pool.aacquire())
+
+    def add_checkout(self, ctx: RequestContext, ins: T) -> T:
+        """the instance of the request, returned when the request ends"""
+        pool = cast(BeanPool[T], self.pool)
+        with ctx.lock:
+            if self in ctx.instances:
+                # checked out by another thread of the request meanwhile
+                pool.release(ins)
+                return ctx.instances[self]
+            ctx.checkouts.append((pool, ins))
+            ctx.instances[self] = ins
+            return ins
+
+    @property
+    def closeable(self) -> bool:
+        instances = self.created if self.pool is None else self.pool.idle
+        return any(get_close_hook(i) is not None for i in instances)
+
+    async def aclose(self):
+        """close instances of thread scope and idle instances of pool at shutdown"""
+        if self.pool is not None:
+            return await self.pool.aclose()
+        with self.lock:
+            created, self.created = self.created, []
+        for ins in created:
+            await close_instance(self.key, ins)
+
+
+class ScopedProxy(DepProxy):
+    """injected for request, thread and pooled scoped dependencies"""
+
+    def __init__(self, dep: ScopedDep):
+        object.__setattr__(self, '_dep', dep)
+
+    def _resolve(self):
+        return object.__getattribute__(self, '_dep').resolve()
+
+    def _dep_type(self) -> Any:
+        return object.__getattribute__(self, '_dep').key[0]
+
+    def __repr__(self) -> str:
+        dep: ScopedDep = object.__getattribute__(self, '_dep')
+        return f'<ScopedProxy {format_dep_key(dep.key)} scope={dep.scope!r}>'
+
+
+def find_pooled_deps(instance: Any) -> list[ScopedDep]:
+    """pooled dependencies injected as class or instance attributes, e.g. of a Controller"""
+    res: list[ScopedDep] = []
+    namespaces = [vars(c) for c in type(instance).__mro__] + [getattr(instance, '__dict__', {})]
+    for value in (v for ns in namespaces for v in ns.values()):
+        if isinstance(value, ScopedProxy) and (dep := object.__getattribute__(value, '_dep')).pool is not None \
+                and dep not in res:
+            res.append(dep)
+    return res
+
+
+def pool_of(tp: Any, name: str | None = None) -> BeanPool:
+    """pool of a pooled dependency, by type and name, or by the proxy injected
+
+    ```python
+    @Injectable(scope=pooled(4))
+    class Parser: ...
+
+    @Controller('/parse')
+    class ParseController:
+        @Get()
+        async def parse(self):
+            async with pool_of(Parser).acheckout() as parser:
+                ...
+    ```
+    """
+    dep = object.__getattribute__(tp, '_dep') if isinstance(tp, ScopedProxy) else dep_store.inject_dep(tp, name)
+    if isinstance(dep, ScopedDep) and dep.pool is not None:
+        return dep.pool
+    raise InjectFailException(f'{format_dep_key((tp, name))} is not a pooled dependency')
+
+
+# ---------------------------------------------------- lazy ---------------------------------------------------- #
+@dataclass(eq=False)
+class LazyDep(DepHolder, Generic[T]):
+    """held by DepStore instead of the instance of a lazy singleton, built when it's used first"""
+    key: DepKey
+    factory: Callable[[], T]
+    instance: T | None = None
+    built: bool = False
+    # thread building it, to find cycles instead of dead lock
+    builder: int | None = None
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+    def inject(self) -> T:
+        return cast(T, self.instance) if self.built else LazyProxy(self)  # type: ignore
+
+    def get(self) -> T:
+        if self.built:
+            return cast(T, self.instance)
+        with self.lock:
+            if self.built:
+                return cast(T, self.instance)
+            if self.builder == threading.get_ident():
+                raise DependencyCycleException(f'Lazy dependency {format_dep_key(self.key)} is used while building itself')
+            self.builder = threading.get_ident()
+            try:
+                self.instance = self.factory()
+                self.built = True
+            finally:
+                self.builder = None
+            return self.instance
+
+    @property
+    def closeable(self) -> bool:
+        return self.built and get_close_hook(self.instance) is not None
+
+    async def aclose(self):
+        if self.built:
+            await close_instance(self.key, self.instance)
+
+
+class LazyProxy(DepProxy):
+    """injected for lazy dependencies before they're built, `isinstance` works without building"""
+
+    def __init__(self, dep: LazyDep):
+        object.__setattr__(self, '_dep', dep)
+
+    def _resolve(self):
+        return object.__getattribute__(self, '_dep').get()
+
+    def _dep_type(self) -> Any:
+        return object.__getattribute__(self, '_dep').key[0]
+
+    def __repr__(self) -> str:
+        dep: LazyDep = object.__getattribute__(self, '_dep')
+        return f'<LazyProxy {format_dep_key(dep.key)} built={dep.built}>'
@@ -1,6 +1,9 @@
-import inspect
+import sys
 
 
 def get_call_filename(layer: int = 1):
-    """get filename of file which calls the function which calls get_call_filename"""
-    return inspect.stack()[layer + 1].filename.capitalize()
+    """get filename of file which calls the function which calls get_call_filename
+
+    Uses `sys._getframe` instead of `inspect.stack`, so no FrameInfo is built and no source line is read.
+    """
+    return sys._getframe(layer + 1).f_code.co_filename.capitalize()
@@ -5,3 +5,25 @@ from fastapi_boot.tortoise_util.decorator import (
     Delete as Delete,
     Sql as Sql,
 )
+from fastapi_boot.tortoise_util.stream import (
+    ndjson_lines as ndjson_lines,
+    csv_lines as csv_lines,
+)
+from fastapi_boot.tortoise_util.cache import (
+    ResultCache as ResultCache,
+    result_cache as result_cache,
+)
+from fastapi_boot.tortoise_util.prepare import (
+    prepare_sql as prepare_sql,
+    PrepareReport as PrepareReport,
+    SqlPrepareException as SqlPrepareException,
+)
+from fastapi_boot.tortoise_util.stats import (
+    SqlStats as SqlStats,
+    sql_stats as sql_stats,
+    mount_sql_stats as mount_sql_stats,
+)
+from fastapi_boot.tortoise_util.batch import (
+    batch_scope as batch_scope,
+    BatchScopeMiddleware as BatchScopeMiddleware,
+)
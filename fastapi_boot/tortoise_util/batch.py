@@ -0,0 +1,178 @@
+import asyncio
+import re
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Any
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# calls of a batched Select are only coalesced with calls in the same scope, not coalesced outside of any scope
+BATCH_SCOPE: ContextVar[object | None] = ContextVar('fastapi_boot_batch_scope', default=None)
+
+# column = {expr}
+BATCH_CONDITION_PATTERN = re.compile(r'([\w.`"\[\]]+)\s*=\s*\{\s*(.*?)\s*\}')
+
+
+@contextmanager
+def batch_scope() -> Generator[None, None, None]:
+    """calls of batched Select inside are not coalesced with calls outside"""
+    token = BATCH_SCOPE.set(object())
+    try:
+        yield
+    finally:
+        BATCH_SCOPE.reset(token)
+
+
+class BatchScopeMiddleware:
+    """pure ASGI middleware, each http request is a batch scope
+
+    ```python
+    app.add_middleware(BatchScopeMiddleware)
+    ```
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        with batch_scope():
+            await self.app(scope, receive, send)
+
+
+def batch_key_str(value: Any) -> str:
+    """params and column values may be different types, e.g. '1' and 1, uuid and str"""
+    return str(value)
+
+
+@dataclass
+class BatchSql:
+    """sql split around `column = {expr}`, which will be `column in (...)`"""
+    pre: str
+    column: str
+    post: str
+    # index of the batched placeholder in all placeholders
+    index: int
+    pattern: re.Pattern
+    # {keys nums: formatted sql}
+    formatted: dict[int, str] = field(default_factory=dict)
+
+    def format(self, placeholder: Callable[[int], str], n: int) -> str:
+        """
+        Args:
+            placeholder (Callable[[int], str]): index of param ==> placeholder of the driver
+            n (int): nums of keys
+        """
+        if (sql := self.formatted.get(n)) is None:
+            index = count(1)
+            pre = self.pattern.sub(lambda _: placeholder(next(index)), self.pre)
+            keys = ', '.join(placeholder(next(index)) for _ in range(n))
+            post = self.pattern.sub(lambda _: placeholder(next(index)), self.post)
+            sql = self.formatted[n] = f'{pre}{self.column} in ({keys}){post}'
+        return sql
+
+
+# clauses which change the meaning of rows when conditions of calls are merged, checked at top level
+BATCH_UNSAFE_PATTERN = re.compile(
+    r'\b(limit|offset|fetch\s+(?:first|next)|group\s+by|having|distinct|union|intersect|except|over)\b'
+    r'|\b(count|sum|avg|min|max|group_concat|string_agg|array_agg|json_agg)\s*\(',
+    re.IGNORECASE,
+)
+# last top-level identifier of a select item, `u.id`, `id as user_id`, `"id"`
+SELECT_ITEM_NAME_PATTERN = re.compile(r'[`"\[]?(\w+|\*)[`"\]]?\s*$')
+
+
+def top_level(sql: str) -> str:
+    """sql with contents of parentheses, {expr} and string literals replaced by spaces, positions are kept"""
+    chars = list(sql)
+    depth = 0
+    quoted = False
+    for i, c in enumerate(sql):
+        if c == "'":
+            quoted = not quoted
+        elif not quoted and c in '({':
+            depth += 1
+            if depth == 1:
+                continue
+        elif not quoted and c in ')}':
+            depth -= 1
+        if quoted or depth:
+            chars[i] = ' '
+    return ''.join(chars)
+
+
+def selects_column(top: str, column: str) -> bool:
+    """whether top-level select list has `*` or an item named column"""
+    if (match := re.search(r'\bselect\b(.*?)\bfrom\b', top, re.IGNORECASE | re.DOTALL)) is None:
+        return True
+    for item in match.group(1).split(','):
+        if (name := SELECT_ITEM_NAME_PATTERN.search(item)) is None or name.group(1) in ('*', column):
+            return True
+    return False
+
+
+def split_batch_sql(sql: str, pattern: re.Pattern, batch_key: str) -> BatchSql:
+    """find `batch_key = {expr}` in sql, batch_key can be prefixed by table alias or quoted.
+    The condition must be a top-level `and` term of where, sql with limit, group by, aggregates, distinct...
+    or without the column in select list is refused, because rows of merged calls can't be split by the column.
+    """
+    top = top_level(sql)
+    if unsafe := BATCH_UNSAFE_PATTERN.search(top):
+        raise ValueError(f'batch_key can\'t be used with sql which has "{unsafe.group().strip("( ")}": {sql}')
+    for match in BATCH_CONDITION_PATTERN.finditer(top):
+        column = match.group(1)
+        if column.split('.')[-1].strip('`"[]') != batch_key:
+            continue
+        wheres = list(re.finditer(r'\bwhere\b', top[:match.start()], re.IGNORECASE))
+        terms = top[wheres[-1].end():match.start()] if wheres else 'where is not found'
+        # only and-terms of where before the condition
+        if re.search(r'\b(?:from|join|on|select)\b', terms, re.IGNORECASE) or \
+                not re.search(r'(?:^|\band)\s*$', terms, re.IGNORECASE):
+            condition = sql[match.start():match.end()]
+            raise ValueError(f'Condition "{condition}" of batch_key must be an and-term of where: {sql}')
+        if re.search(r'\bor\b', re.split(r'\border\s+by\b', top[wheres[-1].end():], flags=re.IGNORECASE)[0],
+                     re.IGNORECASE):
+            raise ValueError(f'batch_key can\'t be used with sql which has "or" in where: {sql}')
+        if not selects_column(top, batch_key):
+            raise ValueError(f'Column "{batch_key}" of batch_key is not selected by sql: {sql}')
+        pre = sql[:match.start()]
+        return BatchSql(pre, column, sql[match.end():], len(pattern.findall(pre)), pattern)
+    raise ValueError(f'Condition "{batch_key} = {{...}}" is not found at top level of sql: {sql}')
+
+
+@dataclass(eq=False)
+class Batch:
+    """calls waiting for the same query"""
+    # values of other placeholders
+    rest: tuple
+    # {key str: key}
+    keys: dict[str, Any] = field(default_factory=dict)
+    futures: list[tuple[str, asyncio.Future]] = field(default_factory=list)
+    flushed: bool = False
+
+    def add(self, key: Any, future: asyncio.Future):
+        k = batch_key_str(key)
+        self.keys.setdefault(k, key)
+        self.futures.append((k, future))
+
+    def values(self, index: int) -> list:
+        return [*self.rest[:index], *self.keys.values(), *self.rest[index:]]
+
+    def fan_out(self, rows: list[dict], batch_key: str):
+        if rows and batch_key not in rows[0]:
+            raise ValueError(f'Column "{batch_key}" of batch_key is not in the selected columns {list(rows[0])}')
+        groups: dict[str, list[dict]] = {}
+        for row in rows:
+            groups.setdefault(batch_key_str(row[batch_key]), []).append(row)
+        for k, future in self.futures:
+            if not future.done():
+                future.set_result(groups.get(k, []))
+
+    def fail(self, e: BaseException):
+        for _, future in self.futures:
+            if not future.done():
+                future.set_exception(e)
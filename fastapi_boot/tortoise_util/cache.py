@@ -0,0 +1,130 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+# table after from / join / into / update / delete from, can be quoted or prefixed by schema
+TABLE_PATTERN = re.compile(
+    r'\b(?:from|join|into|update)\s+((?:[`"\[]?\w+[`"\]]?\.)*[`"\[]?\w+[`"\]]?)', re.IGNORECASE)
+
+
+def extract_tables(sql: str) -> frozenset[str]:
+    """tables which the sql touches, lower case without quotes and schema
+
+    >>> extract_tables('select * from "public"."user" u join role r on u.role_id=r.id')
+    frozenset({'user', 'role'})
+    """
+    return frozenset(i.split('.')[-1].strip('`"[]').lower() for i in TABLE_PATTERN.findall(sql))
+
+
+def estimate_size(value: Any) -> int:
+    """approximate bytes of query result: list of rows, rows and their values"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(i) for i in value)
+    return sys.getsizeof(value)
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    value: Any
+    expire_at: float
+    size: int
+    tables: frozenset[str]
+
+
+@dataclass
+class ResultCache:
+    """Bounded LRU of raw query results, each entry is tagged with the tables it touches.
+
+    - entries are evicted by the least recently used order when `max_entries` or `max_bytes` is exceeded
+    - writes evict entries of their tables, results read before an eviction of their tables are not stored
+    """
+    max_entries: int = 1024
+    max_bytes: int = 64 * 1024 * 1024
+    entries: 'OrderedDict[Hashable, CacheEntry]' = field(default_factory=OrderedDict)
+    # {table: keys of entries which touch the table}
+    tags: dict[str, set[Hashable]] = field(default_factory=dict)
+    # {table: times of eviction}
+    generations: dict[str, int] = field(default_factory=dict)
+    size: int = 0
+    hits: int = 0
+    misses: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def generation(self, tables: Iterable[str]) -> tuple[int, ...]:
+        """take it before executing the query, and pass it to `set`"""
+        return tuple(self.generations.get(t, 0) for t in tables)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expire_at <= time.monotonic():
+                self.remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: float, tables: frozenset[str], generation: tuple[int, ...]):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            # the tables were written while querying, the value may be stale
+            if generation != self.generation(tables):
+                return
+            self.remove(key)
+            self.entries[key] = CacheEntry(value, time.monotonic() + ttl, size, tables)
+            self.size += size
+            for t in tables:
+                self.tags.setdefault(t, set()).add(key)
+            while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key: Hashable):
+        """remove an entry, the lock should be held by caller"""
+        if (entry := self.entries.pop(key, None)) is None:
+            return
+        self.size -= entry.size
+        for t in entry.tables:
+            if (keys := self.tags.get(t)) is not None:
+                keys.discard(key)
+                if not keys:
+                    self.tags.pop(t)
+
+    def evict_tables(self, tables: Iterable[str]) -> int:
+        """evict entries which touch any of tables, return nums of evicted entries"""
+        count = 0
+        with self.lock:
+            for t in tables:
+                t = t.lower()
+                self.generations[t] = self.generations.get(t, 0) + 1
+                for key in list(self.tags.get(t, ())):
+                    self.remove(key)
+                    count += 1
+        return count
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+            self.size = 0
+            self.hits = self.misses = 0
+
+    def info(self) -> dict[str, int]:
+        return dict(entries=len(self.entries), bytes=self.size, hits=self.hits, misses=self.misses,
+                    max_entries=self.max_entries, max_bytes=self.max_bytes)
+
+
+# shared by all Select in the process
+result_cache = ResultCache()
@@ -0,0 +1,129 @@
+import json
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import fields, is_dataclass
+from functools import lru_cache
+from inspect import isclass
+from types import NoneType, UnionType
+from typing import Annotated, Any, Union, get_args, get_origin, get_type_hints
+
+from pydantic import BaseModel, Json, TypeAdapter
+from tortoise import Model
+from tortoise.fields import JSONField
+
+try:
+    import orjson
+
+    def json_loads(v: str | bytes) -> Any:
+        return orjson.loads(v)
+except ImportError:  # pragma: no cover
+    json_loads = json.loads
+
+
+def parse_item(v):
+    """parse an item, only str which looks like a json object or array is decoded"""
+    if isinstance(v, str) and v[:1] in ('{', '['):
+        try:
+            t1 = json_loads(v)
+            if isinstance(t1, dict):
+                return parse_execute_res(t1)
+            elif isinstance(t1, list):
+                return [parse_item(i) for i in t1]
+            else:
+                return v
+        except:
+            return v
+    else:
+        return v
+
+
+def parse_execute_res(target: dict):
+    """parse JSONField"""
+    return {k: parse_item(v) for k, v in target.items()}
+
+
+def is_pydantic_json(metadata: Iterable[Any]) -> bool:
+    """pydantic's `Json[...]` decodes the str itself"""
+    return any(m is Json or isinstance(m, Json) for m in metadata)
+
+
+def is_json_type(tp: Any) -> bool:
+    """whether the value of annotation tp is stored as json in db, e.g. dict, list[str], BaseModel, dataclass"""
+    origin = get_origin(tp)
+    if origin is Annotated:
+        return not is_pydantic_json(get_args(tp)[1:]) and is_json_type(get_args(tp)[0])
+    if origin in (Union, UnionType):
+        return any(is_json_type(i) for i in get_args(tp) if i is not NoneType)
+    tp = origin or tp
+    if not isclass(tp) or issubclass(tp, (str, bytes, bytearray)):
+        return False
+    return issubclass(tp, (Mapping, Sequence, set, frozenset, BaseModel)) or is_dataclass(tp)
+
+
+def get_json_keys(tp: type) -> tuple[str, ...]:
+    """column names of tp's fields whose value is stored as json"""
+    if issubclass(tp, BaseModel):
+        return tuple(
+            field.validation_alias if isinstance(field.validation_alias, str) else field.alias or name
+            for name, field in tp.model_fields.items()
+            if is_json_type(field.annotation) and not is_pydantic_json(field.metadata)
+        )
+    if issubclass(tp, Model):
+        return tuple(field.source_field or name for name, field in tp._meta.fields_map.items()
+                     if isinstance(field, JSONField))
+    if is_dataclass(tp):
+        hints = get_type_hints(tp, include_extras=True)
+        return tuple(f.name for f in fields(tp) if is_json_type(hints.get(f.name)))
+    return ()
+
+
+def make_json_decoder(keys: tuple[str, ...]) -> Callable[[dict], dict]:
+    """decode json str of keys in a row, the row is copied before the first decoding instead of mutated,
+    so the driver's rows and cached rows are never changed. Malformed json is kept as it is.
+    """
+    def decode(row: dict) -> dict:
+        res = row
+        for k in keys:
+            if isinstance(v := row.get(k), (str, bytes)):
+                try:
+                    value = json_loads(v)
+                except ValueError:
+                    continue
+                if res is row:
+                    res = dict(row)
+                res[k] = value
+        return res
+    return decode
+
+
+def make_row_converter(tp: Any, construct: bool = False) -> Callable[[dict], Any]:
+    """row ==> instance of tp, built once for each query
+
+    Args:
+        tp (Any): target type, rows are parsed as before if tp is None or dict
+        construct (bool, optional): use `model_construct` without validation for pydantic model. Defaults to False.
+    """
+    if get_origin(tp) in (Union, UnionType) and len(args := [i for i in get_args(tp) if i is not NoneType]) == 1:
+        # T | None
+        tp = args[0]
+    if tp is None or tp is dict or get_origin(tp) is dict or not isclass(tp):
+        return parse_execute_res
+    decode = make_json_decoder(get_json_keys(tp))
+    if issubclass(tp, BaseModel):
+        build = tp.model_construct if construct else tp
+        return lambda row: build(**decode(row))
+    return lambda row: tp(**decode(row))
+
+
+@lru_cache(None)
+def get_list_adapter(tp: type) -> TypeAdapter:
+    return TypeAdapter(list[tp])
+
+
+def make_rows_converter(tp: Any, construct: bool = False) -> Callable[[list[dict]], list]:
+    """rows ==> list of tp, pydantic models and dataclasses are validated in one batch"""
+    convert = make_row_converter(tp, construct)
+    if not isclass(tp) or construct or not (issubclass(tp, BaseModel) or is_dataclass(tp)):
+        return lambda rows: [convert(i) for i in rows]
+    decode = make_json_decoder(get_json_keys(tp))
+    adapter = get_list_adapter(tp)
+    return lambda rows: adapter.validate_python([decode(i) for i in rows])
@@ -1,14 +1,28 @@
-from collections.abc import Callable, Coroutine, Mapping, Sequence
+from collections.abc import (AsyncGenerator, AsyncIterable, AsyncIterator, Awaitable, Callable, Coroutine, Iterable,
+                             Mapping, Sequence)
+from contextlib import aclosing
+from dataclasses import fields, is_dataclass
 from functools import partial, wraps
-from inspect import signature
+from inspect import Signature, signature
+import asyncio
 import inspect
-import json
+from itertools import count
+from operator import attrgetter
 import re
+from time import perf_counter
+import weakref
 from typing import Any, ParamSpec, TypeVar, cast, get_args, get_origin, overload
 from warnings import warn
 from pydantic import BaseModel
 from tortoise import Model, Tortoise
+from tortoise.backends.base.client import BaseDBAsyncClient, BaseTransactionWrapper
 from tortoise.backends.sqlite.client import SqliteClient
+from tortoise.transactions import in_transaction
+
+from .batch import BATCH_SCOPE, Batch, BatchSql, split_batch_sql
+from .cache import estimate_size, extract_tables, result_cache
+from .convert import make_row_converter, make_rows_converter, parse_execute_res, parse_item
+from .stats import sql_stats
 
 
 def get_func_params_dict(func: Callable, *args, **kwds):
@@ -33,29 +47,222 @@ def get_func_params_dict(func: Callable, *args, **kwds):
 
 def get_is_sqlite(connection_name: str):
     conn = Tortoise.get_connection(connection_name)
-    return conn.__class__ == SqliteClient
+    return isinstance(conn, SqliteClient)
 
 
-def parse_item(v):
-    """parse an item"""
-    if isinstance(v, str):
-        try:
-            t1 = json.loads(v)
-            if isinstance(t1, dict):
-                return parse_execute_res(t1)
-            elif isinstance(t1, list):
-                return [parse_item(i) for i in t1]
-            else:
-                return v
-        except:
-            return v
+def get_driver(conn: BaseDBAsyncClient) -> str:
+    """sqlite, asyncpg, psycopg, mysql, mssql, oracle or the dialect of a custom client"""
+    parts = type(conn).__module__.split('.')
+    if parts[:2] == ['tortoise', 'backends'] and len(parts) > 2:
+        return parts[2]
+    return conn.capabilities.dialect
+
+
+# drivers whose prestatement params placeholder is ?
+QMARK_DRIVERS = ('sqlite', 'mssql', 'oracle', 'odbc')
+
+
+def get_placeholder(conn: BaseDBAsyncClient, index: int = 1) -> str:
+    """prestatement params placeholder of connection's driver, $n for asyncpg, ? for sqlite and odbc, %s for others
+
+    Args:
+        conn (BaseDBAsyncClient)
+        index (int, optional): position of the param, starts from 1. Defaults to 1.
+    """
+    driver = get_driver(conn)
+    if driver == 'asyncpg':
+        return f'${index}'
+    if driver in QMARK_DRIVERS or conn.capabilities.dialect == 'sqlite':
+        return '?'
+    return '%s'
+
+
+# {variable} which is a param or attribute of a param, e.g. {id}, {dto.name}
+ATTR_EXPR_PATTERN = re.compile(r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*')
+
+
+def compile_placeholder(expr: str, param_names: Sequence[str] | None) -> Callable[[dict], Any]:
+    """compile expression in {} once, the result gets it's value from params dict
+
+    Args:
+        expr (str): expression in {}
+        param_names (Sequence[str] | None): param names of decorated function, None if any name is a key of params dict
+
+    Returns:
+        Callable[[dict], Any]: params dict ==> value
+    """
+    if ATTR_EXPR_PATTERN.fullmatch(expr):
+        name, *attrs = expr.split('.')
+        if param_names is None or name in param_names:
+            if not attrs:
+                return lambda params: params[name]
+            getter = attrgetter('.'.join(attrs))
+            return lambda params: getter(params[name])
+    code = compile(expr, f'<sql placeholder {{{expr}}}>', 'eval')
+    return lambda params: eval(code, params)
+
+
+def row_namespace(row: Any) -> dict:
+    """names which can be used in {} for a row of bulk execution: keys of mapping, fields of model or attributes"""
+    if isinstance(row, Mapping):
+        return dict(row)
+    if isinstance(row, BaseModel):
+        return dict(row)
+    if is_dataclass(row) and not isinstance(row, type):
+        return {f.name: getattr(row, f.name) for f in fields(row)}
+    return dict(vars(row))
+
+
+def compile_row_binder(exprs: Sequence[str]) -> Callable[[Any], list]:
+    """row ==> values of placeholders, for bulk execution"""
+    getters = tuple(compile_placeholder(i, None) for i in exprs)
+    return lambda row: [getter(ns) for ns in (row_namespace(row),) for getter in getters]
+
+
+async def aiter_rows(rows: Iterable[Any] | AsyncIterable[Any]) -> AsyncGenerator[Any, None]:
+    if isinstance(rows, AsyncIterable):
+        async for row in rows:
+            yield row
     else:
-        return v
+        for row in rows:
+            yield row
+
+
+async def execute_many(conn: BaseDBAsyncClient, sql: str, values: list[list]) -> int:
+    """execute sql with each values, return affected rows' nums.
+    Only sqlite reports it, the nums of values is returned for other backends.
+    """
+    if get_driver(conn) == 'sqlite':
+        async with conn.acquire_connection() as connection:
+            start = connection.total_changes
+            await connection.executemany(sql, values)
+            return connection.total_changes - start
+    await conn.execute_many(sql, values)
+    return len(values)
+
+
+# attribute of a transaction which holds tables to evict when it ends
+EVICT_ON_END = 'fastapi_boot__evict_on_end'
+
+
+def evict_written_tables(conn: BaseDBAsyncClient, tables: frozenset[str]):
+    """evict cached results of tables written by conn now, and again when it's transaction ends if it's in one.
+    Results read between the write and the commit don't see the write, and results read in the transaction
+    see the write which may be rolled back, neither of them is served after the transaction.
+    """
+    result_cache.evict_tables(tables)
+    if not isinstance(conn, BaseTransactionWrapper):
+        return
+    if (pending := conn.__dict__.get(EVICT_ON_END)) is None:
+        pending = set()
+        setattr(conn, EVICT_ON_END, pending)
+        for name in ('commit', 'rollback'):
+            setattr(conn, name, evict_after(getattr(conn, name), pending))
+    pending.update(tables)
+
+
+def evict_after(end: Callable[[], Awaitable[None]], tables: set[str]):
+    @wraps(end)
+    async def wrapper():
+        try:
+            await end()
+        finally:
+            result_cache.evict_tables(tables)
+
+    return wrapper
+
+
+# drivers which can fetch rows of one execution chunk by chunk
+STREAM_DRIVERS = ('asyncpg', 'psycopg', 'mysql', 'sqlite')
+# names of psycopg's server-side cursors
+stream_ids = count(1)
+
+
+async def fetch_chunks(conn: BaseDBAsyncClient, sql: str, values: list, chunk_size: int) -> AsyncGenerator[list[dict], None]:
+    """execute sql once and fetch at most chunk_size rows each time with a cursor, never re-executed for a chunk.
+    - asyncpg: server-side cursor in a transaction
+    - psycopg: named server-side cursor in a transaction
+    - mysql: unbuffered `SSDictCursor`
+    - sqlite: cursor of the connection, which is only locked while fetching a chunk,
+      so queries made while consuming rows don't wait for the stream
+
+    Others, e.g. mssql and oracle, which have no such cursor, fetch all rows of the execution at once,
+    they are still yielded and converted chunk by chunk.
+    The pooled connection of asyncpg, psycopg and mysql is held until all rows are fetched or the generator is closed.
+    """
+    driver = get_driver(conn)
+    if driver not in STREAM_DRIVERS:
+        _, resp = await conn.execute_query(sql, values)
+        for i in range(0, len(resp), chunk_size):
+            yield list(map(dict, resp[i:i + chunk_size]))
+        return
+    if driver == 'sqlite':
+        async with conn.acquire_connection() as connection:
+            cursor = await connection.execute(sql, values)
+        try:
+            while True:
+                async with conn.acquire_connection():
+                    rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield list(map(dict, rows))
+        finally:
+            async with conn.acquire_connection():
+                await cursor.close()
+        return
+    async with conn.acquire_connection() as connection:
+        if driver == 'asyncpg':
+            async with connection.transaction():
+                cursor = await connection.cursor(sql, *values)
+                while rows := await cursor.fetch(chunk_size):
+                    yield list(map(dict, rows))
+        elif driver == 'psycopg':
+            from psycopg.rows import dict_row
+
+            async with connection.transaction():
+                async with connection.cursor(f'fastapi_boot_stream_{next(stream_ids)}', row_factory=dict_row) as cursor:
+                    await cursor.execute(sql, values)
+                    while rows := await cursor.fetchmany(chunk_size):
+                        yield rows
+        else:
+            # asyncmy or aiomysql, both have SSDictCursor
+            from tortoise.backends.mysql.client import mysql
 
+            async with connection.cursor(mysql.cursors.SSDictCursor) as cursor:
+                await cursor.execute(sql, values)
+                while rows := await cursor.fetchmany(chunk_size):
+                    yield list(rows)
 
-def parse_execute_res(target: dict):
-    """parse JSONField"""
-    return {k: parse_item(v) for k, v in target.items()}
+
+def compile_params_binder(func: Callable, exprs: Sequence[str]) -> Callable[[tuple, dict], list]:
+    """signature and placeholders are resolved once, the result only binds params and evaluates placeholders
+
+    Args:
+        func (Callable): decorated function
+        exprs (Sequence[str]): expressions in {} of sql
+
+    Returns:
+        Callable[[tuple, dict], list]: (args, kwds) ==> values of placeholders
+    """
+    sig: Signature = signature(func)
+    param_names = tuple(sig.parameters)
+    getters = tuple(compile_placeholder(i, param_names) for i in exprs)
+    if not getters:
+        return lambda args, kwds: []
+
+    def bind(args: tuple, kwds: dict) -> list:
+        bound = sig.bind_partial(*args, **kwds)
+        bound.apply_defaults()
+        # missing params are None
+        params = dict.fromkeys(param_names)
+        params.update(bound.arguments)
+        return [getter(params) for getter in getters]
+
+    return bind
+
+
+# return annotations of Select which mean streaming
+STREAM_ORIGINS = (AsyncIterator, AsyncIterable, AsyncGenerator)
 
 
 def repl_fill_params(match, kwds: dict) -> str:
@@ -63,6 +270,9 @@ def repl_fill_params(match, kwds: dict) -> str:
     return str(kwds[name]) if name in kwds else match.group(0)
 
 
+# every Sql created, prepared by `prepare_sql`
+SQL_REGISTRY: 'weakref.WeakSet[Sql]' = weakref.WeakSet()
+
 PM = TypeVar('PM', bound=BaseModel)
 TM = TypeVar('TM', bound=Model)
 P = ParamSpec('P')
@@ -73,7 +283,7 @@ class Sql:
     >>> Params
         sql: raw sql, use {variable_name} as placeholder, and the variable should be provided in 'fill' methods' params or decorated function's params
         connection_name: as param of  'Tortoise.get_connection(connection_name)', default 'default'
-        placeholder: prestatement params placeholder when executing sql in 'Tortoise.get_connection(connection_name).execute_query(sql, params_list)', default '%s'
+        placeholder: prestatement params placeholder when executing sql in 'Tortoise.get_connection(connection_name).execute_query(sql, params_list)', $n for asyncpg, ? for sqlite and odbc, %s for others
 
     >>> Example
     ```python
@@ -95,6 +305,10 @@ class Sql:
         self.formatted = False
         self.sql_pres_param_names = []
         self.pattern = re.compile(r'\{\s*(.*?)\s*\}')
+        # sql with the dialect's placeholders, resolved on the first execution
+        self.formatted_sql: str | None = None
+        self._tables: frozenset[str] | None = None
+        SQL_REGISTRY.add(self)
 
     @property
     def is_sqlite(self):
@@ -102,7 +316,14 @@ class Sql:
 
     @property
     def placeholder(self):
-        return '?' if self.is_sqlite else '%s'
+        return get_placeholder(Tortoise.get_connection(self.connection_name))
+
+    @property
+    def tables(self) -> frozenset[str]:
+        """tables which the sql touches"""
+        if self._tables is None:
+            self._tables = extract_tables(self.sql)
+        return self._tables
 
     def fill(self, **kwds):
         """Keyword params to replace {variable_name} in sql, can replace variables such as `table_name` which will raise Errro as param of execute_query method in Tortoise
@@ -127,6 +348,8 @@ class Sql:
         """
         self.sql = self.pattern.sub(
             partial(repl_fill_params, kwds=kwds), self.sql)
+        self._tables = None
+        self.formatted_sql = None
         return self
 
     def fill_map(self, map: Mapping):
@@ -143,25 +366,65 @@ class Sql:
 
         return await self(func)()
 
-    def __call__(
-        self, func: Callable[P, Coroutine[Any, Any, None | tuple[int, list[dict]]]]
-    ) -> Callable[P, Coroutine[Any, Any, tuple[int, list[dict]]]]:
+    def format_sql(self, conn: BaseDBAsyncClient) -> str:
+        """replace {variable_name} with the placeholder of connection's dialect, only once"""
+        if self.formatted_sql is None:
+            index = count(1)
+            self.formatted_sql = self.pattern.sub(lambda _: get_placeholder(conn, next(index)), self.sql)
+        return self.formatted_sql
+
+    async def execute_raw(self, values: list) -> tuple[int, list[dict]]:
+        """execute formatted sql with values of placeholders, rows are not parsed"""
+        conn = Tortoise.get_connection(self.connection_name)
+        rows, resp = await conn.execute_query(self.format_sql(conn), values)
+        # sqlite3.Row, asyncpg.Record
+        if resp and not isinstance(resp[0], dict):
+            resp = list(map(dict, resp))
+        return rows, resp
+
+    async def execute_values(self, values: list) -> tuple[int, list[dict]]:
+        """execute formatted sql with values of placeholders"""
+        rows, resp = await self.execute_raw(values)
+        return rows, [parse_execute_res(i) for i in resp]
+
+    def iter_values(self, values: list, chunk_size: int) -> AsyncGenerator[list[dict], None]:
+        """execute formatted sql with values of placeholders once, yield at most chunk_size unparsed rows each time,
+        see `fetch_chunks`
+        """
+        conn = Tortoise.get_connection(self.connection_name)
+        return fetch_chunks(conn, self.format_sql(conn), values, chunk_size)
+
+    def collect_param_names(self):
+        """collect {variable_name} in sql"""
         if not self.formatted:
             self.sql_pres_param_names = self.pattern.findall(self.sql)
-            self.sql = self.sql.format_map(
-                {k: self.placeholder for k in self.sql_pres_param_names})
             self.formatted = True
 
+    def compile(self, func: Callable) -> Callable[[tuple, dict], list]:
+        """collect {variable_name} in sql, return the binder of func's params"""
+        self.collect_param_names()
+        return compile_params_binder(func, self.sql_pres_param_names)
+
+    def __call__(
+        self, func: Callable[P, Coroutine[Any, Any, None | tuple[int, list[dict]]]]
+    ) -> Callable[P, Coroutine[Any, Any, tuple[int, list[dict]]]]:
+        bind = self.compile(func)
+
         @wraps(func)
         async def wrapper(*args: P.args, **kwds: P.kwargs):
-            func_params_dict = get_func_params_dict(func, *args, **kwds)
-            param_value_list = [eval(i, func_params_dict)
-                                for i in self.sql_pres_param_names]
-            # execute
-            rows, resp = await Tortoise.get_connection(self.connection_name).execute_query(self.sql, param_value_list)
-            if self.is_sqlite:
-                resp = list(map(dict, resp))
-            return rows, [parse_execute_res(i) for i in resp]
+            if not sql_stats.enabled:
+                return await self.execute_values(bind(args, kwds))
+            values = bind(args, kwds)
+            start = perf_counter()
+            try:
+                rows, resp = await self.execute_raw(values)
+            except Exception:
+                sql_stats.record_error(self)
+                raise
+            executed = perf_counter()
+            res = rows, [parse_execute_res(i) for i in resp]
+            await sql_stats.record(self, values, executed - start, perf_counter() - executed, rows, estimate_size(resp))
+            return res
 
         return cast(Callable[P, Coroutine[Any, Any, tuple[int, list[dict]]]], wrapper)
 
@@ -210,9 +473,58 @@ class Select(Sql):
     |         T         |     T|None     |
     |      list[T]      |     list[T]    |
     |  None|list[dict]  |    list[dict]  |
+    | AsyncIterator[T]  | AsyncIterator[T], rows are fetched chunk by chunk |
 
+    ```python
+    @Select('select * from user')
+    async def export_users() -> AsyncIterator[User]: ...
+
+    @Get('/export')
+    def export(self):
+        return StreamingResponse(ndjson_lines(export_users()), media_type='application/x-ndjson')
+    ```
     """
 
+    def __init__(
+        self,
+        sql: str,
+        connection_name: str = 'default',
+        chunk_size: int = 1000,
+        construct: bool = False,
+        cache_ttl: float | None = None,
+        batch_key: str | None = None,
+        max_batch_size: int = 500,
+    ):
+        """
+        Args:
+            chunk_size (int, optional): rows fetched each time when streaming. Defaults to 1000.
+            construct (bool, optional): build pydantic models by `model_construct` without validation,
+                otherwise a list of pydantic models or dataclasses is validated in one batch. Defaults to False.
+            cache_ttl (float | None, optional): seconds to cache results keyed by sql and params, None means no cache.
+                Insert / Update / Delete of tortoise_util evict cached results of their tables. Defaults to None.
+            batch_key (str | None, optional): column of condition `batch_key = {expr}` in sql, concurrent calls in the same
+                event loop tick and batch scope are coalesced into one `batch_key in (...)` query, rows are fanned out to
+                callers by the column's value. Calls outside of `batch_scope()` / `BatchScopeMiddleware` are not coalesced.
+                Can't be used with cache_ttl. Defaults to None.
+            max_batch_size (int, optional): max keys of a coalesced query. Defaults to 500.
+
+        Only columns of fields declared as dict, list, BaseModel, dataclass... (or JSONField of tortoise Model) are decoded as json.
+        Malformed json is kept as str, fields declared as pydantic's `Json[...]` are left to pydantic.
+        """
+        super().__init__(sql, connection_name)
+        self.chunk_size = chunk_size
+        self.construct = construct
+        self.cache_ttl = cache_ttl
+        if batch_key is not None and cache_ttl is not None:
+            raise ValueError("batch_key can't be used with cache_ttl")
+        self.batch_key = batch_key
+        self.max_batch_size = max_batch_size
+        self.batch_sql: BatchSql | None = None
+        # {(event loop, batch scope, values of other placeholders): batch waiting for flush}
+        self.batches: dict[tuple, Batch] = {}
+        # running batches, referenced until done
+        self.batch_tasks: set[asyncio.Task] = set()
+
     @overload
     async def execute(self, expect: type[PM]) -> PM | None: ...
     @overload
@@ -235,6 +547,134 @@ class Select(Sql):
         setattr(func, '__annotations__', {'return': expect})
         return await self(func)()
 
+    @overload
+    def stream(self, expect: type[PM], chunk_size: int | None = None) -> AsyncIterator[PM]: ...
+    @overload
+    def stream(self, expect: type[TM], chunk_size: int | None = None) -> AsyncIterator[TM]: ...
+
+    @overload
+    def stream(self, expect: None | type[dict] = None, chunk_size: int | None = None) -> AsyncIterator[dict]: ...
+
+    def stream(
+        self, expect: type[PM] | type[TM] | None | type[dict] = None, chunk_size: int | None = None
+    ) -> AsyncIterator[PM] | AsyncIterator[TM] | AsyncIterator[dict]:
+        """execute sql without decorated function, convert and yield rows lazily
+
+        >>> Example
+
+        ```python
+        async for user in Select('select * from {user}').fill(user=UserEntity.Meta.table).stream(UserInfoVO):
+            ...
+        ```
+        """
+        async def func(): ...
+
+        bind = self.compile(func)
+        convert = make_row_converter(expect, self.construct)
+        return self.iter_rows(bind((), {}), convert, self.chunk_size if chunk_size is None else chunk_size)
+
+    async def execute_cached(self, values: list) -> tuple[int, list[dict]]:
+        """execute_raw, results are cached for cache_ttl seconds.
+        Unparsed rows are cached, so each call converts them to new objects.
+        """
+        key = (self.connection_name, self.sql, tuple(values))
+        try:
+            cached = result_cache.get(key)
+        except TypeError:
+            # unhashable params
+            return await self.execute_raw(values)
+        if cached is not None:
+            return cached
+        tables = self.tables
+        generation = result_cache.generation(tables)
+        res = await self.execute_raw(values)
+        result_cache.set(key, res, cast(float, self.cache_ttl), tables, generation)
+        return res
+
+    async def execute_batched(self, values: list) -> tuple[int, list[dict]]:
+        """wait for the rows of values[batch_sql.index] from a coalesced query"""
+        if (scope := BATCH_SCOPE.get()) is None:
+            # not coalesced with calls of other requests
+            return await self.execute_raw(values)
+        batch_sql = cast(BatchSql, self.batch_sql)
+        loop = asyncio.get_running_loop()
+        rest = (*values[:batch_sql.index], *values[batch_sql.index + 1:])
+        pending_key = (loop, scope, rest)
+        try:
+            batch = self.batches.get(pending_key)
+        except TypeError:
+            # unhashable params
+            return await self.execute_raw(values)
+        if batch is None:
+            batch = self.batches[pending_key] = Batch(rest)
+            loop.call_soon(self.flush_batch, pending_key, batch)
+        future = loop.create_future()
+        batch.add(values[batch_sql.index], future)
+        if len(batch.keys) >= self.max_batch_size:
+            self.flush_batch(pending_key, batch)
+        rows = await future
+        return len(rows), rows
+
+    def flush_batch(self, pending_key: tuple, batch: Batch):
+        if self.batches.get(pending_key) is batch:
+            self.batches.pop(pending_key)
+        if batch.flushed:
+            return
+        batch.flushed = True
+        task = asyncio.get_running_loop().create_task(self.run_batch(batch))
+        self.batch_tasks.add(task)
+        task.add_done_callback(self.batch_tasks.discard)
+
+    async def run_batch(self, batch: Batch):
+        """execute the coalesced query, stats are recorded by each caller"""
+        batch_sql = cast(BatchSql, self.batch_sql)
+        try:
+            conn = Tortoise.get_connection(self.connection_name)
+            sql = batch_sql.format(partial(get_placeholder, conn), len(batch.keys))
+            _, resp = await conn.execute_query(sql, batch.values(batch_sql.index))
+            if resp and not isinstance(resp[0], dict):
+                resp = list(map(dict, resp))
+            batch.fan_out(resp, cast(str, self.batch_key))
+        except BaseException as e:
+            batch.fail(e)
+            if not isinstance(e, Exception):
+                raise
+
+    async def iter_rows(self, values: list, convert: Callable[[dict], Any], chunk_size: int) -> AsyncGenerator[Any, None]:
+        """converted rows, the cursor is closed as soon as this generator is closed"""
+        async with aclosing(self.iter_values(values, chunk_size)) as chunks:
+            if not sql_stats.enabled:
+                async for chunk in chunks:
+                    for row in chunk:
+                        yield convert(row)
+                return
+            # time of consumer is excluded
+            driver_time = convert_time = 0.0
+            rows = nbytes = 0
+            while True:
+                start = perf_counter()
+                try:
+                    chunk = await anext(chunks)
+                except StopAsyncIteration:
+                    driver_time += perf_counter() - start
+                    break
+                except Exception:
+                    sql_stats.record_error(self)
+                    raise
+                driver_time += perf_counter() - start
+                rows += len(chunk)
+                nbytes += estimate_size(chunk)
+                for row in chunk:
+                    start = perf_counter()
+                    item = convert(row)
+                    convert_time += perf_counter() - start
+                    yield item
+        await sql_stats.record(self, values, driver_time, convert_time, rows, nbytes)
+
+    @overload
+    def __call__(self, func: Callable[P, AsyncIterator[PM]] | Callable[P, Coroutine[Any, Any, AsyncIterator[PM]]]
+                 ) -> Callable[P, AsyncIterator[PM]]: ...
+
     @overload
     def __call__(self, func: Callable[P, Coroutine[Any, Any, PM]]) -> Callable[P,
                                                                                Coroutine[Any, Any, PM | None]]: ...
@@ -261,29 +701,61 @@ class Select(Sql):
         func: Callable[P, Coroutine[Any, Any, PM | list[PM] | TM | list[TM] | list[dict] | None]] | None,
     ) -> Callable[P, Coroutine[Any, Any, PM | list[PM] | TM | list[TM] | list[dict] | None]]:
         anno = func.__annotations__.get('return')
-        super_class = super()
+        if get_origin(anno) in STREAM_ORIGINS:
+            bind = self.compile(func)  # type: ignore
+            convert = make_row_converter((get_args(anno) or [None])[0], self.construct)
+
+            @wraps(func)  # type: ignore
+            def stream_wrapper(*args: P.args, **kwds: P.kwargs):
+                return self.iter_rows(bind(args, kwds), convert, self.chunk_size)
+
+            return stream_wrapper  # type: ignore
+
+        bind = self.compile(func)  # type: ignore
+        execute = self.execute_raw if self.cache_ttl is None else self.execute_cached
+        if self.batch_key is not None:
+            self.batch_sql = split_batch_sql(self.sql, self.pattern, self.batch_key)
+            execute = self.execute_batched
+        # converters are built once for each decorated function
+        if anno is None or get_origin(anno) is list:
+            convert_rows = make_rows_converter((get_args(anno) or [None])[0], self.construct)
+        else:
+            convert = make_row_converter(anno, self.construct)
 
-        @wraps(func)  # type: ignore
-        async def wrapper(*args: P.args, **kwds: P.kwargs):
-            # type: ignore
-            lines, resp = await super_class.__call__(func)(*args, **kwds)
-            if anno is None:
-                return resp
-            elif get_origin(anno) is list:
-                arg = get_args(anno)[0]
-                return [arg(**i) for i in resp]
+        def convert_result(lines: int, resp: list[dict]):
+            if anno is None or get_origin(anno) is list:
+                return convert_rows(resp)
             else:
                 if lines > 1:
                     warn(
                         f'The number of result is {lines}, but the expected type is "{anno.__name__}", so only the first result will be returned'
                     )
-                return anno(**resp[0]) if len(resp) > 0 else None
+                return convert(resp[0]) if len(resp) > 0 else None
+
+        @wraps(func)  # type: ignore
+        async def wrapper(*args: P.args, **kwds: P.kwargs):
+            # type: ignore
+            if not sql_stats.enabled:
+                return convert_result(*await execute(bind(args, kwds)))
+            values = bind(args, kwds)
+            start = perf_counter()
+            try:
+                lines, resp = await execute(values)
+            except Exception:
+                sql_stats.record_error(self)
+                raise
+            executed = perf_counter()
+            res = convert_result(lines, resp)
+            await sql_stats.record(self, values, executed - start, perf_counter() - executed, len(resp), estimate_size(resp))
+            return res
 
         return wrapper
 
 
 class Insert(Sql):
     """Has the same function as Delete, Update. Return rows' nums effected by this operation.
+    Cached results of Select which touch the tables of this sql are evicted after execution,
+    and again after the transaction ends if it's executed in one.
     >>> Example
 
     ```python
@@ -322,13 +794,55 @@ class Insert(Sql):
 
         return await self(func)()
 
+    async def many(self, rows: Iterable[Any] | AsyncIterable[Any], batch_size: int = 1000) -> int:
+        """execute sql for each row by `execute_many`, batch by batch in one transaction
+
+        Args:
+            rows (Iterable[Any] | AsyncIterable[Any]): mappings, pydantic models, dataclass instances or objects,
+                their keys / fields / attributes are the names in {}
+            batch_size (int, optional): rows of each `execute_many`. Defaults to 1000.
+
+        Returns:
+            int: total affected rows' nums, which is the nums of rows except sqlite because others don't report it
+
+        >>> Example
+
+        ```python
+        rows: int = await Insert('insert into {user}(name, age) values({name}, {age})').fill(user=UserDO.Meta.table).many(
+            [{'name': 'foo', 'age': 20}, UserDTO(name='bar', age=21)]
+        )
+        ```
+        """
+        self.collect_param_names()
+        bind = compile_row_binder(self.sql_pres_param_names)
+        total = 0
+        start = perf_counter()
+        async with in_transaction(self.connection_name) as conn:
+            sql = self.format_sql(conn)
+            batch: list[list] = []
+            async for row in aiter_rows(rows):
+                batch.append(bind(row))
+                if len(batch) >= batch_size:
+                    total += await execute_many(conn, sql, batch)
+                    batch = []
+            if batch:
+                total += await execute_many(conn, sql, batch)
+        # committed, unless it's nested in another transaction
+        evict_written_tables(Tortoise.get_connection(self.connection_name), self.tables)
+        if sql_stats.enabled:
+            await sql_stats.record(self, None, perf_counter() - start, rows=total)
+        return total
+
     def __call__(self, func: Callable[P, Coroutine[Any, Any, None | int]]) -> Callable[P, Coroutine[Any, Any, int]]:
-        super_class = super()
+        execute = super().__call__(func)
 
         @wraps(func)
         async def wrapper(*args: P.args, **kwds: P.kwargs) -> int:
             # type: ignore
-            return (await super_class.__call__(func)(*args, **kwds))[0]
+            try:
+                return (await execute(*args, **kwds))[0]
+            finally:
+                evict_written_tables(Tortoise.get_connection(self.connection_name), self.tables)
 
         return wrapper
 
@@ -0,0 +1,91 @@
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from tortoise import Tortoise
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from .decorator import SQL_REGISTRY, Sql, get_driver
+
+# statements which can be prepared or explained
+PREPARABLE_KEYWORDS = ('select', 'with', 'insert', 'update', 'delete', 'replace')
+
+
+class SqlPrepareException(Exception):
+    """some sql templates are invalid"""
+
+
+@dataclass
+class PrepareReport:
+    # formatted sql which are prepared or validated
+    prepared: list[str] = field(default_factory=list)
+    # formatted sql of raw Sql which are not dml, or the driver doesn't support
+    skipped: list[str] = field(default_factory=list)
+    # (formatted sql, error)
+    failed: list[tuple[str, Exception]] = field(default_factory=list)
+
+
+async def prepare_statement(conn: BaseDBAsyncClient, sql: str, params_num: int) -> bool:
+    """prepare a formatted sql on the connection, return False if the driver is not supported
+    - asyncpg: `prepare`, the statement is parsed and planned by server
+    - sqlite, mysql: `EXPLAIN` with null params
+    """
+    driver = get_driver(conn)
+    if driver == 'asyncpg':
+        async with conn.acquire_connection() as connection:
+            await connection.prepare(sql)
+        return True
+    if driver in ('sqlite', 'mysql'):
+        await conn.execute_query(f'EXPLAIN {sql}', [None] * params_num)
+        return True
+    return False
+
+
+async def prepare_sql(connection_names: Iterable[str] | None = None, raise_error: bool = True) -> PrepareReport:
+    """Prepare all Sql / Select / Insert / Update / Delete templates, call it in lifespan after Tortoise is initialized,
+    so that invalid sql is found before traffic arrives.
+
+    Drivers cache statements by sql text (asyncpg's statement cache, sqlite3's cached statements),
+    and the sql of a template is formatted only once, so executions reuse the parsed statements.
+
+    Args:
+        connection_names (Iterable[str] | None, optional): only templates of these connections, None means all. Defaults to None.
+        raise_error (bool, optional): raise SqlPrepareException with all failures. Defaults to True.
+
+    >>> Example
+
+    ```python
+    @Lifespan
+    async def _(app: FastAPI):
+        await Tortoise.init(config)
+        await prepare_sql()
+        yield
+        await Tortoise.close_connections()
+    ```
+    """
+    names = None if connection_names is None else set(connection_names)
+    report = PrepareReport()
+    done: set[tuple[str, str]] = set()
+    templates: list[Sql] = list(SQL_REGISTRY)
+    for template in templates:
+        if names is not None and template.connection_name not in names:
+            continue
+        conn = Tortoise.get_connection(template.connection_name)
+        template.collect_param_names()
+        sql = template.format_sql(conn)
+        if (template.connection_name, sql) in done:
+            continue
+        done.add((template.connection_name, sql))
+        # raw Sql can be any statement, others must be dml
+        if type(template) is Sql and not sql.lstrip().lower().startswith(PREPARABLE_KEYWORDS):
+            report.skipped.append(sql)
+            continue
+        try:
+            if await prepare_statement(conn, sql, len(template.sql_pres_param_names)):
+                report.prepared.append(sql)
+            else:
+                report.skipped.append(sql)
+        except Exception as e:
+            report.failed.append((sql, e))
+    if report.failed and raise_error:
+        raise SqlPrepareException('Invalid sql:\n' + '\n'.join(f'  {sql}\n    {e!r}' for sql, e in report.failed))
+    return report
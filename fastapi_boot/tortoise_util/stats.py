@@ -0,0 +1,180 @@
+import logging
+import threading
+from bisect import bisect_left
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from fastapi import FastAPI
+from tortoise import Tortoise
+
+if TYPE_CHECKING:
+    from .decorator import Sql
+
+logger = logging.getLogger('fastapi_boot.sql')
+
+# upper bounds of latency buckets, seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def redact_params(values: Sequence[Any] | None) -> list[str]:
+    """bound params ==> their type names, values are never logged"""
+    return [f'<{type(v).__name__}>' for v in values or ()]
+
+
+def format_bucket(index: int) -> str:
+    return f'<={LATENCY_BUCKETS[index]}s' if index < len(LATENCY_BUCKETS) else f'>{LATENCY_BUCKETS[-1]}s'
+
+
+@dataclass
+class TemplateStats:
+    """stats of a sql template"""
+    sql: str
+    count: int = 0
+    errors: int = 0
+    # seconds waiting for the driver
+    driver_time: float = 0
+    # seconds converting rows to dict, BaseModel...
+    convert_time: float = 0
+    max_time: float = 0
+    rows: int = 0
+    # approximate bytes of rows
+    bytes: int = 0
+    slow: int = 0
+    # counts of LATENCY_BUCKETS, the last one is for slower calls
+    histogram: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    # query plan of the last slow call, only sqlite
+    plan: list[str] | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        total = self.driver_time + self.convert_time
+        return dict(
+            sql=self.sql,
+            count=self.count,
+            errors=self.errors,
+            total_time=total,
+            avg_time=total / self.count if self.count else 0,
+            max_time=self.max_time,
+            driver_time=self.driver_time,
+            convert_time=self.convert_time,
+            rows=self.rows,
+            bytes=self.bytes,
+            slow=self.slow,
+            histogram={format_bucket(i): c for i, c in enumerate(self.histogram) if c},
+            plan=self.plan,
+        )
+
+
+@dataclass
+class SqlStats:
+    """Stats of Sql / Select / Insert / Update / Delete executions grouped by sql template, disabled by default.
+
+    ```python
+    sql_stats.enable(slow_threshold=0.2, explain=True)
+    ...
+    sql_stats.snapshot()  # sorted by total time
+    ```
+    """
+    enabled: bool = False
+    # seconds, slower calls are logged by logger 'fastapi_boot.sql' with redacted params
+    slow_threshold: float = 0.5
+    # capture `EXPLAIN QUERY PLAN` of slow calls, only sqlite
+    explain: bool = False
+    templates: dict[str, TemplateStats] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def enable(self, slow_threshold: float | None = None, explain: bool | None = None):
+        if slow_threshold is not None:
+            self.slow_threshold = slow_threshold
+        if explain is not None:
+            self.explain = explain
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def get(self, sql: str) -> TemplateStats:
+        if (stats := self.templates.get(sql)) is None:
+            with self.lock:
+                stats = self.templates.setdefault(sql, TemplateStats(sql))
+        return stats
+
+    async def record(
+        self,
+        template: 'Sql',
+        values: Sequence[Any] | None,
+        driver_time: float,
+        convert_time: float = 0,
+        rows: int = 0,
+        nbytes: int = 0,
+    ):
+        """record a successful execution
+
+        Args:
+            template (Sql)
+            values (Sequence[Any] | None): bound params
+            driver_time (float): seconds waiting for the driver
+            convert_time (float, optional): seconds converting rows. Defaults to 0.
+            rows (int, optional): rows returned or affected. Defaults to 0.
+            nbytes (int, optional): approximate bytes of rows. Defaults to 0.
+        """
+        stats = self.get(template.sql)
+        elapsed = driver_time + convert_time
+        with self.lock:
+            stats.count += 1
+            stats.driver_time += driver_time
+            stats.convert_time += convert_time
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.rows += rows
+            stats.bytes += nbytes
+            stats.histogram[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            if is_slow := elapsed >= self.slow_threshold:
+                stats.slow += 1
+        if is_slow:
+            logger.warning('Slow sql %.3fs (driver %.3fs, convert %.3fs): %s params=%s',
+                           elapsed, driver_time, convert_time, template.sql, redact_params(values))
+            if self.explain:
+                await self.capture_plan(template, stats, values)
+
+    def record_error(self, template: 'Sql'):
+        stats = self.get(template.sql)
+        with self.lock:
+            stats.errors += 1
+
+    async def capture_plan(self, template: 'Sql', stats: TemplateStats, values: Sequence[Any] | None):
+        conn = Tortoise.get_connection(template.connection_name)
+        if conn.capabilities.dialect != 'sqlite' or values is None:
+            return
+        try:
+            _, resp = await conn.execute_query(f'EXPLAIN QUERY PLAN {template.format_sql(conn)}', list(values))
+        except Exception as e:
+            logger.warning('Fail to explain sql %s: %r', template.sql, e)
+            return
+        stats.plan = [dict(i).get('detail', '') for i in resp]
+        logger.warning('Query plan of %s:\n  %s', template.sql, '\n  '.join(stats.plan))
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """stats of all templates, sorted by total time desc"""
+        with self.lock:
+            items = [i.to_dict() for i in self.templates.values()]
+        return sorted(items, key=lambda i: i['total_time'], reverse=True)
+
+    def reset(self):
+        with self.lock:
+            self.templates.clear()
+
+
+# shared by all sql templates in the process
+sql_stats = SqlStats()
+
+
+def mount_sql_stats(app: FastAPI, path: str = '/sql-stats', include_in_schema: bool = False):
+    """add a GET endpoint which returns `sql_stats.snapshot()`, and enable sql_stats
+
+    ```python
+    app = FastAPI()
+    mount_sql_stats(app, '/admin/sql-stats')
+    ```
+    """
+    sql_stats.enable()
+    app.add_api_route(path, sql_stats.snapshot, methods=['GET'], include_in_schema=include_in_schema)
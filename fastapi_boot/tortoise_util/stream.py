@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+from collections.abc import AsyncGenerator, AsyncIterable, Sequence
+from dataclasses import asdict, is_dataclass
+from typing import Any
+
+from pydantic import BaseModel
+
+
+def to_dict(item: Any) -> dict:
+    """BaseModel, dataclass instance or mapping ==> dict"""
+    if isinstance(item, BaseModel):
+        return item.model_dump(mode='json')
+    if is_dataclass(item) and not isinstance(item, type):
+        return asdict(item)
+    return dict(item)
+
+
+async def ndjson_lines(items: AsyncIterable[Any]) -> AsyncGenerator[str, None]:
+    """one json line for each item, can be the content of StreamingResponse
+
+    ```python
+    @Get('/export')
+    def export(self):
+        return StreamingResponse(ndjson_lines(self.repo.export_users()), media_type='application/x-ndjson')
+    ```
+    """
+    async for item in items:
+        if isinstance(item, BaseModel):
+            yield item.model_dump_json() + '\n'
+        else:
+            yield json.dumps(to_dict(item), ensure_ascii=False, default=str) + '\n'
+
+
+async def csv_lines(items: AsyncIterable[Any], fieldnames: Sequence[str] | None = None) -> AsyncGenerator[str, None]:
+    """csv header and one line for each item, can be the content of StreamingResponse
+
+    Args:
+        items (AsyncIterable[Any])
+        fieldnames (Sequence[str] | None, optional): columns, keys of the first item if None. Defaults to None.
+    """
+    buffer = io.StringIO()
+    writer: csv.DictWriter | None = None
+    async for item in items:
+        row = to_dict(item)
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames or list(row), extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
@@ -0,0 +1,85 @@
+import asyncio
+import importlib
+import sys
+import textwrap
+from itertools import count
+from pathlib import Path
+
+import pytest
+
+_ids = count()
+
+
+@pytest.fixture
+def make_project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """write {relative path: source} as a package under tmp_path, import it's main.py which calls provide_app
+
+    ```python
+    main = make_project({
+        'main.py': 'app = provide_app(FastAPI())',
+        'service.py': '...',
+    })
+    ```
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    packages: list[str] = []
+
+    def make(files: dict[str, str], main: str = 'main'):
+        package = f'fastapi_boot_test_{next(_ids)}'
+        packages.append(package)
+        for rel, source in files.items():
+            path = tmp_path / package / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(textwrap.dedent(source), encoding='utf-8')
+        return importlib.import_module(f'{package}.{main}')
+
+    yield make
+    for name in list(sys.modules):
+        if name.split('.')[0] in packages:
+            sys.modules.pop(name)
+
+
+SCHEMA = '''
+create table user (
+    id integer primary key autoincrement,
+    name varchar(20) not null,
+    age int not null,
+    meta text
+);
+'''
+
+
+@pytest.fixture
+def run_db(tmp_path: Path):
+    """run a coroutine function with Tortoise connected to a sqlite file with table user
+
+    ```python
+    def test_foo(run_db):
+        async def main():
+            ...
+        run_db(main)
+    ```
+    """
+    from tortoise import Tortoise
+
+    def run(main, *rows: tuple[str, int, str | None]):
+        async def wrapper():
+            await Tortoise.init(db_url=f'sqlite://{tmp_path / "db.sqlite3"}', modules={'models': []})
+            try:
+                conn = Tortoise.get_connection('default')
+                await conn.execute_script(SCHEMA)
+                for row in rows:
+                    await conn.execute_query('insert into user(name, age, meta) values (?, ?, ?)', list(row))
+                return await main()
+            finally:
+                await Tortoise.close_connections()
+
+        return asyncio.run(wrapper())
+
+    yield run
+    from fastapi_boot.tortoise_util import result_cache, sql_stats
+
+    result_cache.clear()
+    sql_stats.disable()
+    sql_stats.reset()
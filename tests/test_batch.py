@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from tortoise import Tortoise
+
+from fastapi_boot.tortoise_util import Select, batch_scope
+
+ROWS = [('foo', 20, None), ('bar', 21, None), ('baz', 22, None)]
+
+
+def spy_queries(executed: list[str]):
+    conn = Tortoise.get_connection('default')
+    execute_query = conn.execute_query
+
+    async def spy(sql, values=None):
+        executed.append(sql)
+        return await execute_query(sql, values)
+
+    conn.execute_query = spy
+
+
+def test_concurrent_calls_are_coalesced(run_db):
+    @Select('select id, name from user u where u.age > {min_age} and u.id = {id} order by u.id', batch_key='id')
+    async def get_user(id: int, min_age: int = 0) -> dict | None: ...
+
+    async def main():
+        executed = []
+        spy_queries(executed)
+        with batch_scope():
+            users = await asyncio.gather(get_user(1), get_user(3), get_user('3'), get_user(4), get_user(1, 20))
+        assert [i and i['name'] for i in users] == ['foo', 'baz', 'baz', None, None]
+        # calls with other values of min_age are another batch
+        assert executed == [
+            'select id, name from user u where u.age > ? and u.id in (?, ?, ?) order by u.id',
+            'select id, name from user u where u.age > ? and u.id in (?) order by u.id',
+        ]
+
+    run_db(main, *ROWS)
+
+
+def test_calls_in_other_batch_scopes_are_not_coalesced(run_db):
+    @Select('select * from user where id = {id}', batch_key='id')
+    async def get_user(id: int) -> dict | None: ...
+
+    async def get_in_scope(id: int):
+        with batch_scope():
+            return await get_user(id)
+
+    async def main():
+        executed = []
+        spy_queries(executed)
+        await asyncio.gather(get_in_scope(1), get_in_scope(2))
+        assert len(executed) == 2
+        # outside of any scope, e.g. without BatchScopeMiddleware
+        executed.clear()
+        await asyncio.gather(get_user(1), get_user(2))
+        assert executed == ['select * from user where id = ?'] * 2
+
+    run_db(main, *ROWS)
+
+
+@pytest.mark.parametrize('sql, error', [
+    ('select * from user where id = {id} limit 1', '"limit"'),
+    ('select * from user where id = {id} limit 10 offset {offset}', '"limit"'),
+    ('select id, count(*) as n from user where id = {id}', '"count"'),
+    ('select id, age from user where id = {id} group by age', '"group by"'),
+    ('select distinct id from user where id = {id}', '"distinct"'),
+    ('select * from user where id = {id} or age > 20', '"or" in where'),
+    ('select * from user u join post p on p.id = {id}', 'and-term of where'),
+    ('select * from user where age > 20 and (id = {id})', 'not found at top level'),
+    ('select name from user where id = {id}', 'not selected'),
+])
+def test_unsafe_sql_is_refused_at_decoration(sql: str, error: str):
+    with pytest.raises(ValueError, match=error):
+        @Select(sql, batch_key='id')
+        async def _(id: int, offset: int = 0) -> list[dict]: ...
+
+
+def test_safe_sql_is_accepted():
+    for sql in [
+        'select u.*, (select count(*) from post p where p.user_id = u.id) as n from user u where u.id = {id}',
+        'select name, id as "id" from user where age > {age} and "id" = {id} order by name',
+    ]:
+        @Select(sql, batch_key='id')
+        async def _(id: int, age: int = 0) -> list[dict]: ...
+
+
+def test_missing_key_column_fails_callers_clearly(run_db):
+    # the select list can't be checked before executing
+    @Select('select coalesce(name, id) from user where id = {id}', batch_key='id')
+    async def get_user(id: int) -> dict | None: ...
+
+    async def main():
+        with batch_scope(), pytest.raises(ValueError, match='Column "id" of batch_key is not in the selected columns'):
+            await get_user(1)
+
+    run_db(main, *ROWS)
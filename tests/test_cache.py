@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from fastapi_boot.tortoise_util import Insert, Select, Update, result_cache
+from fastapi_boot.tortoise_util.cache import ResultCache, extract_tables
+
+from conftest import SCHEMA
+
+
+class User(BaseModel):
+    id: int
+    name: str
+    meta: dict | None = None
+
+
+def test_extract_tables():
+    assert extract_tables('select * from "public"."User" u join role r on u.role_id=r.id') == {'user', 'role'}
+    assert extract_tables('insert into `user`(name) values (?)') == {'user'}
+
+
+def test_result_read_before_eviction_is_not_stored():
+    cache = ResultCache()
+    generation = cache.generation(['user'])
+    cache.evict_tables(['user'])
+    cache.set('k', [{'id': 1}], 10, frozenset({'user'}), generation)
+    assert cache.get('k') is None
+    cache.set('k', [{'id': 1}], 10, frozenset({'user'}), cache.generation(['user']))
+    assert cache.get('k') == [{'id': 1}]
+
+
+def test_result_cache_lru_bound():
+    cache = ResultCache(max_entries=2)
+    for key in 'abc':
+        cache.set(key, [], 10, frozenset({'user'}), cache.generation(['user']))
+    assert list(cache.entries) == ['b', 'c']
+
+
+def test_cache_hit_returns_new_objects(run_db):
+    sql = Select('select id, name, meta from user where id = {id}', cache_ttl=10, construct=True)
+
+    @sql
+    async def get_user(id: int) -> User: ...
+
+    async def main():
+        first, second = await get_user(1), await get_user(1)
+        assert result_cache.hits == 1
+        assert first == second == User(id=1, name='foo', meta={'a': 1})
+        first.meta['a'] = 2
+        assert second.meta == {'a': 1}
+        # the cached row keeps the json text
+        assert [i.value for i in result_cache.entries.values()] == [(1, [{'id': 1, 'name': 'foo', 'meta': '{"a": 1}'}])]
+
+    run_db(main, ('foo', 20, '{"a": 1}'))
+
+
+def test_write_evicts_cached_results(run_db):
+    count_users = Select('select count(*) as n from user', cache_ttl=10)
+
+    async def main():
+        assert await count_users.execute() == [{'n': 0}]
+        await Insert("insert into user(name, age) values ('foo', 20)").execute()
+        assert await count_users.execute() == [{'n': 1}]
+
+    run_db(main)
+
+
+def test_rolled_back_write_is_not_served(run_db):
+    count_users = Select('select count(*) as n from user', cache_ttl=10)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            async with in_transaction():
+                await Insert("insert into user(name, age) values ('foo', 20)").execute()
+                # sees the uncommitted row
+                assert await count_users.execute() == [{'n': 1}]
+                raise RuntimeError
+        assert await count_users.execute() == [{'n': 0}]
+
+    run_db(main)
+
+
+def test_result_read_before_commit_is_evicted_after_commit(tmp_path):
+    db_url = f'sqlite://{tmp_path / "db.sqlite3"}'
+    # another connection of the same database doesn't see uncommitted writes
+    count_users = Select('select count(*) as n from user', cache_ttl=10, connection_name='reader')
+    rename = Update("update user set name = 'bar'")
+    insert_many = Insert('insert into user(name, age) values ({name}, {age})')
+
+    async def main():
+        await Tortoise.init(config=dict(connections=dict(default=db_url, reader=db_url),
+                                        apps=dict(models=dict(models=[]))))
+        try:
+            await Tortoise.get_connection('default').execute_script(SCHEMA)
+            async with in_transaction('default'):
+                await insert_many.many([dict(name='foo', age=20)])
+                assert await rename.execute() == 1
+                assert await count_users.execute() == [{'n': 0}]
+            assert await count_users.execute() == [{'n': 1}]
+        finally:
+            await Tortoise.close_connections()
+
+    try:
+        asyncio.run(main())
+    finally:
+        result_cache.clear()
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+
+from pydantic import BaseModel, Json
+
+from fastapi_boot.tortoise_util.convert import get_json_keys, make_row_converter, make_rows_converter, parse_execute_res
+
+
+class Meta(BaseModel):
+    x: int
+
+
+class User(BaseModel):
+    id: int
+    name: str
+    meta: Meta | None = None
+    tags: list[str] = []
+
+
+@dataclass
+class UserDC:
+    id: int
+    name: str
+    tags: dict
+
+
+def make_row(**kwds) -> dict:
+    return dict(id=1, name='{"not": "json column"}', meta='{"x": 1}', tags='["a"]', **kwds)
+
+
+def test_only_json_fields_are_decoded():
+    row = make_row()
+    user = make_row_converter(User)(row)
+    assert user == User(id=1, name='{"not": "json column"}', meta=Meta(x=1), tags=['a'])
+    # the driver's row isn't mutated
+    assert row == make_row()
+
+
+def test_optional_annotation_is_unwrapped():
+    assert make_row_converter(User | None)(make_row()).meta == Meta(x=1)
+
+
+def test_construct_builds_new_objects_each_time():
+    convert = make_row_converter(User, construct=True)
+    row = make_row()
+    a, b = convert(row), convert(row)
+    assert a.tags == ['a'] and a.tags is not b.tags
+    assert row == make_row()
+
+
+def test_rows_converter_validates_in_one_batch():
+    rows = [make_row(), dict(id=2, name='bar', meta=None, tags='[]')]
+    users = make_rows_converter(User)(rows)
+    assert [u.id for u in users] == [1, 2]
+    assert users[1].meta is None
+    assert rows[0] == make_row()
+
+
+def test_dataclass_and_untyped_rows():
+    assert make_row_converter(UserDC)(dict(id=1, name='foo', tags='{"a": 1}')) == UserDC(1, 'foo', {'a': 1})
+    # untyped rows still try every str which looks like json
+    assert make_row_converter(None) is parse_execute_res
+    assert parse_execute_res(dict(a='{"b": "[1]"}', c='[x')) == dict(a={'b': [1]}, c='[x')
+
+
+class Raw(BaseModel):
+    id: int
+    tags: list[str] | str
+
+
+class Declared(BaseModel):
+    tags: Json[list[str]]
+    meta: Json[Meta] | None = None
+    extra: Json
+
+
+def test_malformed_json_is_kept():
+    row = dict(id=1, tags='[not json')
+    assert make_row_converter(Raw)(row) == Raw(id=1, tags='[not json')
+    assert make_row_converter(Raw, construct=True)(row).tags == '[not json'
+    assert make_rows_converter(Raw)([row])[0].tags == '[not json'
+
+
+def test_pydantic_json_fields_are_decoded_once():
+    row = dict(tags='["a"]', meta='{"x": 1}', extra='{"a": 1}')
+    assert get_json_keys(Declared) == ()
+    assert make_row_converter(Declared)(row) == Declared(tags='["a"]', meta='{"x": 1}', extra='{"a": 1}')
+    assert make_rows_converter(Declared)([row])[0].meta == Meta(x=1)
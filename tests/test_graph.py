@@ -0,0 +1,120 @@
+from importlib import import_module
+
+import pytest
+
+from fastapi_boot.core.graph import DependencyGraph, Provider, topo_layers
+from fastapi_boot.core.model import DependencyCycleException
+
+
+class A:
+    ...
+
+
+class BaseB:
+    ...
+
+
+class B(BaseB):
+    ...
+
+
+class C:
+    ...
+
+
+def make_provider(graph: DependencyGraph, key, requires, built: list):
+    graph.add(Provider(key, requires, lambda: built.append(key)))
+
+
+def test_topo_layers():
+    edges = {'a': ['b', 'c'], 'b': ['c'], 'c': [], 'd': []}
+    assert topo_layers(edges, edges.__getitem__) == [['c', 'd'], ['b'], ['a']]
+
+
+def test_build_all_in_dependency_order():
+    graph = DependencyGraph()
+    built = []
+    make_provider(graph, (A, None), [(B, None)], built)
+    make_provider(graph, (B, None), [(C, None)], built)
+    make_provider(graph, (C, None), [], built)
+    graph.build_all()
+    assert built == [(C, None), (B, None), (A, None)]
+    assert graph.sealed
+
+
+def test_requirement_by_base_class_is_built_first():
+    graph = DependencyGraph()
+    built = []
+    make_provider(graph, (A, None), [(BaseB, None)], built)
+    make_provider(graph, (B, None), [], built)
+    graph.build_all()
+    assert built == [(B, None), (A, None)]
+
+
+def test_cycle_reported_when_added():
+    graph = DependencyGraph()
+    make_provider(graph, (A, None), [(C, None)], [])
+    with pytest.raises(DependencyCycleException, match='C -> A -> C'):
+        make_provider(graph, (C, None), [(A, None)], [])
+    # the provider closing the cycle isn't recorded
+    assert list(graph.providers) == [(A, None)]
+
+
+def test_cycle_through_base_class_reported_with_path():
+    graph = DependencyGraph()
+    make_provider(graph, (A, None), [(BaseB, None)], [])
+    with pytest.raises(DependencyCycleException, match='B -> A -> B'):
+        make_provider(graph, (B, None), [(A, None)], [])
+
+
+def test_decorator_may_require_its_base_class():
+    class LoggingB(BaseB):
+        ...
+
+    graph = DependencyGraph()
+    built = []
+    make_provider(graph, (B, None), [], built)
+    make_provider(graph, (LoggingB, 'logging'), [(BaseB, None)], built)
+    graph.build_all()
+    assert built == [(B, None), (LoggingB, 'logging')]
+
+
+def test_cycle_of_injections_inside_constructors():
+    graph = DependencyGraph()
+    # requirements not declared in signatures are found while building
+    graph.add(Provider((A, None), [], lambda: graph.resolve((C, None))))
+    graph.add(Provider((C, None), [], lambda: graph.resolve((A, None))))
+    with pytest.raises(DependencyCycleException, match='A -> C -> A'):
+        graph.resolve((A, None))
+
+
+def test_provide_app_with_dep_graph(make_project):
+    main = make_project({
+        'main.py': '''
+            from fastapi import FastAPI
+            from fastapi_boot.core import provide_app
+
+            app = provide_app(FastAPI(), dep_graph=True)
+        ''',
+        'log.py': 'built = []',
+        'service.py': '''
+            from fastapi_boot.core import Injectable
+            from .log import built
+            from .repo import Repo
+
+            @Injectable
+            class Service:
+                def __init__(self, repo: Repo):
+                    built.append('service')
+        ''',
+        'repo.py': '''
+            from fastapi_boot.core import Injectable
+            from .log import built
+
+            @Injectable
+            class Repo:
+                def __init__(self):
+                    built.append('repo')
+        ''',
+    })
+    assert import_module(f'{main.__package__}.log').built == ['repo', 'service']
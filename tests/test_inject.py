@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import httpx
+
+MAIN = '''
+    from fastapi import FastAPI
+    from fastapi_boot.core import provide_app
+
+    app = provide_app(FastAPI(), inject_timeout=5)
+'''
+
+
+def test_inject_in_event_loop_fails_fast_and_aget_waits(make_project):
+    main = make_project({
+        'main.py': MAIN,
+        'controller.py': '''
+            import asyncio
+            import time
+            from fastapi_boot.core import Bean, Controller, Get, Inject
+            from fastapi_boot.core.model import InjectFailException
+
+            class Late:
+                ...
+
+            async def provide_later():
+                await asyncio.sleep(0.2)
+                Bean('late')(lambda: Late())
+
+            @Controller('/late')
+            class LateController:
+                @Get('/inject')
+                async def inject(self):
+                    start = time.perf_counter()
+                    try:
+                        Inject(Late, 'late')
+                    except InjectFailException as e:
+                        return [str(e), time.perf_counter() - start]
+
+                @Get('/aget')
+                async def aget(self):
+                    asyncio.get_running_loop().create_task(provide_later())
+                    return type(await Inject.aget(Late, 'late')).__name__
+
+                @Get('/ping')
+                async def ping(self):
+                    return 'pong'
+        ''',
+    })
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            msg, seconds = (await client.get('/late/inject')).json()
+            # instead of blocking the loop for inject_timeout seconds
+            assert seconds < 0.1
+            assert 'await Inject.aget(...)' in msg
+            aget = asyncio.ensure_future(client.get('/late/aget'))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            # the loop isn't blocked while waiting
+            assert (await client.get('/late/ping')).json() == 'pong'
+            assert time.perf_counter() - start < 0.1
+            assert (await aget).json() == 'Late'
+
+    asyncio.run(run())
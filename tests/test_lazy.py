@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from fastapi_boot.core import Lazy
+
+
+def test_computed_once_for_each_instance():
+    calls = []
+
+    class Foo:
+        bar = Lazy(lambda: calls.append(1) or len(calls))
+
+    foo1, foo2 = Foo(), Foo()
+    assert (foo1.bar, foo1.bar, foo2.bar) == (1, 1, 2)
+    assert foo1.__dict__['bar'] == 1
+    assert isinstance(Foo.__dict__['bar'], type(Foo.bar))
+
+
+def test_instances_without_dict():
+    class Foo:
+        __slots__ = ('__weakref__',)
+        bar = Lazy(object)
+
+    foo = Foo()
+    assert foo.bar is foo.bar
+    assert Foo().bar is not foo.bar
+
+
+def test_instances_do_not_wait_for_each_other():
+    class Foo:
+        bar = Lazy(lambda: time.sleep(0.2) or threading.get_ident())
+
+    foos = [Foo() for _ in range(4)]
+    threads = [threading.Thread(target=lambda f=f: f.bar) for f in foos]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.perf_counter() - start < 0.6
+    assert len({f.bar for f in foos}) == 4
+
+
+def test_reentrant_access_of_another_instance():
+    def get_bar():
+        # the first one is computed from the second one
+        return 1 if computing else computing.append(1) or Foo().bar + 1
+
+    class Foo:
+        bar = Lazy(get_bar)
+
+    computing = []
+    values = []
+    # it used to dead lock
+    thread = threading.Thread(target=lambda: values.append(Foo().bar), daemon=True)
+    thread.start()
+    thread.join(1)
+    assert values == [2]
+
+
+def test_first_stored_value_is_kept():
+    barrier = threading.Barrier(2)
+
+    class Foo:
+        bar = Lazy(lambda: barrier.wait(1) or object())
+
+    foo = Foo()
+    values = []
+    threads = [threading.Thread(target=lambda: values.append(foo.bar)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert values[0] is values[1] is foo.bar
+
+
+def test_untouched_lazy_dependencies_are_logged_at_shutdown(make_project, caplog):
+    main = make_project({
+        'main.py': '''
+            from fastapi import FastAPI
+            from fastapi_boot.core import provide_app
+
+            app = provide_app(FastAPI())
+        ''',
+        'service.py': '''
+            from fastapi_boot.core import Controller, Get, Injectable
+
+            @Injectable(lazy=True)
+            class ReportService:
+                def count(self):
+                    return 1
+
+            @Injectable(lazy=True)
+            class Exporter:
+                ...
+
+            @Controller('/report')
+            class ReportController:
+                def __init__(self, service: ReportService):
+                    self.service = service
+
+                @Get()
+                def get(self):
+                    return self.service.count()
+        ''',
+    })
+    with caplog.at_level(logging.INFO, 'fastapi_boot.lifecycle'):
+        with TestClient(main.app) as client:
+            assert 'lazy' not in caplog.text
+            assert client.get('/report').json() == 1
+    assert '2 lazy dependencies, 1 built, 1 untouched: Exporter' in caplog.text
@@ -0,0 +1,249 @@
+import time
+from importlib import import_module
+
+from fastapi.testclient import TestClient
+
+from fastapi_boot.core.const import app_store
+
+MAIN = '''
+    from fastapi import FastAPI
+    from fastapi_boot.core import provide_app
+
+    app = provide_app(FastAPI())
+'''
+
+
+def test_async_dependencies_start_before_lifespan(make_project):
+    main = make_project({
+        'main.py': MAIN,
+        'log.py': 'events = []',
+        'service.py': '''
+            import asyncio
+            from fastapi import FastAPI
+            from fastapi_boot.core import Bean, Controller, Get, Inject, Injectable, Lifespan
+            from .log import events
+
+            class Pool:
+                ...
+
+            class Model:
+                ...
+
+            @Bean
+            async def pool() -> Pool:
+                await asyncio.sleep(0.2)
+                events.append('pool')
+                return Pool()
+
+            @Bean
+            async def model() -> Model:
+                await asyncio.sleep(0.2)
+                events.append('model')
+                return Model()
+
+            @Injectable
+            class ModelService:
+                def __init__(self, pool: Pool, model: Model):
+                    self.pool = pool
+                    events.append('service')
+
+                async def __ainit__(self):
+                    events.append('ainit')
+
+            @Bean
+            def report(service: ModelService) -> dict:
+                # built once ModelService is ready
+                events.append('report')
+                return {'pool': type(service.pool).__name__}
+
+            @Lifespan
+            async def _(app: FastAPI):
+                events.append('lifespan')
+                yield
+
+            @Controller('/model')
+            class ModelController:
+                service = Inject(ModelService)
+                report = Inject(dict)
+
+                @Get()
+                def get(self):
+                    return [type(self.service.pool).__name__, self.report]
+        ''',
+    })
+    events = import_module(f'{main.__package__}.log').events
+    # nothing is started while scanning
+    assert events == []
+    start = time.perf_counter()
+    with TestClient(main.app) as client:
+        # independent ones start concurrently
+        assert time.perf_counter() - start < 0.35
+        assert sorted(events[:2]) == ['model', 'pool']
+        assert events[2:] == ['service', 'ainit', 'report', 'lifespan']
+        assert client.get('/model').json() == ['Pool', {'pool': 'Pool'}]
+
+
+def test_dependencies_are_closed_dependents_first(make_project):
+    main = make_project({
+        'main.py': '''
+            from fastapi import FastAPI
+            from fastapi_boot.core import provide_app
+
+            app = provide_app(FastAPI(), close_deps=True, close_timeout=0.2)
+        ''',
+        'log.py': 'events = []',
+        'service.py': '''
+            import asyncio
+            import time
+            from fastapi_boot.core import Bean, Injectable
+            from .log import events
+
+            class Pool:
+                def close(self):
+                    time.sleep(0.1)
+                    events.append('pool')
+
+            class Cache:
+                async def __aexit__(self, *args):
+                    await asyncio.sleep(0.1)
+                    events.append('cache')
+
+            class Stuck:
+                async def aclose(self):
+                    await asyncio.sleep(10)
+
+            class Broken:
+                def close(self):
+                    raise RuntimeError('broken')
+
+            @Bean
+            def pool() -> Pool:
+                return Pool()
+
+            @Bean
+            def cache() -> Cache:
+                return Cache()
+
+            @Bean
+            def stuck() -> Stuck:
+                return Stuck()
+
+            @Bean
+            def broken() -> Broken:
+                return Broken()
+
+            @Injectable
+            class Repo:
+                def __init__(self, pool: Pool, cache: Cache):
+                    ...
+
+                async def aclose(self):
+                    events.append('repo')
+        ''',
+    })
+    events = import_module(f'{main.__package__}.log').events
+    with TestClient(main.app):
+        ...
+    assert events[0] == 'repo'
+    assert sorted(events[1:]) == ['cache', 'pool']
+    report = next(iter(app_store.app_dic.values())).lifecycle.shutdown_report
+    assert {r.key[0].__name__: r.status for r in report.results} == dict(
+        Repo='closed', Pool='closed', Cache='closed', Stuck='timeout', Broken='failed')
+    # independent ones in the same layer are closed concurrently
+    assert report.seconds < 0.45
+
+
+def test_close_order_follows_injected_and_held_dependencies(make_project):
+    main = make_project({
+        'main.py': '''
+            from fastapi import FastAPI
+            from fastapi_boot.core import provide_app
+
+            app = provide_app(FastAPI(), close_deps=True)
+        ''',
+        'log.py': 'events = []',
+        'service.py': '''
+            import asyncio
+            from fastapi_boot.core import Bean, Inject, Injectable
+            from .log import events
+
+            class Client:
+                async def aclose(self):
+                    events.append('client')
+
+            class Store:
+                async def aclose(self):
+                    events.append('store')
+
+            class Pool(Store):
+                async def aclose(self):
+                    events.append('pool')
+
+            @Bean
+            def client() -> Client:
+                return Client()
+
+            @Bean
+            def pool() -> Pool:
+                return Pool()
+
+            @Injectable
+            class ByInit:
+                def __init__(self):
+                    self.client = Inject(Client)
+
+                async def aclose(self):
+                    await asyncio.sleep(0.05)
+                    events.append('init')
+
+            @Injectable
+            class ByClassBody:
+                client = Inject(Client)
+
+                async def aclose(self):
+                    await asyncio.sleep(0.05)
+                    events.append('class body')
+
+            @Injectable
+            class ByBase:
+                def __init__(self, store: Store):
+                    ...
+
+                async def aclose(self):
+                    await asyncio.sleep(0.05)
+                    events.append('base')
+        ''',
+    })
+    events = import_module(f'{main.__package__}.log').events
+    with TestClient(main.app):
+        ...
+    assert sorted(events[:3]) == ['base', 'class body', 'init']
+    assert sorted(events[3:]) == ['client', 'pool']
+
+
+def test_dependencies_are_not_closed_by_default(make_project):
+    main = make_project({
+        'main.py': '''
+            from fastapi import FastAPI
+            from fastapi_boot.core import provide_app
+
+            app = provide_app(FastAPI())
+        ''',
+        'service.py': '''
+            from fastapi_boot.core import Bean
+
+            class Client:
+                closed = False
+
+                def close(self):
+                    self.closed = True
+
+            @Bean
+            def client() -> Client:
+                return Client()
+        ''',
+    })
+    with TestClient(main.app):
+        ...
+    record = next(iter(app_store.app_dic.values()))
+    assert record.lifecycle.shutdown_report.results == []
@@ -0,0 +1,111 @@
+from importlib import import_module
+
+from fastapi.testclient import TestClient
+
+MAIN = '''
+    from fastapi import FastAPI
+    from fastapi_boot.core import provide_app
+
+    app = provide_app(FastAPI())
+'''
+
+
+def test_http_middleware_forms(make_project):
+    main = make_project({
+        'main.py': MAIN,
+        'middleware.py': '''
+            from fastapi import Request
+            from starlette.types import ASGIApp, Message, Receive, Scope, Send
+            from fastapi_boot.core import Get, HTTPMiddleware
+
+            def add_header(send: Send, name: bytes):
+                async def wrapper(message: Message):
+                    if message['type'] == 'http.response.start':
+                        message['headers'] = [*message['headers'], (name, b'1')]
+                    await send(message)
+                return wrapper
+
+            @HTTPMiddleware
+            async def base(request: Request, call_next):
+                resp = await call_next(request)
+                resp.headers['x-base'] = '1'
+                return resp
+
+            @HTTPMiddleware
+            async def asgi(scope: Scope, receive: Receive, send: Send, call_next: ASGIApp):
+                await call_next(scope, receive, add_header(send, b'x-asgi'))
+
+            @HTTPMiddleware
+            class ASGIClass:
+                def __init__(self, app: ASGIApp):
+                    self.app = app
+
+                async def __call__(self, scope: Scope, receive: Receive, send: Send):
+                    if scope['type'] == 'http':
+                        send = add_header(send, b'x-asgi-cls')
+                    await self.app(scope, receive, send)
+
+            @Get('/hello')
+            def hello():
+                return 'world'
+        ''',
+    })
+    with TestClient(main.app) as client:
+        resp = client.get('/hello')
+        assert resp.json() == 'world'
+        assert {'x-base', 'x-asgi', 'x-asgi-cls'} <= resp.headers.keys()
+
+
+def test_asgi_dispatch_only_sees_http(make_project):
+    main = make_project({
+        'main.py': MAIN,
+        'middleware.py': '''
+            from fastapi import WebSocket
+            from starlette.types import ASGIApp, Receive, Scope, Send
+            from fastapi_boot.core import HTTPMiddleware, WS
+
+            seen = []
+
+            @HTTPMiddleware
+            async def asgi(scope: Scope, receive: Receive, send: Send, call_next: ASGIApp):
+                seen.append(scope['type'])
+                await call_next(scope, receive, send)
+
+            @WS('/ws')
+            async def ws(websocket: WebSocket):
+                await websocket.accept()
+                await websocket.send_text('hi')
+                await websocket.close()
+        ''',
+    })
+    with TestClient(main.app) as client:
+        with client.websocket_connect('/ws') as websocket:
+            assert websocket.receive_text() == 'hi'
+        client.get('/missing')
+    middleware = import_module(f'{main.__package__}.middleware')
+    assert middleware.seen == ['http']
+
+
+def test_asgi_dispatch_is_decided_by_names_or_annotations():
+    from fastapi import Request
+    from starlette.types import ASGIApp, Receive, Scope, Send
+
+    from fastapi_boot.core.helper import is_asgi_dispatch
+
+    async def by_names(scope, receive, send, call_next): ...
+
+    async def by_annotations(s: Scope, r: Receive, w: Send, app: ASGIApp): ...
+
+    async def with_defaults(request: Request, call_next, timeout: float = 1, retries: int = 0): ...
+
+    class Helper:
+        async def dispatch(self, request, call_next, extra): ...
+
+    async def four_positional(request, call_next, extra, more): ...
+
+    assert is_asgi_dispatch(by_names)
+    assert is_asgi_dispatch(by_annotations)
+    assert not is_asgi_dispatch(with_defaults)
+    assert not is_asgi_dispatch(Helper().dispatch)
+    assert not is_asgi_dispatch(Helper.dispatch)
+    assert not is_asgi_dispatch(four_positional)
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from tortoise import Tortoise
+
+from fastapi_boot.tortoise_util import Insert, Select, Sql, SqlPrepareException, prepare_sql
+
+from conftest import SCHEMA
+
+
+def run_prepare(db_path, **kwds):
+    """prepare templates of connection 'prepare', templates of other tests are on 'default'"""
+    async def main():
+        await Tortoise.init(config=dict(
+            connections=dict(prepare=f'sqlite://{db_path}'),
+            apps=dict(models=dict(models=[], default_connection='prepare')),
+        ))
+        try:
+            await Tortoise.get_connection('prepare').execute_script(SCHEMA)
+            return await prepare_sql(['prepare'], **kwds)
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(main())
+
+
+def test_prepare_reports_each_template_once(tmp_path):
+    templates = [
+        Select('select id, name from user where age > {age}', connection_name='prepare'),
+        Select('select id, name from user where age > {age}', connection_name='prepare'),
+        Insert('insert into user(name, age) values ({name}, {age})', connection_name='prepare'),
+        Sql('create index if not exists user_age on user(age)', connection_name='prepare'),
+    ]
+    report = run_prepare(tmp_path / 'db.sqlite3')
+    # templates are not ordered
+    assert sorted(report.prepared) == [
+        'insert into user(name, age) values (?, ?)',
+        'select id, name from user where age > ?',
+    ]
+    # raw Sql which isn't dml is not explained
+    assert report.skipped == ['create index if not exists user_age on user(age)']
+    assert report.failed == []
+    del templates
+
+
+def test_prepare_finds_invalid_sql(tmp_path):
+    templates = [
+        Select('select id, nme from user', connection_name='prepare'),
+        Select('select id from users', connection_name='prepare'),
+        Select('select id from user', connection_name='prepare'),
+    ]
+    with pytest.raises(SqlPrepareException) as e:
+        run_prepare(tmp_path / 'raise.sqlite3')
+    assert 'select id, nme from user' in str(e.value)
+    assert 'select id from users' in str(e.value)
+
+    report = run_prepare(tmp_path / 'report.sqlite3', raise_error=False)
+    assert sorted(sql for sql, _ in report.failed) == ['select id from users', 'select id, nme from user']
+    assert report.prepared == ['select id from user']
+    del templates
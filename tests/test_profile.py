@@ -0,0 +1,83 @@
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from fastapi_boot.core.profile import StartupProfiler
+
+
+def test_wait_is_subtracted_from_self_time():
+    profiler = StartupProfiler()
+    with profiler.span('bean a', 'bean'):
+        time.sleep(0.02)
+        with profiler.span('wait b', 'wait'):
+            time.sleep(0.05)
+    bean = next(i for i in profiler.spans if i.cat == 'bean')
+    assert bean.wait >= 0.05
+    assert bean.duration - bean.wait < 0.05
+    assert '(self 0.0' in profiler.report()
+
+
+def test_spans_of_threads_are_separated():
+    profiler = StartupProfiler()
+
+    def work(name: str):
+        with profiler.span(name, 'import'):
+            with profiler.span(f'wait {name}', 'wait'):
+                time.sleep(0.01)
+
+    threads = [threading.Thread(target=work, args=(f'mod{i}',)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # waits are added to the span of their own thread
+    imports = [s for s in profiler.spans if s.cat == 'import']
+    assert all(s.wait > 0 for s in imports)
+    assert len({s.tid for s in imports}) == 3
+    assert 'import: 3 spans' in profiler.report()
+
+
+def test_provide_app_profile(make_project, caplog: pytest.LogCaptureFixture):
+    with caplog.at_level(logging.INFO, 'fastapi_boot.profile'):
+        main = make_project({
+            'main.py': '''
+                from fastapi import FastAPI
+                from fastapi_boot.core import provide_app
+
+                app = provide_app(FastAPI(), profile='trace.json')
+            ''',
+            'service.py': '''
+                from fastapi_boot.core import Bean, Controller, Get, Injectable
+
+                @Injectable
+                class Repo:
+                    ...
+
+                @Bean
+                def service(repo: Repo) -> dict:
+                    return {}
+
+                @Controller('/foo')
+                class FooController:
+                    @Get()
+                    def get(self):
+                        return 'foo'
+            ''',
+        })
+    assert 'Startup profile:' in caplog.text
+    events = json.loads(Path('trace.json').read_text(encoding='utf-8'))['traceEvents']
+    module = f'{main.__package__}.service'
+    assert {(e['cat'], e['name']) for e in events} >= {
+        ('startup', 'scan'),
+        ('startup', 'import'),
+        ('import', module),
+        ('bean', f'injectable {module}.Repo'),
+        ('bean', f'bean {module}.service'),
+        ('controller.resolve', f'resolve {module}.FooController'),
+        ('controller.mount', f'mount {module}.FooController'),
+    }
+    assert all(e['dur'] >= 0 and 'wait_ms' in e['args'] for e in events)
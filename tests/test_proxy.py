@@ -0,0 +1,119 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+from fastapi.testclient import TestClient
+
+from fastapi_boot.core.proxy import DepProxy
+
+
+class Box:
+    def __init__(self, items: list):
+        self.items = items
+        self.events = []
+
+    def __enter__(self):
+        self.events.append('enter')
+        return self
+
+    def __exit__(self, *args):
+        self.events.append('exit')
+
+    async def __aenter__(self):
+        self.events.append('aenter')
+        return self
+
+    async def __aexit__(self, *args):
+        self.events.append('aexit')
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+    def __setitem__(self, i, v):
+        self.items[i] = v
+
+
+class FixedProxy(DepProxy):
+    def __init__(self, ins):
+        object.__setattr__(self, '_ins', ins)
+
+    def _resolve(self):
+        return object.__getattribute__(self, '_ins')
+
+    def _dep_type(self):
+        return type(object.__getattribute__(self, '_ins'))
+
+
+def test_special_methods_are_forwarded():
+    box = Box([1, 2])
+    proxy = FixedProxy(box)
+    with proxy as ins:
+        assert ins is box
+
+    async def use():
+        async with proxy as ins:
+            return ins
+
+    assert asyncio.run(use()) is box
+    assert box.events == ['enter', 'exit', 'aenter', 'aexit']
+    assert len(proxy) == 2 and list(proxy) == [1, 2] and 2 in proxy and proxy
+    proxy[0] = 3
+    assert proxy[0] == 3 and box.items == [3, 2]
+    assert isinstance(proxy, Box) and not isinstance(proxy, dict)
+
+
+def test_operators_are_forwarded():
+    n = FixedProxy(6)
+    assert (n + 1, 1 + n, n - 1, 10 - n, n * 2, n / 4, 13 // n, n % 4, 2 ** n, -n, abs(n)) == \
+        (7, 7, 5, 4, 12, 1.5, 2, 2, 64, -6, 6)
+    assert n == 6 and n != 5 and n > 5 and n <= 6 and hash(n) == hash(6)
+    assert str(n) == '6' and int(n) == 6 and [0, 1, 2, 3, 4, 5, 6][n] == 6
+    assert not FixedProxy(0) and FixedProxy('a') + 'b' == 'ab'
+
+
+def test_pooled_sqlite_connection_with_statement(make_project):
+    main = make_project({
+        'main.py': '''
+            from fastapi import FastAPI
+            from fastapi_boot.core import provide_app
+
+            app = provide_app(FastAPI())
+        ''',
+        'controller.py': '''
+            import sqlite3
+            from fastapi_boot.core import Bean, Controller, Get, Inject, Injectable, pooled
+
+            @Bean(scope=pooled(2, timeout=5))
+            def conn() -> sqlite3.Connection:
+                conn = sqlite3.connect(':memory:', check_same_thread=False)
+                conn.execute('create table t (x int)')
+                return conn
+
+            @Injectable
+            class TService:
+                def __init__(self, conn: sqlite3.Connection):
+                    # a proxy, resolved to the connection checked out by current request when used
+                    self.conn = conn
+
+                def add(self):
+                    with self.conn:
+                        self.conn.execute('insert into t values (1)')
+                    count = self.conn.execute('select count(*) from t').fetchone()[0]
+                    return [isinstance(self.conn, sqlite3.Connection), count]
+
+            @Controller('/t')
+            class TController:
+                service = Inject(TService)
+
+                @Get()
+                def get(self):
+                    return self.service.add()
+        ''',
+    })
+    with TestClient(main.app) as client:
+        assert client.get('/t').json() == [True, 1]
@@ -0,0 +1,112 @@
+import os
+import sys
+from importlib import import_module
+from pathlib import Path
+
+import pytest
+
+from fastapi_boot.core import registry
+from fastapi_boot.core.const import app_store
+from fastapi_boot.core.scan import REGISTRY_FILENAME
+
+FILES = {
+    'main.py': '''
+        from fastapi import FastAPI
+        from fastapi_boot.core import provide_app
+
+        app = provide_app(FastAPI(), inject_timeout=2)
+    ''',
+    'controller/__init__.py': '',
+    'controller/user.py': '''
+        from fastapi_boot.core import Controller
+        from ..service import UserService
+
+        @Controller('/user')
+        class UserController:
+            ...
+    ''',
+    'model.py': '''
+        class Config:
+            ...
+    ''',
+    # finishes importing before bean.py, waiting for Config
+    'service.py': '''
+        from fastapi_boot.core import Inject, Injectable
+        from .model import Config
+
+        config = Inject(Config)
+
+        @Injectable
+        class UserService:
+            ...
+    ''',
+    'bean.py': '''
+        import time
+        from fastapi_boot.core import Bean
+        from .model import Config
+
+        @Bean
+        def _() -> Config:
+            return Config()
+
+        @Bean('slow')
+        def _() -> int:
+            time.sleep(0.2)
+            return 1
+    ''',
+}
+
+
+def build(make_project, monkeypatch: pytest.MonkeyPatch):
+    """build the registry of a project like `fastapi-boot build`"""
+    monkeypatch.setattr(registry, 'building', True)
+    main = make_project(FILES)
+    monkeypatch.setattr(registry, 'building', False)
+    recorder = next(i.recorder for i in app_store.app_dic.values() if i.recorder is not None)
+    registry.write_registry(recorder)
+    return main, recorder.modules
+
+
+def restart(main):
+    """import main again as a new process does, return the app's record"""
+    package = main.__package__
+    for name in [i for i in sys.modules if i.split('.')[0] == package]:
+        sys.modules.pop(name)
+    app_store.clear()
+    import_module(f'{package}.main')
+    return next(iter(app_store.app_dic.values()))
+
+
+def test_registry_imports_providers_first(make_project, monkeypatch: pytest.MonkeyPatch):
+    main, modules = build(make_project, monkeypatch)
+    package = main.__package__
+    assert modules.index(f'{package}.service') < modules.index(f'{package}.bean')
+    # the registry is loaded by stating recorded paths, without walking the project
+    monkeypatch.setattr(registry, 'walk_py_files', None)
+    loaded = registry.load_registry(str(Path(main.__file__).parent), registry.get_registry_options([], None))
+    assert loaded is not None and loaded[0] == f'{package}.bean' and sorted(loaded) == sorted(modules)
+    # service waits for Config as when scanning, instead of blocking bean.py which provides it
+    record = restart(main)
+    assert record.scan_report is None
+    assert isinstance(import_module(f'{package}.service').config, import_module(f'{package}.model').Config)
+
+
+@pytest.mark.parametrize('change, stale', [
+    # edited
+    (lambda root: (root / 'service.py').write_text('# edited', encoding='utf-8'), True),
+    # added to or removed from a directory which has scanned files
+    (lambda root: (root / 'controller' / 'role.py').write_text('', encoding='utf-8'), True),
+    (lambda root: (root / 'controller' / 'user.py').unlink(), True),
+    (lambda root: (root / 'repo').mkdir(), True),
+    # directories which are not scanned
+    (lambda root: (root / '__pycache__' / 'x.py').write_text('', encoding='utf-8'), False),
+    (lambda root: (root / '.venv').mkdir(), False),
+    (lambda root: (root / 'README.md').write_text('', encoding='utf-8'), False),
+])
+def test_stale_registry_is_ignored(make_project, monkeypatch: pytest.MonkeyPatch, change, stale: bool):
+    main, modules = build(make_project, monkeypatch)
+    root = Path(main.__file__).parent
+    os.makedirs(root / '__pycache__', exist_ok=True)
+    change(root)
+    loaded = registry.load_registry(str(root), registry.get_registry_options([], None))
+    assert loaded is None if stale else sorted(loaded) == sorted(modules)
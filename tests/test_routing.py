@@ -0,0 +1,154 @@
+import asyncio
+from importlib import import_module
+
+import httpx
+from fastapi.testclient import TestClient
+
+MAIN = '''
+    from fastapi import FastAPI
+    from fastapi_boot.core import provide_app
+
+    app = provide_app(FastAPI())
+'''
+
+
+def test_controller_endpoints(make_project):
+    main = make_project({
+        'main.py': MAIN,
+        'controller.py': '''
+            import threading
+            from fastapi import Query
+            from fastapi_boot.core import Controller, Get, Post, Prefix
+
+            @Controller('/foo')
+            class FooController:
+                name = 'foo'
+
+                @Get('/async/{id}')
+                async def get_async(self, id: int, q: str = Query('')):
+                    return dict(name=self.name, id=id, q=q)
+
+                @Post('/sync')
+                def post_sync(self, q: int = Query()):
+                    # sync endpoints still run in threadpool
+                    return dict(q=q, main=threading.current_thread() is threading.main_thread())
+
+                @Prefix('/inner')
+                class Inner:
+                    @Get()
+                    def get(self):
+                        return 'inner'
+        ''',
+    })
+    with TestClient(main.app) as client:
+        assert client.get('/foo/async/1', params=dict(q='a')).json() == dict(name='foo', id=1, q='a')
+        assert client.post('/foo/sync', params=dict(q=2)).json() == dict(q=2, main=False)
+        assert client.post('/foo/sync').status_code == 422
+        assert client.get('/foo/inner').json() == 'inner'
+
+
+
+async def concurrent_get(app, *requests: tuple[float, str, dict]) -> list:
+    """start the requests (delay, path, params) concurrently, return their json"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        async def get(delay: float, path: str, params: dict):
+            await asyncio.sleep(delay)
+            return (await client.get(path, params=params)).json()
+
+        return await asyncio.gather(*[get(*i) for i in requests])
+
+
+def test_use_dep_is_request_local(make_project):
+    main = make_project({
+        'main.py': MAIN,
+        'controller.py': '''
+            import asyncio
+            from fastapi import Query
+            from fastapi_boot.core import Controller, Get, use_dep
+
+            def get_user(user: str = Query()):
+                return user
+
+            @Controller('/user')
+            class UserController:
+                user = use_dep(get_user)
+
+                @Get()
+                async def get(self, delay: float = Query(0)):
+                    before = self.user
+                    await asyncio.sleep(delay)
+                    return [before, self.user]
+        ''',
+    })
+    # the slow request reads it's value again after the fast one has set another
+    assert asyncio.run(concurrent_get(
+        main.app,
+        (0, '/user', dict(user='slow', delay=0.1)),
+        (0.02, '/user', dict(user='fast')),
+    )) == [['slow', 'slow'], ['fast', 'fast']]
+    # the use_dep value itself when accessed from the class
+    controller = import_module(f'{main.__package__}.controller').UserController
+    assert controller.user.dependency.__name__ == 'get_user'
+
+
+def test_use_http_middleware_gets_responses_of_handled_exceptions(make_project):
+    main = make_project({
+        'main.py': MAIN,
+        'controller.py': '''
+            from fastapi import HTTPException, Query, Request
+            from fastapi_boot.core import Controller, ExceptionHandler, Get, use_http_middleware
+
+            class GuessException(Exception):
+                ...
+
+            @ExceptionHandler(GuessException)
+            def _(request: Request, exp: GuessException):
+                return {'msg': 'guess'}
+
+            async def outer(request: Request, call_next):
+                resp = await call_next(request)
+                resp.headers['x-order'] = resp.headers.get('x-order', '') + 'outer'
+                return resp
+
+            async def inner(request: Request, call_next):
+                resp = await call_next(request)
+                resp.headers['x-order'] = 'inner,'
+                return resp
+
+            @Controller('/mid')
+            class MidController:
+                _ = use_http_middleware(inner, outer)
+
+                @Get('/ok')
+                def ok(self):
+                    return 'ok'
+
+                @Get('/http-exception')
+                def http_exception(self):
+                    raise HTTPException(404, 'gone')
+
+                @Get('/validation')
+                def validation(self, q: int = Query()):
+                    return q
+
+                @Get('/custom')
+                def custom(self):
+                    raise GuessException()
+
+                @Get('/unhandled')
+                def unhandled(self):
+                    raise RuntimeError('boom')
+        ''',
+    })
+    with TestClient(main.app, raise_server_exceptions=False) as client:
+        for path, status in [('/ok', 200), ('/http-exception', 404), ('/validation', 422), ('/custom', 200)]:
+            resp = client.get('/mid' + path)
+            assert resp.status_code == status
+            # the last dispatch is the outermost, code after call_next runs for every handled response
+            assert resp.headers['x-order'] == 'inner,outer'
+        assert client.get('/mid/http-exception').json() == {'detail': 'gone'}
+        assert client.get('/mid/custom').json() == {'msg': 'guess'}
+        resp = client.get('/mid/unhandled')
+        assert resp.status_code == 500
+        assert 'x-order' not in resp.headers
@@ -0,0 +1,43 @@
+import os
+from pathlib import Path
+
+from fastapi_boot.core.scan import scan_modules
+
+
+def write_files(root: Path, files: dict[str, str]):
+    for rel, source in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source, encoding='utf-8')
+
+
+FILES = {
+    'main.py': 'from fastapi_boot.core import provide_app',
+    'service.py': 'from fastapi_boot.core import Injectable',
+    'util.py': 'x = 1',
+    '.hidden/controller.py': 'from fastapi_boot.core import Controller',
+    'venv/pyvenv.cfg': '',
+    'venv/lib/mod.py': 'import fastapi_boot',
+    'node_modules/pkg/mod.py': 'import fastapi_boot',
+}
+
+
+def test_skipped_dirs_are_configurable(tmp_path: Path):
+    write_files(tmp_path, FILES)
+    main = str(tmp_path / 'main.py')
+    assert sorted(scan_modules(str(tmp_path), main, ['app']).imported) == ['app.service', 'app.util']
+    assert sorted(scan_modules(str(tmp_path), main, ['app'], skip_dirs=False).imported) == [
+        'app..hidden.controller', 'app.node_modules.pkg.mod', 'app.service', 'app.util', 'app.venv.lib.mod']
+
+
+def test_scan_filter_and_manifest(tmp_path: Path):
+    write_files(tmp_path, FILES)
+    main = str(tmp_path / 'main.py')
+    manifest = str(tmp_path / '__pycache__' / 'scan.json')
+    report = scan_modules(str(tmp_path), main, ['app'], ['app.excluded'], ['fastapi_boot'], manifest)
+    assert (report.imported, report.skipped, report.cached) == (['app.service'], ['app.util'], 0)
+    assert os.path.isfile(manifest)
+    # verdicts of unchanged files come from the manifest, the changed one is read again
+    (tmp_path / 'util.py').write_text('import fastapi_boot  # now', encoding='utf-8')
+    report = scan_modules(str(tmp_path), main, ['app'], ['app.excluded'], ['fastapi_boot'], manifest)
+    assert (sorted(report.imported), report.skipped, report.cached) == (['app.service', 'app.util'], [], 1)
@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from fastapi_boot.core.model import PoolExhaustedException
+from fastapi_boot.core.scope import BeanPool
+
+MAIN = '''
+    from fastapi import FastAPI
+    from fastapi_boot.core import provide_app
+
+    app = provide_app(FastAPI())
+'''
+
+
+async def concurrent_get(app, paths: list[str]) -> list[httpx.Response]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        return await asyncio.gather(*[client.get(i) for i in paths])
+
+
+def test_pooled_requests_wait_for_returned_instances(make_project):
+    main = make_project({
+        'main.py': MAIN,
+        'controller.py': '''
+            import asyncio
+            import itertools
+            from fastapi_boot.core import Bean, Controller, Get, Inject, pooled
+
+            ids = itertools.count()
+            using = set()
+            peak = []
+
+            class Conn:
+                def __init__(self):
+                    self.id = next(ids)
+
+            @Bean(scope=pooled(2, timeout=5))
+            def conn() -> Conn:
+                return Conn()
+
+            @Controller('/conn')
+            class ConnController:
+                conn = Inject(Conn)
+
+                @Get('/async')
+                async def get_async(self):
+                    using.add(self.conn.id)
+                    peak.append(len(using))
+                    await asyncio.sleep(0.05)
+                    using.discard(self.conn.id)
+                    return self.conn.id
+
+                @Get('/sync')
+                def get_sync(self):
+                    return self.conn.id
+        ''',
+    })
+    responses = asyncio.run(concurrent_get(main.app, ['/conn/async'] * 8 + ['/conn/sync'] * 4))
+    assert [i.status_code for i in responses] == [200] * 12
+    # more requests than max_size queue instead of failing
+    assert {i.json() for i in responses} == {0, 1}
+    controller = __import__(f'{main.__package__}.controller', fromlist=['peak'])
+    assert max(controller.peak) <= 2
+
+
+def test_aacquire_times_out():
+    pool = BeanPool((object, None), object, 1, timeout=0.05)
+
+    async def main():
+        ins = await pool.aacquire()
+        start = time.perf_counter()
+        with pytest.raises(PoolExhaustedException, match='waited 0.05s'):
+            await pool.aacquire()
+        assert time.perf_counter() - start >= 0.05
+        pool.release(ins)
+        # the timed out waiter doesn't take the returned instance
+        assert await pool.aacquire() is ins
+
+    asyncio.run(main())
+
+
+def test_aacquire_is_woken_by_release_from_thread():
+    pool = BeanPool((object, None), object, 1, timeout=5)
+
+    async def main():
+        ins = pool.acquire()
+        threading.Timer(0.05, pool.release, (ins,)).start()
+        start = time.perf_counter()
+        waiters = [asyncio.ensure_future(pool.aacquire()) for _ in range(2)]
+        done, pending = await asyncio.wait(waiters, timeout=1, return_when=asyncio.FIRST_COMPLETED)
+        assert time.perf_counter() - start < 1
+        assert [i.result() for i in done] == [ins]
+        # the other one is woken up by the next release
+        pool.release(ins)
+        assert await asyncio.wait_for(pending.pop(), 1) is ins
+
+    asyncio.run(main())
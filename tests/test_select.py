@@ -0,0 +1,101 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+from pydantic import BaseModel
+from tortoise import Tortoise
+
+from fastapi_boot.tortoise_util import Select
+
+ROWS = [(f'user{i}', 20 + i, None) for i in range(10)]
+
+
+class User(BaseModel):
+    id: int
+    name: str
+    age: int
+
+
+def test_stream_fetches_chunks_of_one_execution(run_db):
+    sql = Select('select id, name, age from user where age >= {age} order by id', chunk_size=3)
+
+    @sql
+    async def export(age: int) -> AsyncIterator[User]: ...
+
+    async def main():
+        conn = Tortoise.get_connection('default')
+        executed = []
+        execute = conn._connection.execute
+
+        async def spy(sql, *args):
+            executed.append(sql)
+            return await execute(sql, *args)
+
+        conn._connection.execute = spy
+        users = [i async for i in export(22)]
+        assert [i.name for i in users] == [f'user{i}' for i in range(2, 10)]
+        assert executed == ['select id, name, age from user where age >= ? order by id']
+        # the connection isn't locked while the consumer holds the stream
+        stream = export(20)
+        first = await anext(stream)
+        assert first.name == 'user0'
+        assert await Select('select count(*) as n from user').execute() == [{'n': 10}]
+        await stream.aclose()
+
+    run_db(main, *ROWS)
+
+
+def test_stream_chunk_size_is_local(run_db):
+    sql = Select('select id, name, age from user order by id', chunk_size=4)
+
+    async def main():
+        chunks = []
+        iter_values = sql.iter_values
+
+        def spy(values, chunk_size):
+            chunks.append(chunk_size)
+            return iter_values(values, chunk_size)
+
+        sql.iter_values = spy
+        assert len([i async for i in sql.stream(User, chunk_size=2)]) == 10
+        assert len([i async for i in sql.stream(dict)]) == 10
+        assert chunks == [2, 4]
+        assert sql.chunk_size == 4
+
+    run_db(main, *ROWS)
+
+
+def test_stream_fetches_all_rows_once_without_cursor(run_db, monkeypatch):
+    from fastapi_boot.tortoise_util import decorator
+
+    monkeypatch.setattr(decorator, 'get_driver', lambda conn: 'mssql')
+    sql = Select('select id, name, age from user where age >= {age} order by id', chunk_size=3)
+
+    @sql
+    async def export(age: int) -> AsyncIterator[User]: ...
+
+    async def main():
+        conn = Tortoise.get_connection('default')
+        chunks = []
+        iter_values = sql.iter_values
+
+        async def spy(values, chunk_size):
+            async for chunk in iter_values(values, chunk_size):
+                chunks.append(len(chunk))
+                yield chunk
+
+        sql.iter_values = spy
+        executed = []
+        execute_query = conn.execute_query
+
+        async def spy_query(query, values=None):
+            executed.append(query)
+            return await execute_query(query, values)
+
+        conn.execute_query = spy_query
+        users = [i async for i in export(22)]
+        assert [i.name for i in users] == [f'user{i}' for i in range(2, 10)]
+        assert executed == ['select id, name, age from user where age >= ? order by id']
+        assert chunks == [3, 3, 2]
+
+    run_db(main, *ROWS)
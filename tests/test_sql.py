@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+
+import pytest
+from pydantic import BaseModel
+
+from fastapi_boot.tortoise_util import Insert, Select, Sql, Update
+
+ROWS = [('foo', 20, None), ('bar', 21, None), ('baz', 22, None)]
+
+
+@dataclass
+class AgeDTO:
+    gt: int
+    lt: int
+
+
+def test_placeholders_are_compiled_once(run_db):
+    sql = Select('select name from {user} where age > {dto.gt} and age < {dto.lt} order by {order}').fill(
+        user='user', order='id')
+
+    @sql
+    async def query(dto: AgeDTO, unused: int = 0) -> list[dict]: ...
+
+    async def main():
+        assert await query(AgeDTO(19, 22)) == [{'name': 'foo'}, {'name': 'bar'}]
+        formatted = sql.formatted_sql
+        assert formatted == 'select name from user where age > ? and age < ? order by id'
+        assert await query(dto=AgeDTO(20, 23)) == [{'name': 'bar'}, {'name': 'baz'}]
+        assert sql.formatted_sql is formatted
+
+    run_db(main, *ROWS)
+
+
+def test_expressions_and_methods(run_db):
+    class Repo:
+        min_age = 21
+
+        @Select('select name from user where age >= {self.min_age} and name != {names[0]}')
+        async def query(self, names: list[str]) -> list[dict]: ...
+
+        @Sql('select count(*) as n from user where age = {age}')
+        async def count(self, age: int): ...
+
+    async def main():
+        repo = Repo()
+        assert await repo.query(['bar']) == [{'name': 'baz'}]
+        assert await repo.count(20) == (1, [{'n': 1}])
+
+    run_db(main, *ROWS)
+
+
+class UserDTO(BaseModel):
+    name: str
+    age: int
+
+
+@dataclass
+class UserDC:
+    name: str
+    age: int
+
+
+def test_insert_many(run_db):
+    async def rows():
+        for i in range(5):
+            yield {'name': f'gen{i}', 'age': i}
+
+    async def main():
+        insert = Insert('insert into {user}(name, age) values ({name}, {age})').fill(user='user')
+        assert await insert.many([{'name': 'foo', 'age': 20}, UserDTO(name='bar', age=21), UserDC('baz', 22)]) == 3
+        assert await insert.many(rows(), batch_size=2) == 5
+        assert await Update('update user set age = age + 1 where age < {age}').many([{'age': 3}]) == 3
+        _, resp = await Sql('select name, age from user order by id').execute()
+        assert resp[:3] == [{'name': 'foo', 'age': 20}, {'name': 'bar', 'age': 21}, {'name': 'baz', 'age': 22}]
+        assert [i['age'] for i in resp[3:]] == [1, 2, 3, 3, 4]
+
+    run_db(main)
+
+
+def test_insert_many_is_one_transaction(run_db):
+    async def main():
+        insert = Insert('insert into user(name, age) values ({name}, {age})')
+        with pytest.raises(Exception):
+            # age is not null
+            await insert.many([{'name': 'foo', 'age': 1}, {'name': 'bar', 'age': None}], batch_size=1)
+        assert await Sql('select count(*) as n from user').execute() == (1, [{'n': 0}])
+
+    run_db(main)
@@ -0,0 +1,84 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fastapi_boot.tortoise_util import Insert, Select, mount_sql_stats, sql_stats
+
+ROWS = [(f'user{i}', 20 + i, None) for i in range(5)]
+
+
+def find_stats(sql: str) -> dict:
+    return next(i for i in sql_stats.snapshot() if i['sql'] == sql)
+
+
+def test_disabled_by_default(run_db):
+    async def main():
+        await Select('select id from user').execute()
+        assert sql_stats.snapshot() == []
+
+    run_db(main, *ROWS)
+
+
+def test_stats_of_templates(run_db):
+    select = Select('select id, name from user where age >= {age}')
+    stream = Select('select id, name from user', chunk_size=2)
+    insert = Insert("insert into user(name, age) values ('foo', 30)")
+    broken = Select('select id from users')
+
+    @select
+    async def get_users(age: int) -> list[dict]: ...
+
+    async def main():
+        sql_stats.enable()
+        await get_users(22)
+        await get_users(24)
+        assert len([i async for i in stream.stream(dict)]) == 5
+        await insert.execute()
+        with pytest.raises(Exception):
+            await broken.execute()
+
+    run_db(main, *ROWS)
+    stats = find_stats(select.sql)
+    assert stats['count'] == 2
+    assert stats['rows'] == 3 + 1
+    assert stats['bytes'] > 0
+    assert sum(stats['histogram'].values()) == 2
+    # streamed rows are recorded as one call
+    assert (find_stats(stream.sql)['count'], find_stats(stream.sql)['rows']) == (1, 5)
+    assert find_stats(insert.sql)['rows'] == 1
+    broken_stats = find_stats(broken.sql)
+    assert (broken_stats['count'], broken_stats['errors']) == (0, 1)
+
+
+def test_slow_calls_are_logged_with_redacted_params(run_db, caplog: pytest.LogCaptureFixture):
+    select = Select('select id from user where name = {name}')
+
+    @select
+    async def get_user(name: str) -> dict | None: ...
+
+    async def main():
+        sql_stats.enable(slow_threshold=0, explain=True)
+        await get_user('secret')
+
+    with caplog.at_level(logging.WARNING, 'fastapi_boot.sql'):
+        run_db(main, *ROWS)
+    assert 'params=[\'<str>\']' in caplog.text
+    assert 'secret' not in caplog.text
+    assert find_stats(select.sql)['slow'] == 1
+    # sqlite's query plan of the slow call
+    assert find_stats(select.sql)['plan']
+
+
+def test_mount_sql_stats(run_db):
+    app = FastAPI()
+    mount_sql_stats(app, '/stats')
+    select = Select('select id from user')
+
+    async def main():
+        await select.execute()
+
+    run_db(main, *ROWS)
+    with TestClient(app) as client:
+        assert [i['sql'] for i in client.get('/stats').json()] == [select.sql]
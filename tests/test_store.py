@@ -0,0 +1,244 @@
+import asyncio
+import threading
+import time
+from importlib import import_module
+
+import pytest
+from pydantic import BaseModel
+
+from fastapi_boot.core.const import DepStore
+from fastapi_boot.core.model import DependencyAmbiguousException, DependencyFrozenException
+
+
+class Foo:
+    ...
+
+
+def test_wait_dep_wakes_up_on_add_dep():
+    store = DepStore()
+    foo = Foo()
+    threading.Timer(0.05, store.add_dep, (Foo, None, foo)).start()
+    start = time.perf_counter()
+    assert store.wait_dep(Foo, None, 5) is foo
+    # woken up by add_dep, not by the timeout
+    assert time.perf_counter() - start < 1
+
+
+def test_wait_dep_by_name_ignores_other_names():
+    store = DepStore()
+    foo = Foo()
+    threading.Timer(0.02, store.add_dep, (Foo, 'other', Foo())).start()
+    threading.Timer(0.05, store.add_dep, (Foo, 'foo', foo)).start()
+    assert store.wait_dep(Foo, 'foo', 5) is foo
+
+
+def test_wait_dep_timeout():
+    store = DepStore()
+    start = time.perf_counter()
+    assert store.wait_dep(Foo, None, 0.05) is None
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_await_dep_wakes_up_from_other_thread():
+    store = DepStore()
+    foo = Foo()
+
+    async def main():
+        threading.Timer(0.05, store.add_dep, (Foo, None, foo)).start()
+        return await store.await_dep(Foo, None, 5)
+
+    start = time.perf_counter()
+    assert asyncio.run(main()) is foo
+    assert time.perf_counter() - start < 1
+
+
+def test_clear_releases_waiters():
+    store = DepStore()
+    threading.Timer(0.05, store.clear).start()
+    start = time.perf_counter()
+    assert store.wait_dep(Foo, None, 5) is None
+    assert time.perf_counter() - start < 1
+
+
+class Base:
+    ...
+
+
+class Impl(Base):
+    ...
+
+
+def test_freeze_publishes_copies_on_late_registration():
+    store = DepStore()
+    foo = Foo()
+    store.add_dep(Foo, None, foo)
+    store.freeze()
+    tables = store.frozen
+    assert store.inject_dep(Foo, None) is foo
+    impl = Impl()
+    store.add_dep(Impl, 'impl', impl)
+    # readers holding the old tables never see a mutation
+    assert tables is not None and Impl not in tables[1] and Base not in tables[1]
+    assert store.inject_dep(Impl, 'impl') is impl
+    assert store.inject_dep(Base, 'impl') is impl
+    assert store.inject_dep(Foo, 'impl') is None
+
+
+def test_late_registration_rejected_unless_reserved():
+    store = DepStore()
+    store.freeze(allow_late=False, reserved=[(Foo, 'startup')])
+    with pytest.raises(DependencyFrozenException, match='allow_late_deps=False'):
+        store.add_dep(Foo, None, Foo())
+    foo = Foo()
+    store.add_dep(Foo, 'startup', foo)
+    assert store.inject_dep(Foo, 'startup') is foo
+    # a new app starts unfrozen
+    store.clear()
+    assert store.frozen is None
+    store.add_dep(Foo, None, foo)
+
+
+def test_provide_app_rejects_late_deps(make_project):
+    main = make_project({
+        'main.py': '''
+            from fastapi import FastAPI
+            from fastapi_boot.core import Bean, provide_app
+
+            app = provide_app(FastAPI(), allow_late_deps=False)
+
+            def register():
+                Bean('late')(lambda: 1)
+        ''',
+    })
+    with pytest.raises(DependencyFrozenException):
+        main.register()
+
+
+class Flag(int):
+    ...
+
+
+class Settings(dict):
+    ...
+
+
+class Model(BaseModel):
+    ...
+
+
+class AppError(Exception):
+    ...
+
+
+def test_framework_bases_are_not_indexed():
+    store = DepStore()
+    store.add_dep(Flag, None, Flag(1))
+    store.add_dep(Settings, 'settings', Settings())
+    store.add_dep(Model, None, Model())
+    store.add_dep(AppError, None, AppError())
+    for tp, name in [(int, None), (dict, 'settings'), (BaseModel, None), (Exception, None), (object, None)]:
+        assert store.inject_dep(tp, name) is None
+    store.add_dep(bool, None, True)
+    assert store.inject_dep(int, None) is None
+
+
+def test_user_bases_are_indexed(make_project):
+    main = make_project({
+        'main.py': '''
+            from fastapi import FastAPI
+            from fastapi_boot.core import provide_app
+
+            app = provide_app(FastAPI())
+        ''',
+        'service.py': '''
+            from abc import ABC
+            from typing import Protocol
+            from fastapi_boot.core import Inject, Injectable
+
+            class Cache(ABC): ...
+
+            class Sender(Protocol): ...
+
+            @Injectable(primary=True)
+            class LocalCache(Cache): ...
+
+            @Injectable
+            class RedisCache(Cache): ...
+
+            @Injectable
+            class MailSender(Sender): ...
+
+            @Injectable
+            class SmsSender(Sender): ...
+
+            def inject(tp):
+                return Inject(tp)
+        ''',
+    })
+    service = import_module(f'{main.__package__}.service')
+    assert isinstance(service.inject(service.Cache), service.LocalCache)
+    with pytest.raises(DependencyAmbiguousException, match='MailSender'):
+        service.inject(service.Sender)
+
+
+def test_exact_type_registered_after_subclass_wins_while_scanning(make_project):
+    main = make_project({
+        'main.py': '''
+            from fastapi import FastAPI
+            from fastapi_boot.core import provide_app
+
+            app = provide_app(FastAPI(), inject_timeout=5)
+        ''',
+        'model.py': '''
+            class Storage:
+                ...
+
+            class Sqlite(Storage):
+                ...
+
+            class Cache:
+                ...
+
+            class LocalCache(Cache):
+                ...
+        ''',
+        'sqlite.py': '''
+            from fastapi_boot.core import Bean
+            from .model import LocalCache, Sqlite
+
+            @Bean
+            def _() -> Sqlite:
+                return Sqlite()
+
+            @Bean
+            def _() -> LocalCache:
+                return LocalCache()
+        ''',
+        'storage.py': '''
+            import time
+            from fastapi_boot.core import Bean
+            from .model import Storage
+
+            @Bean
+            def _() -> Storage:
+                time.sleep(0.3)
+                return Storage()
+        ''',
+        'consumer.py': '''
+            import time
+            from fastapi_boot.core import Inject
+            from .model import Cache, Storage
+
+            time.sleep(0.1)
+            storage = Inject(Storage)
+            start = time.perf_counter()
+            # only a subclass is provided, matched once other modules are imported
+            cache = Inject(Cache)
+            waited = time.perf_counter() - start
+        ''',
+    })
+    consumer = import_module(f'{main.__package__}.consumer')
+    model = import_module(f'{main.__package__}.model')
+    assert type(consumer.storage) is model.Storage
+    assert type(consumer.cache) is model.LocalCache
+    assert consumer.waited < 1
@@ -0,0 +1,26 @@
+from fastapi import FastAPI
+
+from fastapi_boot.core.const import AppStore
+from fastapi_boot.core.model import AppRecord
+from fastapi_boot.core.util import get_call_filename
+
+
+def caller_filename():
+    return get_call_filename()
+
+
+def test_get_call_filename_is_caller_of_caller():
+    assert caller_filename() == __file__.capitalize()
+
+
+def test_app_store_lookup_is_memoized_and_invalidated():
+    store = AppStore()
+    record = AppRecord(FastAPI(), 20, 0.05)
+    assert store.get_or_none('/proj/app/controller.py') is None
+    assert store.path_cache == {'/proj/app/controller.py': None}
+    # a new app invalidates the memo of misses
+    store.add('/proj/app', record)
+    assert store.path_cache == {}
+    assert store.get_or_none('/proj/app/controller.py') is record
+    assert store.get_or_none('/proj/other/controller.py') is None
+    assert store.path_cache['/proj/app/controller.py'] is record